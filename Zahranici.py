@@ -8,15 +8,56 @@ Skript Zahranici.py slouží k doplňujícímu zpracování volebních dat
 ze zahraničních okrsků. Stahuje data z předem určených URL adres,
 parsuje je z HTML tabulek a výsledky ukládá do Excel souboru.
 Dočasné soubory (JSON) se po dokončení zpracování mažou.
+Celé zpracování lze spustit i z jiného skriptu voláním funkce
+zpracuj_zahranici (volby_okresy.py ji volá přímo, bez nového procesu).
 """
 
 import requests               # Knihovna pro HTTP požadavky
-from bs4 import BeautifulSoup # Knihovna pro parsování HTML
+from parsovani import vytvor_polevku, na_cislo, na_hodnotu  # Parsování HTML a převod čísel
 import json                   # Práce s JSON (vestavěná v Pythonu)
 import os                     # Práce se soubory a operačním systémem (vestavěná v Pythonu)
-import pandas as pd           # Práce s tabulkovými daty
 from datetime import datetime # Práce s datem a časem
 from pathlib import Path      # Bezpečnější manipulace s cestami k souborům
+import argparse               # Zpracování parametrů příkazové řádky (vestavěná v Pythonu)
+from stahovani import stahni_a_zpracuj_postupne  # Souběžné stahování a parsování detailních stránek
+from zapisovace import vytvor_zapisovac, FORMATY  # Průběžný zápis výsledků (xlsx, csv, parquet)
+from denik import Denik, zpracuj_s_denikem  # Deník hotových okrsků pro pokračování po pádu
+from klient import stahni, nastav_klienta  # Sdílený HTTP klient (keep-alive, timeouty, opakování)
+from extraktory import extrahuj  # Předkompilované extraktory stránek (lxml)
+from profilovani import PROFIL, pridej_parametry, zapni_podle_parametru  # Zpráva o běhu (--profile)
+
+# Adresa voleb na volby.cz - {volby} je kód voleb (např. ps2013, ps2017nss, ps2021)
+ADRESA_VOLEB = "https://www.volby.cz/pls/{volby}/"
+VYCHOZI_VOLBY = "ps2017nss"
+# Výchozí základní URL adresa voleb (stránka se zahraničními okrsky je 'ps36')
+ZAKLADNI_URL = ADRESA_VOLEB.format(volby=VYCHOZI_VOLBY)
+
+
+def url_voleb(volby):
+    """
+    Vrátí základní URL zadaných voleb.
+
+    Parametry:
+        volby (str): Kód voleb z adresy volby.cz (např. 'ps2021').
+
+    Návratová hodnota:
+        str: Základní URL voleb (např. https://www.volby.cz/pls/ps2021/).
+    """
+    return ADRESA_VOLEB.format(volby=volby)
+
+
+def kod_voleb(zakladni_url):
+    """
+    Vrátí kód voleb ze základní URL voleb (opak url_voleb).
+
+    Parametry:
+        zakladni_url (str): Základní URL voleb (např. https://www.volby.cz/pls/ps2021/).
+
+    Návratová hodnota:
+        str: Kód voleb (např. 'ps2021').
+    """
+    return zakladni_url.rstrip("/").rsplit("/", 1)[-1]
+
 
 def nacti_tabulku_1(url):
     """
@@ -30,38 +71,32 @@ def nacti_tabulku_1(url):
               Klíče zahrnují 'Kontinent', 'Země', 'Město', 'Okrsek' a 'Odkaz'.
     """
     try:
-        response = requests.get(url, timeout=10)
+        response = stahni(url)
         response.raise_for_status()  # Pokud dojde k chybě HTTP, vyvolá výjimku
-        soup = BeautifulSoup(response.text, 'html.parser')
 
-        # Najdeme tabulku s class="table"
-        table = soup.find('table', class_='table')
-        if not table:
-            print("Tabulka 1 nenalezena.")
-            return []
+        # Předkompilovaný extraktor; při změně rozložení obecné zpracování
+        radky = extrahuj("ps36", response.text)
+        if radky is None:
+            radky = _radky_tabulky_1(vytvor_polevku(response.text))
+            if radky is None:
+                print("Tabulka 1 nenalezena.")
+                return []
 
         data = []
         aktualni_kontinent = None
         aktualni_zeme = None
-
-        # Přeskočíme hlavičkový řádek tabulky (index 0)
-        radky = table.find_all('tr')[1:]
         print("Extrahuji data z Tabulky 1:")
 
-        # Procházíme každý řádek tabulky a podle počtu sloupců doplňujeme chybějící údaje
-        for i, radek in enumerate(radky, start=1):
-            sloupce = radek.find_all('td')
+        # Procházíme každý řádek tabulky a podle počtu sloupců doplňujeme chybějící údaje;
+        # sloupec je dvojice (text buňky, odkaz v buňce nebo None)
+        for i, sloupce in enumerate(radky, start=1):
 
             # Pokud je v řádku 4 sloupce => Kontinent, Země, Město, Okrsek
             if len(sloupce) == 4:
-                aktualni_kontinent = sloupce[0].get_text(strip=True) or aktualni_kontinent
-                aktualni_zeme = sloupce[1].get_text(strip=True) or aktualni_zeme
-                mesto = sloupce[2].get_text(strip=True)
-                okrsek = sloupce[3].get_text(strip=True)
-
-                # Pokud je v posledním sloupci odkaz, získáme ho
-                odkaz_tag = sloupce[3].find('a')
-                odkaz = odkaz_tag['href'] if odkaz_tag else None
+                aktualni_kontinent = sloupce[0][0] or aktualni_kontinent
+                aktualni_zeme = sloupce[1][0] or aktualni_zeme
+                mesto = sloupce[2][0]
+                okrsek, odkaz = sloupce[3]  # Odkaz na detail okrsku je v posledním sloupci
 
                 zaznam = {
                     "Kontinent": aktualni_kontinent,
@@ -76,12 +111,9 @@ def nacti_tabulku_1(url):
 
             # Pokud je 3 sloupce => Chybí kontinent (sloupec 0 bude Země)
             elif len(sloupce) == 3:
-                aktualni_zeme = sloupce[0].get_text(strip=True) or aktualni_zeme
-                mesto = sloupce[1].get_text(strip=True)
-                okrsek = sloupce[2].get_text(strip=True)
-
-                odkaz_tag = sloupce[2].find('a')
-                odkaz = odkaz_tag['href'] if odkaz_tag else None
+                aktualni_zeme = sloupce[0][0] or aktualni_zeme
+                mesto = sloupce[1][0]
+                okrsek, odkaz = sloupce[2]
 
                 zaznam = {
                     "Kontinent": aktualni_kontinent,
@@ -96,11 +128,8 @@ def nacti_tabulku_1(url):
 
             # Pokud jsou pouze 2 sloupce => Chybí kontinent i země (první sloupec = Město)
             elif len(sloupce) == 2:
-                mesto = sloupce[0].get_text(strip=True)
-                okrsek = sloupce[1].get_text(strip=True)
-
-                odkaz_tag = sloupce[1].find('a')
-                odkaz = odkaz_tag['href'] if odkaz_tag else None
+                mesto = sloupce[0][0]
+                okrsek, odkaz = sloupce[1]
 
                 zaznam = {
                     "Kontinent": aktualni_kontinent,
@@ -121,6 +150,30 @@ def nacti_tabulku_1(url):
         return []
 
 
+def _radky_tabulky_1(soup):
+    """
+    Obecné zpracování "Tabulky 1" (BeautifulSoup).
+
+    Návratová hodnota:
+        list: Pro každý řádek kromě hlavičky seznam dvojic (text buňky,
+              odkaz v buňce nebo None), nebo None, pokud tabulka chybí.
+    """
+    # Najdeme tabulku s class="table"
+    table = soup.find('table', class_='table')
+    if not table:
+        return None
+
+    radky = []
+    # Přeskočíme hlavičkový řádek tabulky (index 0)
+    for radek in table.find_all('tr')[1:]:
+        sloupce = []
+        for td in radek.find_all('td'):
+            odkaz_tag = td.find('a')
+            sloupce.append((td.get_text(strip=True), odkaz_tag['href'] if odkaz_tag else None))
+        radky.append(sloupce)
+    return radky
+
+
 def nacti_data_z_odkazu(zakladni_url, relativni_odkaz):
     """
     Načte detailní data ze zadaného odkazu (relativní cesta),
@@ -137,81 +190,219 @@ def nacti_data_z_odkazu(zakladni_url, relativni_odkaz):
               nebo None, pokud není možné data načíst.
     """
     try:
-        response = requests.get(zakladni_url + relativni_odkaz, timeout=10)
+        response = stahni(zakladni_url + relativni_odkaz)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Najdeme všechny tabulky s class="table"
-        tabulky = soup.find_all('table', class_='table')
-
-        # Očekáváme alespoň 3 tabulky
-        if len(tabulky) < 3:
-            print(f"Není dostatek tabulek na stránce {relativni_odkaz}. Očekávám alespoň 3.")
-            return None
-
-        # 1) Extrahování dat z první tabulky
-        table_1 = tabulky[0]
-        hlavicky = [
-            " ".join(th.stripped_strings) for th in table_1.find_all('th')
-        ]
-        radky = table_1.find_all('tr')[1:]  # Přeskočíme hlavičkový řádek
-        table_1_data = []
-        for radek in radky:
-            sloupce = radek.find_all('td')
-            zaznam = {}
-            for i, td in enumerate(sloupce):
-                zaznam[hlavicky[i]] = td.get_text(strip=True)
-            table_1_data.append(zaznam)
-
-        # 2) Extrahování dat z druhé a třetí tabulky (strany a hlasy)
-        #    Budeme je ukládat do jednoho slovníku
-        table_2_3_data = {}
-        for tabulka in tabulky[1:3]:
-            radky_stran = tabulka.find_all('tr')[1:]  # Přeskočíme hlavičkový řádek
-            for radek in radky_stran:
-                sloupce = radek.find_all('td')
-                if len(sloupce) >= 3:
-                    strana = sloupce[1].get_text(strip=True)
-                    hlasy = sloupce[2].get_text(strip=True)
-
-                    # Pokud je text v hlasy opravdu číslo, sčítáme
-                    if hlasy.isdigit():
-                        hlasy_int = int(hlasy)
-                        if strana not in table_2_3_data:
-                            table_2_3_data[strana] = 0
-                        table_2_3_data[strana] += hlasy_int
-
-        return {
-            "table_1": table_1_data,
-            "table_2_3": table_2_3_data
-        }
+        return zpracuj_data_z_odkazu(response.text, relativni_odkaz)
 
     except requests.RequestException as e:
         print(f"Chyba při načítání dat z odkazu {relativni_odkaz}: {e}")
         return None
 
 
-def uloz_do_excelu(data):
+def zpracuj_data_z_odkazu(html, relativni_odkaz, parser=None, jen_tabulky=True):
     """
-    Uloží předaná data do Excel souboru.
+    Vytáhne data z již stažené detailní stránky zahraničního okrsku.
 
     Parametry:
-        data (list): Seznam slovníků, které se uloží do Excelu (každý slovník = jeden řádek).
+        html (str): Obsah detailní stránky.
+        relativni_odkaz (str): Relativní odkaz na stránku (jen pro výpis chyb).
+        parser (str): Parser pro BeautifulSoup (viz parsovani.py); zadaný
+                      parser vynutí obecné zpracování místo extraktoru.
+        jen_tabulky (bool): Zda parsovat jen výsledkové tabulky (False
+                            vynutí obecné zpracování celé stránky).
+
+    Návratová hodnota:
+        dict: Stejný slovník jako nacti_data_z_odkazu, nebo None.
+    """
+    # Předkompilovaný extraktor; pokud stránka neodpovídá jeho rozložení,
+    # zpracuje se obecně (včetně výpisu chybějících tabulek)
+    if parser is None and jen_tabulky:
+        data = extrahuj("ps361", html)
+        if data is not None:
+            return data
+
+    soup = vytvor_polevku(html, jen_tabulky=jen_tabulky, parser=parser)
+
+    # Najdeme všechny tabulky s class="table"
+    tabulky = soup.find_all('table', class_='table')
+
+    # Očekáváme alespoň 3 tabulky
+    if len(tabulky) < 3:
+        print(f"Není dostatek tabulek na stránce {relativni_odkaz}. Očekávám alespoň 3.")
+        return None
+
+    # 1) Extrahování dat z první tabulky
+    table_1 = tabulky[0]
+    hlavicky = [
+        " ".join(th.stripped_strings) for th in table_1.find_all('th')
+    ]
+    radky = table_1.find_all('tr')[1:]  # Přeskočíme hlavičkový řádek
+    table_1_data = []
+    for radek in radky:
+        sloupce = radek.find_all('td')
+        zaznam = {}
+        for i, td in enumerate(sloupce):
+            # Počty (voliči, obálky, hlasy) rovnou jako int, procenta zůstávají textem
+            zaznam[hlavicky[i]] = na_hodnotu(td.get_text(strip=True))
+        table_1_data.append(zaznam)
+
+    # 2) Extrahování dat z druhé a třetí tabulky (strany a hlasy)
+    #    Budeme je ukládat do jednoho slovníku
+    table_2_3_data = {}
+    for tabulka in tabulky[1:3]:
+        radky_stran = tabulka.find_all('tr')[1:]  # Přeskočíme hlavičkový řádek
+        for radek in radky_stran:
+            sloupce = radek.find_all('td')
+            if len(sloupce) >= 3:
+                strana = sloupce[1].get_text(strip=True)
+                # Počet hlasů může obsahovat oddělovač tisíců (nezlomitelnou
+                # mezeru), proto nestačí hlasy.isdigit()
+                hlasy = sloupce[2].get_text(strip=True)
+                if "".join(hlasy.split()).isdigit():
+                    table_2_3_data[strana] = table_2_3_data.get(strana, 0) + na_cislo(hlasy)
+
+    return {
+        "table_1": table_1_data,
+        "table_2_3": table_2_3_data
+    }
+
+
+def _stahni_stranku_okrsku(zakladni_url, zaznam):
+    """
+    Stáhne detailní stránku zahraničního okrsku (pro stahovani.stahni_a_zpracuj).
+
+    Návratová hodnota:
+        str: HTML stránky, nebo None, pokud se ji nepodařilo stáhnout.
+    """
+    try:
+        response = stahni(zakladni_url + zaznam['Odkaz'])
+        response.raise_for_status()
+        return response.text
+    except requests.RequestException as e:
+        print(f"Chyba při načítání dat z odkazu {zaznam['Odkaz']}: {e}")
+        return None
+
+
+def _zpracuj_stranku_okrsku(zaznam, html):
+    """
+    Zparsuje detailní stránku okrsku; běží ve fondu procesů, proto je
+    definována na úrovni modulu.
+    """
+    return zpracuj_data_z_odkazu(html, zaznam['Odkaz'])
+
+
+def nacti_detaily(zakladni_url, tabulka_1_data, pocet_vlaken=None, pocet_procesu=None,
+                  denik=None):
+    """
+    Stáhne a zpracuje detailní data pro všechny záznamy z Tabulky 1 a postupně
+    vrací výsledky jednotlivých zahraničních okrsků.
+
+    Parametry:
+        zakladni_url (str): Základní URL (např. https://www.volby.cz/pls/ps2017nss/)
+        tabulka_1_data (list): Výstup funkce nacti_tabulku_1.
+        pocet_vlaken (int): Počet souběžně stahovaných stránek.
+        pocet_procesu (int): Počet procesů pro parsování stránek.
+        denik (Denik): Deník hotových okrsků; co v něm už je, se nestahuje.
+
+    Návratová hodnota:
+        generator: Dvojice (zaklad, hlasy) pro každý okrsek:
+                   - zaklad: slovník s klíči 'Kontinent', 'Země', 'Město',
+                     'Okrsek' a údaji z první tabulky,
+                   - hlasy: slovník {název strany: počet hlasů} pro strany,
+                     které v okrsku získaly hlasy.
+                   Pro uložení se dvojice vkládají do TabulkaVysledku.
+    """
+    # Detailní stránky se stahují souběžně a parsují ve fondu procesů,
+    # výsledky zůstávají v pořadí Tabulky 1. Klíčem v deníku je úplná URL:
+    # relativní odkaz (ps361?...) je ve všech volbách stejný a při běhu přes
+    # více voleb se sdíleným deníkem by se výsledky jedněch voleb vzaly pro jiné.
+    vsechna_link_data = zpracuj_s_denikem(
+        tabulka_1_data, lambda zaznam: zakladni_url + zaznam['Odkaz'], denik,
+        lambda zbyvajici: stahni_a_zpracuj_postupne(
+            zbyvajici,
+            lambda zaznam: _stahni_stranku_okrsku(zakladni_url, zaznam),
+            _zpracuj_stranku_okrsku,
+            pocet_vlaken,
+            pocet_procesu,
+            "ps361"
+        )
+    )
+
+    for zaznam, link_data in zip(tabulka_1_data, vsechna_link_data):
+        # Každý záznam obsahuje 'Odkaz', který vede na detail
+        if link_data:
+            yield sestav_zaznam(zaznam, link_data)
+
+
+def sestav_zaznam(zaznam, link_data):
+    """
+    Spojí záznam z Tabulky 1 s daty z detailní stránky okrsku.
+
+    Parametry:
+        zaznam (dict): Řádek z nacti_tabulku_1.
+        link_data (dict): Výsledek zpracuj_data_z_odkazu.
+
+    Návratová hodnota:
+        tuple: (zaklad, hlasy) - viz nacti_detaily.
+    """
+    detailni_zaznam = {
+        "Kontinent": zaznam['Kontinent'],
+        "Země": zaznam['Země'],
+        "Město": zaznam['Město'],
+        "Okrsek": zaznam['Okrsek'],
+    }
+
+    # Přidání obsahu z "table_1"
+    for polozka in link_data.get("table_1", []):
+        detailni_zaznam.update(polozka)
+
+    # Hlasy stran z "table_2_3" zůstávají oddělené od základních údajů
+    return detailni_zaznam, link_data["table_2_3"]
+
+
+def uloz_vysledky(data, format_vystupu="xlsx", sloupce=None):
+    """
+    Postupně zapíše předaná data do souboru zvoleného formátu. Sloupce stran,
+    které v některém okrsku chybí, se doplní hodnotou 0.
+
+    Parametry:
+        data (iterable): Slovníky, které se uloží (každý slovník = jeden řádek).
+        format_vystupu (str): 'xlsx', 'csv' nebo 'parquet'.
+        sloupce (list): Pořadí sloupců, pokud je známé předem (např.
+                        TabulkaVysledku.sloupce_vystupu()).
+
+    Návratová hodnota:
+        bool: True, pokud se data podařilo uložit.
     """
     try:
         # Vytvoříme název souboru s časovou značkou
         casove_razitko = datetime.now().strftime("%Y%m%d_%H%M")
         # Sestavíme cestu k výstupnímu souboru na základě umístění skriptu
         vystupni_slozka = Path(__file__).parent
-        vystupni_soubor = vystupni_slozka / f"Vysledek_{casove_razitko}.xlsx"
+        vystup = vystupni_slozka / f"Vysledek_{casove_razitko}"
 
-        df = pd.DataFrame(data)
-        df.to_excel(vystupni_soubor, index=False)
+        with PROFIL.etapa("zapis"):
+            with vytvor_zapisovac(format_vystupu, vystup, sloupce, vyplnit=0) as zapisovac:
+                for radek in data:
+                    zapisovac.zapis(radek)
+        PROFIL.radky(zapisovac.pocet_radku)
 
-        print(f"Data úspěšně uložena do {vystupni_soubor}")
+        print(f"Data úspěšně uložena do {zapisovac.cesta}")
+        return True
 
     except Exception as e:
-        print(f"Chyba při ukládání dat do Excelu: {e}")
+        print(f"Chyba při ukládání dat: {e}")
+        return False
+
+
+def uloz_do_excelu(data):
+    """
+    Uloží předaná data do Excel souboru.
+
+    Parametry:
+        data (list): Seznam slovníků, které se uloží do Excelu (každý slovník = jeden řádek).
+    """
+    uloz_vysledky(data, "xlsx")
 
 
 def uloz_do_json(data, json_soubor):
@@ -245,71 +436,103 @@ def vymaz_json(json_soubor):
         print(f"Chyba při mazání JSON souboru: {e}")
 
 
-def main():
+def zpracuj_zahranici(zakladni_url=ZAKLADNI_URL, format_vystupu="xlsx", pokracovat=False,
+                      pocet_vlaken=None, pocet_procesu=None):
     """
-    Hlavní funkce skriptu:
-     1. Načte data z "Tabulky 1" (kontinenty, země, města, odkazy).
-     2. Uloží je do JSON (dočasného) souboru.
-     3. Pro každý záznam v Tabulce 1 stáhne a zpracuje detailní data (tabulky se stranami a hlasy).
-     4. Vše spojí do jednoho seznamu slovníků a uloží do Excel souboru.
-     5. Smaže dočasný JSON soubor.
+    Celé zpracování zahraničních okrsků: načte Tabulku 1, stáhne a zpracuje
+    detailní stránky všech okrsků a výsledky uloží do výstupního souboru.
+    Běží v aktuálním procesu, takže sdílí HTTP klienta i mezipaměť
+    s volajícím skriptem.
+
+    Parametry:
+        zakladni_url (str): Základní URL voleb (např. https://www.volby.cz/pls/ps2017nss/).
+        format_vystupu (str): 'xlsx', 'csv' nebo 'parquet'.
+        pokracovat (bool): Navázat na přerušený běh podle deníku.
+        pocet_vlaken (int): Počet souběžně stahovaných stránek.
+        pocet_procesu (int): Počet procesů pro parsování stránek.
+
+    Návratová hodnota:
+        bool: True, pokud se výsledky podařilo uložit.
     """
-    # Základní URL adresa
-    zakladni_url = "https://www.volby.cz/pls/ps2017nss/"
+    # Sloupcová tabulka (NumPy) se načítá až tady, aby nezdržovala start skriptu
+    from vysledky import TabulkaVysledku
+
     # URL s tabulkou, kterou chceme načíst (Tabulka 1)
     tabulka_1_url = zakladni_url + "ps36?xjazyk=CZ"
 
     # Sestavíme cestu pro dočasný JSON soubor (uloží se do složky, kde je skript)
     json_soubor = Path(__file__).parent / "election_data.json"
+    # Deník hotových okrsků (zůstane na disku, pokud běh nedoběhne); kód
+    # voleb v názvu odliší deníky různých voleb
+    denik_soubor = Path(__file__).parent / f"denik_zahranici_{kod_voleb(zakladni_url)}.jsonl"
 
     # 1) Načítání dat z Tabulky 1
     print("Extrahování dat z Tabulky 1...")
-    tabulka_1_data = nacti_tabulku_1(tabulka_1_url)
+    with PROFIL.etapa("seznam okrsku"):
+        tabulka_1_data = nacti_tabulku_1(tabulka_1_url)
 
     # 2) Uložit extrahovaná data do JSON
     print("Ukládání extrahovaných dat do JSON...")
     uloz_do_json(tabulka_1_data, json_soubor)
 
-    # 3) Iterovat přes záznamy z tabulky a získat detailní data pro každé město/okrsek
-    print("Extrahování dat z odkazovaných stránek...")
-    podrobna_data = []
-    vsechny_strany = set()
-
-    for zaznam in tabulka_1_data:
-        # Každý záznam obsahuje 'Odkaz', který vede na detail
-        link_data = nacti_data_z_odkazu(zakladni_url, zaznam['Odkaz'])
-        if link_data:
-            detailni_zaznam = {
-                "Kontinent": zaznam['Kontinent'],
-                "Země": zaznam['Země'],
-                "Město": zaznam['Město'],
-            }
-
-            # Přidání obsahu z "table_1"
-            for polozka in link_data.get("table_1", []):
-                detailni_zaznam.update(polozka)
-
-            # Přidání (sloučení) dynamických dat o stranách z "table_2_3"
-            for strana, hlasy in link_data["table_2_3"].items():
-                vsechny_strany.add(strana)
-                detailni_zaznam[strana] = hlasy
-
-            podrobna_data.append(detailni_zaznam)
-
-    # Ujistíme se, že pro každou stranu existuje sloupec i u ostatních záznamů
-    vsechny_strany = list(vsechny_strany)
-    for zaznam in podrobna_data:
-        for strana in vsechny_strany:
-            if strana not in zaznam:
-                zaznam[strana] = 0
-
-    # 4) Uložit detailní data do Excelu
-    print("Ukládání podrobných dat do Excelu...")
-    uloz_do_excelu(podrobna_data)
+    # 3) + 4) Iterovat přes záznamy z tabulky, získat detailní data pro každé
+    #    město/okrsek, sestavit z nich tabulku a tu uložit do výstupního souboru
+    print("Extrahování dat z odkazovaných stránek a ukládání výsledků...")
+    denik = Denik(denik_soubor, pokracovat)
+    dokonceno = False
+    try:
+        tabulka = TabulkaVysledku(klic="Okrsek")
+        podrobna_data = nacti_detaily(
+            zakladni_url, tabulka_1_data, pocet_vlaken, pocet_procesu, denik
+        )
+        with PROFIL.etapa("stahovani a parsovani"):
+            for zaklad, hlasy in podrobna_data:
+                tabulka.pridej(zaklad, hlasy)
+        dokonceno = uloz_vysledky(
+            tabulka.radky(), format_vystupu, tabulka.sloupce_vystupu()
+        )
+    finally:
+        denik.zavri(smazat=dokonceno)
 
     # 5) Vymazat dočasný JSON soubor
     print("Vymazání dočasného JSON souboru...")
     vymaz_json(json_soubor)
+    return dokonceno
+
+
+def main(argv=None):
+    """
+    Hlavní funkce skriptu - zpracuje parametry příkazové řádky a spustí
+    zpracuj_zahranici:
+     1. Načte data z "Tabulky 1" (kontinenty, země, města, odkazy).
+     2. Uloží je do JSON (dočasného) souboru.
+     3. Pro každý záznam v Tabulce 1 stáhne a zpracuje detailní data (tabulky se stranami a hlasy).
+     4. Výsledky sestaví do sloupcové tabulky a zapíše do výstupního souboru (Excel, CSV nebo Parquet).
+     5. Smaže dočasný JSON soubor.
+    """
+    parser = argparse.ArgumentParser(description="Výsledky voleb v zahraničí.")
+    parser.add_argument("--format", dest="format_vystupu", choices=sorted(FORMATY),
+                        default="xlsx", help="formát výstupního souboru (výchozí xlsx)")
+    parser.add_argument("--resume", action="store_true",
+                        help="navázat na přerušený běh (přeskočí okrsky uložené v deníku)")
+    parser.add_argument("--volby", default=VYCHOZI_VOLBY, metavar="KOD",
+                        help=f"kód voleb z adresy volby.cz, např. ps2013 nebo ps2021 "
+                             f"(výchozí {VYCHOZI_VOLBY})")
+    parser.add_argument("--jen-mezipamet", action="store_true",
+                        help="režim bez sítě: stránky brát jen z mezipaměti (.mezipamet); "
+                             "chybějící stránka je chyba (stejně jako VOLBY_JEN_MEZIPAMET=1)")
+    pridej_parametry(parser)
+    parametry = parser.parse_args(argv)
+    if parametry.jen_mezipamet:
+        nastav_klienta(jen_mezipamet=True)
+
+    cesta_profilu = zapni_podle_parametru(parametry, Path(__file__).parent)
+    try:
+        zpracuj_zahranici(url_voleb(parametry.volby), parametry.format_vystupu,
+                          parametry.resume)
+    finally:
+        if cesta_profilu:
+            PROFIL.uloz(cesta_profilu)
 
 
 if __name__ == "__main__":
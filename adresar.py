@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Trvalý adresář územních celků (kraj -> okres -> obec) pro jedny volby.
+Seznam okresů (stránka ps3) a seznamy obcí jednotlivých okresů (ps32) se
+stáhnou jen jednou a uloží do komprimovaného souboru JSON ve složce
+mezipaměti. Při dalším spuštění se adresář načte z disku během několika
+milisekund, takže výběr okresu i příprava stahování obcí už nepotřebují
+síť. Seznam obcí okresu se do adresáře doplní při prvním použití okresu.
+
+Adresář se sestaví znovu jen na požádání (parametr --obnov-adresar) nebo
+když neodpovídá kontrola verze: jiný formát souboru (VERZE_FORMATU) nebo
+jiná adresa voleb, ze které byl sestaven.
+
+Formát souboru (odkazy jsou relativní k adrese stránky ps3):
+    {"verze": 1, "url": "...ps3?xjazyk=CZ", "vytvoreno": "...",
+     "okresy": [{"cislo": 1, "nazev": "Praha", "kraj": "...",
+                 "odkaz": "ps32?...",
+                 "obce": [["500054", "Praha 1", "ps311?...", "ps34?..."], ...]},
+                ...]}
+Položka "obce" chybí u okresů, jejichž obce ještě nebyly načteny.
+"""
+
+import gzip           # Komprese souboru adresáře (vestavěná v Pythonu)
+import json           # Formát adresáře (vestavěná v Pythonu)
+import os             # Atomické nahrazení souboru (vestavěná v Pythonu)
+import threading      # Zámek pro doplňování z více vláken (vestavěná v Pythonu)
+from datetime import datetime
+from pathlib import Path
+
+from mezipamet import VYCHOZI_SLOZKA
+from stahovani import zpracuj_paralelne
+
+# Verze formátu souboru; při změně formátu se starší adresáře sestaví znovu
+VERZE_FORMATU = 1
+
+
+def cesta_adresare(volby, slozka=VYCHOZI_SLOZKA):
+    """
+    Vrátí cestu k souboru adresáře zadaných voleb.
+
+    Parametry:
+        volby (str): Kód voleb (např. 'ps2017nss').
+        slozka (str nebo Path): Složka, ve které jsou adresáře uloženy.
+
+    Vrací:
+        Path: Cesta k souboru adresare_<volby>.json.gz.
+    """
+    return Path(slozka) / f"adresar_{volby}.json.gz"
+
+
+def _relativni(url, predpona):
+    """
+    Zkrátí URL na odkaz relativní k adresáři voleb (pokud to jde).
+    """
+    if url is None:
+        return None
+    return url[len(predpona):] if url.startswith(predpona) else url
+
+
+def _plna(odkaz, predpona):
+    """
+    Převede uložený odkaz zpět na plnou URL. Jde jen o spojení řetězců
+    (urljoin by načtení velkého adresáře zpomalil na desetinásobek).
+    """
+    if odkaz is None or "://" in odkaz:
+        return odkaz
+    return predpona + odkaz
+
+
+class Adresar:
+    """
+    Adresář okresů a obcí jedněch voleb uložený na disku.
+
+    Parametry:
+        cesta (str nebo Path): Cesta k souboru adresáře.
+        url (str): Adresa stránky se seznamem okresů (ps3).
+        nacti_okresy (callable): Funkce url -> seznam okresů (jako
+                                 volby_okresy.nacti_okresni_mesta).
+        nacti_obce (callable): Funkce odkaz okresu -> seznam obcí (jako
+                               volby_okresy.nacti_obce).
+        obnovit (bool): True = zahodit uložený adresář a sestavit ho znovu.
+    """
+
+    def __init__(self, cesta, url, nacti_okresy, nacti_obce, obnovit=False):
+        self.cesta = Path(cesta)
+        self.url = url
+        # Adresář voleb, ke kterému jsou uložené odkazy relativní
+        self._predpona = url.rsplit("/", 1)[0] + "/"
+        self._nacti_okresy = nacti_okresy
+        self._nacti_obce = nacti_obce
+        self._zamek = threading.Lock()
+        self._data = None if obnovit else self._nacti_ze_souboru()
+
+    def _nacti_ze_souboru(self):
+        """
+        Načte adresář ze souboru; vrátí None, pokud soubor chybí, je
+        poškozený nebo neprošel kontrolou verze.
+        """
+        try:
+            with gzip.open(self.cesta, "rt", encoding="utf-8") as soubor:
+                data = json.load(soubor)
+        except (OSError, ValueError):
+            return None
+        if data.get("verze") != VERZE_FORMATU or data.get("url") != self.url:
+            return None
+        return data
+
+    def _uloz(self):
+        """
+        Uloží adresář na disk (přes dočasný soubor, aby nikdy nezůstal
+        rozepsaný).
+        """
+        self.cesta.parent.mkdir(parents=True, exist_ok=True)
+        docasny = self.cesta.with_name(self.cesta.name + ".tmp")
+        with gzip.open(docasny, "wt", encoding="utf-8") as soubor:
+            json.dump(self._data, soubor, ensure_ascii=False, separators=(",", ":"))
+        os.replace(docasny, self.cesta)
+
+    @property
+    def je_nacten(self):
+        """
+        True, pokud se adresář načetl z disku (nebo už byl sestaven).
+        """
+        return self._data is not None
+
+    def okresy(self):
+        """
+        Vrátí seznam okresů; při prvním použití bez uloženého adresáře ho
+        stáhne ze serveru a adresář uloží.
+
+        Vrací:
+            list: Slovníky s klíči 'cislo', 'nazev', 'kraj', 'odkaz'
+                  (stejně jako nacti_okresni_mesta).
+        """
+        with self._zamek:
+            if self._data is None:
+                self._data = {
+                    "verze": VERZE_FORMATU,
+                    "url": self.url,
+                    "vytvoreno": datetime.now().isoformat(timespec="seconds"),
+                    "okresy": [
+                        {**okres, "odkaz": _relativni(okres["odkaz"], self._predpona)}
+                        for okres in self._nacti_okresy(self.url)
+                    ],
+                }
+                self._uloz()
+            return [
+                {
+                    "cislo": okres["cislo"],
+                    "nazev": okres["nazev"],
+                    "kraj": okres["kraj"],
+                    "odkaz": _plna(okres["odkaz"], self._predpona),
+                }
+                for okres in self._data["okresy"]
+            ]
+
+    def obce(self, okresy, pocet_vlaken=None):
+        """
+        Vrátí seznamy obcí zadaných okresů. Okresy, jejichž obce v adresáři
+        ještě nejsou, se souběžně stáhnou a adresář se jednou uloží.
+
+        Parametry:
+            okresy (list): Položky z metody okresy (rozhoduje klíč 'odkaz').
+            pocet_vlaken (int): Počet souběžně stahovaných stránek.
+
+        Vrací:
+            list: Pro každý okres seznam slovníků s klíči 'cislo', 'obec',
+                  'odkaz', 'okrsky' (stejně jako nacti_obce).
+        """
+        self.okresy()
+        with self._zamek:
+            podle_odkazu = {
+                _plna(okres["odkaz"], self._predpona): okres for okres in self._data["okresy"]
+            }
+        chybejici = list(dict.fromkeys(
+            okres["odkaz"] for okres in okresy
+            if "obce" not in podle_odkazu.get(okres["odkaz"], {})
+        ))
+        if chybejici:
+            seznamy = zpracuj_paralelne(self._nacti_obce, chybejici, pocet_vlaken)
+            with self._zamek:
+                for odkaz, obce in zip(chybejici, seznamy):
+                    zaznam = podle_odkazu.get(odkaz)
+                    if zaznam is None:
+                        continue            # Okres mimo adresář se neukládá
+                    zaznam["obce"] = [
+                        [obec["cislo"], obec["obec"], _relativni(obec["odkaz"], self._predpona),
+                         _relativni(obec["okrsky"], self._predpona)]
+                        for obec in obce
+                    ]
+                self._uloz()
+            stazene = dict(zip(chybejici, seznamy))
+        else:
+            stazene = {}
+
+        vysledek = []
+        for okres in okresy:
+            zaznam = podle_odkazu.get(okres["odkaz"], {})
+            if "obce" not in zaznam:
+                vysledek.append(stazene[okres["odkaz"]])
+                continue
+            vysledek.append([
+                {
+                    "cislo": cislo,
+                    "obec": nazev,
+                    "odkaz": _plna(odkaz, self._predpona),
+                    "okrsky": _plna(okrsky, self._predpona),
+                }
+                for cislo, nazev, odkaz, okrsky in zaznam["obce"]
+            ])
+        return vysledek
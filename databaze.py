@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ukládání výsledků do lokální SQLite databáze (parametr --db).
+Místo dalšího souboru vysledky_<čas>.xlsx se výsledky obcí (případně okrsků)
+zapíšou do normalizovaných tabulek:
+    volby  - kódy voleb (ps2013, ps2017nss, ...)
+    obce   - obce a okrsky: kraj, okres, název, voliči, obálky, platné hlasy
+    strany - názvy stran s trvalým číselným ID
+    hlasy  - počet hlasů (volby, úroveň, obec, okrsek, strana)
+Řádky jsou určeny volbami, úrovní ('obce' = výsledky po obcích, 'okrsky' =
+po okrscích, --okrsky), číslem obce a okrskem; opakovaný běh pro stejné
+volby a úroveň záznamy přepíše (upsert), takže databáze neroste o další
+kopie. Obě úrovně obsahují tytéž hlasy, proto se při sčítání vybírá jedna.
+Pohled 'vysledky' spojuje všechny tabulky pro běžné dotazy, např.:
+    SELECT nazev, podil FROM vysledky
+    WHERE volby = 'ps2017nss' AND uroven = 'obce' AND strana = 'ANO 2011' AND volici < 500;
+"""
+
+import sqlite3        # Databáze výsledků (vestavěná v Pythonu)
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np    # Výběr nenulových hlasů z matice TabulkaVysledku
+
+# Výchozí název databáze (vedle skriptů)
+VYCHOZI_DATABAZE = "volby.sqlite"
+# Verze schématu (PRAGMA user_version); verze 0 neměla sloupec 'uroven'
+VERZE_SCHEMATU = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS volby (
+    id INTEGER PRIMARY KEY,
+    kod TEXT NOT NULL UNIQUE,
+    aktualizovano TEXT
+);
+CREATE TABLE IF NOT EXISTS obce (
+    volby_id INTEGER NOT NULL REFERENCES volby(id),
+    uroven TEXT NOT NULL,
+    kod TEXT NOT NULL,
+    okrsek TEXT NOT NULL DEFAULT '',
+    nazev TEXT,
+    kraj TEXT,
+    okres TEXT,
+    volici INTEGER,
+    obalky INTEGER,
+    platne INTEGER,
+    PRIMARY KEY (volby_id, uroven, kod, okrsek)
+);
+CREATE TABLE IF NOT EXISTS strany (
+    id INTEGER PRIMARY KEY,
+    nazev TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS hlasy (
+    volby_id INTEGER NOT NULL,
+    uroven TEXT NOT NULL,
+    kod TEXT NOT NULL,
+    okrsek TEXT NOT NULL DEFAULT '',
+    strana_id INTEGER NOT NULL REFERENCES strany(id),
+    hlasy INTEGER NOT NULL,
+    PRIMARY KEY (volby_id, uroven, kod, okrsek, strana_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS obce_kod ON obce (kod);
+CREATE INDEX IF NOT EXISTS hlasy_strana ON hlasy (strana_id, volby_id);
+CREATE VIEW IF NOT EXISTS vysledky AS
+    SELECT v.kod AS volby, o.uroven, o.kraj, o.okres, o.kod, o.nazev, o.okrsek,
+           o.volici, o.obalky, o.platne, s.nazev AS strana, h.hlasy,
+           ROUND(100.0 * h.hlasy / NULLIF(o.platne, 0), 2) AS podil
+    FROM hlasy h
+    JOIN obce o ON o.volby_id = h.volby_id AND o.uroven = h.uroven
+               AND o.kod = h.kod AND o.okrsek = h.okrsek
+    JOIN strany s ON s.id = h.strana_id
+    JOIN volby v ON v.id = h.volby_id;
+"""
+
+# Sloupce tabulky 'obce' -> sloupec TabulkaVysledku, ze kterého se plní
+SLOUPCE_OBCI = {
+    "kod": "Číslo obce",
+    "okrsek": "Okrsek",
+    "nazev": "Název obce",
+    "kraj": "Kraj",
+    "okres": "Okres",
+    "volici": "Voliči celkem",
+    "obalky": "Odevzdané obálky",
+    "platne": "Platné hlasy",
+}
+
+
+def otevri_databazi(cesta):
+    """
+    Otevře (případně založí) databázi výsledků se schématem SCHEMA.
+
+    Parametry:
+        cesta (str nebo Path): Cesta k souboru databáze.
+
+    Vrací:
+        sqlite3.Connection: Otevřené spojení.
+    """
+    db = sqlite3.connect(str(cesta))
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    if db.execute("PRAGMA user_version").fetchone()[0] < VERZE_SCHEMATU:
+        _preved_schema(db)
+    db.executescript(SCHEMA)
+    return db
+
+
+def _preved_schema(db):
+    """
+    Převede databázi ze schématu bez sloupce 'uroven' (verze 0): úroveň se
+    odvodí z okrsku (prázdný = výsledky po obcích). Nová databáze jen
+    dostane číslo verze.
+    """
+    sloupce = [radek[1] for radek in db.execute("PRAGMA table_info(obce)")]
+    if sloupce and "uroven" not in sloupce:
+        # Celý převod v jedné transakci (executescript jinak potvrzuje průběžně)
+        uroven = "CASE WHEN okrsek = '' THEN 'obce' ELSE 'okrsky' END"
+        db.executescript(
+            "BEGIN;"
+            "DROP VIEW IF EXISTS vysledky;"
+            "DROP INDEX IF EXISTS obce_kod;"
+            "DROP INDEX IF EXISTS hlasy_strana;"
+            "ALTER TABLE obce RENAME TO obce_v0;"
+            "ALTER TABLE hlasy RENAME TO hlasy_v0;"
+            + SCHEMA +
+            "INSERT INTO obce (volby_id, uroven, kod, okrsek, nazev, kraj, okres, "
+            "volici, obalky, platne) "
+            f"SELECT volby_id, {uroven}, kod, okrsek, nazev, kraj, okres, "
+            "volici, obalky, platne FROM obce_v0;"
+            "INSERT INTO hlasy (volby_id, uroven, kod, okrsek, strana_id, hlasy) "
+            f"SELECT volby_id, {uroven}, kod, okrsek, strana_id, hlasy FROM hlasy_v0;"
+            "DROP TABLE obce_v0;"
+            "DROP TABLE hlasy_v0;"
+            f"PRAGMA user_version = {VERZE_SCHEMATU};"
+            "COMMIT;"
+        )
+    else:
+        db.execute(f"PRAGMA user_version = {VERZE_SCHEMATU}")
+
+
+def _hodnoty_sloupce(tabulka, nazev, vychozi=None):
+    """
+    Hodnoty základního sloupce tabulky jako seznam (chybějící sloupec = výchozí hodnota).
+    """
+    if nazev not in tabulka.zakladni_sloupce:
+        return [vychozi] * len(tabulka)
+    data = tabulka.sloupec(nazev)
+    return data.tolist() if isinstance(data, np.ndarray) else list(data)
+
+
+def _id_voleb(db, kody):
+    """
+    Vrátí slovník kód voleb -> ID (chybějící volby založí).
+    """
+    cas = datetime.now().isoformat(timespec="seconds")
+    db.executemany(
+        "INSERT INTO volby (kod, aktualizovano) VALUES (?, ?) "
+        "ON CONFLICT(kod) DO UPDATE SET aktualizovano = excluded.aktualizovano",
+        [(kod, cas) for kod in kody]
+    )
+    return {
+        kod: id_ for kod, id_ in db.execute(
+            f"SELECT kod, id FROM volby WHERE kod IN ({','.join('?' * len(kody))})", kody
+        )
+    }
+
+
+def _id_stran(db, nazvy):
+    """
+    Vrátí seznam trvalých ID stran ve stejném pořadí jako názvy.
+    """
+    db.executemany("INSERT OR IGNORE INTO strany (nazev) VALUES (?)", [(n,) for n in nazvy])
+    id_podle_nazvu = dict(db.execute("SELECT nazev, id FROM strany"))
+    return [id_podle_nazvu[nazev] for nazev in nazvy]
+
+
+def uloz_do_databaze(tabulka, cesta, volby=None):
+    """
+    Hromadně uloží tabulku výsledků do databáze. Obce (okrsky), které už
+    v databázi pro stejné volby a úroveň jsou, se přepíšou včetně hlasů;
+    ostatní záznamy databáze zůstanou beze změny. Tabulka se sloupcem
+    'Okrsek' se ukládá na úroveň 'okrsky', ostatní na úroveň 'obce'.
+    Vše proběhne v jedné transakci.
+
+    Parametry:
+        tabulka (TabulkaVysledku): Výsledky obcí nebo okrsků se sloupci
+                                   podle SLOUPCE_OBCI (chybějící = prázdné).
+        cesta (str nebo Path): Cesta k souboru databáze.
+        volby (str): Kód voleb; použije se, pokud tabulka nemá sloupec 'Volby'.
+
+    Vrací:
+        int: Počet uložených řádků (obcí nebo okrsků).
+    """
+    pocet = len(tabulka)
+    kody_voleb = _hodnoty_sloupce(tabulka, "Volby", volby)
+    uroven = "okrsky" if "Okrsek" in tabulka.zakladni_sloupce else "obce"
+    db = otevri_databazi(Path(cesta))
+    try:
+        with db:
+            id_voleb = _id_voleb(db, list(dict.fromkeys(kody_voleb)))
+            id_stran = np.array(_id_stran(db, tabulka.strany), dtype=np.int64)
+            sloupce = {
+                nazev: _hodnoty_sloupce(tabulka, zdroj, "" if nazev == "okrsek" else None)
+                for nazev, zdroj in SLOUPCE_OBCI.items()
+            }
+            klice = [
+                (id_voleb[kody_voleb[i]], uroven, sloupce["kod"][i], sloupce["okrsek"][i])
+                for i in range(pocet)
+            ]
+
+            db.executemany(
+                f"INSERT INTO obce (volby_id, uroven, {', '.join(SLOUPCE_OBCI)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(SLOUPCE_OBCI))}) "
+                f"ON CONFLICT(volby_id, uroven, kod, okrsek) DO UPDATE SET "
+                + ", ".join(f"{nazev} = excluded.{nazev}" for nazev in SLOUPCE_OBCI
+                            if nazev not in ("kod", "okrsek")),
+                ((klic[0], uroven, *(sloupce[nazev][i] for nazev in SLOUPCE_OBCI))
+                 for i, klic in enumerate(klice))
+            )
+            # Hlasy přepsaných obcí se nejdřív smažou, aby nezůstaly strany,
+            # které v nové verzi nemají žádné hlasy
+            db.executemany(
+                "DELETE FROM hlasy WHERE volby_id = ? AND uroven = ? AND kod = ? AND okrsek = ?",
+                klice
+            )
+            # Ukládají se jen nenulové hlasy (chybějící záznam = 0 hlasů)
+            radky, strany = np.nonzero(tabulka.matice_hlasu)
+            hodnoty = tabulka.matice_hlasu[radky, strany].tolist()
+            db.executemany(
+                "INSERT INTO hlasy (volby_id, uroven, kod, okrsek, strana_id, hlasy) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((*klice[r], s, h) for r, s, h in
+                 zip(radky.tolist(), id_stran[strany].tolist(), hodnoty))
+            )
+    finally:
+        db.close()
+    return pocet
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Průběžný deník (checkpoint) zpracovaných stránek.
+Každý výsledek (obec, zahraniční okrsek, seznam obcí okresu) se hned po
+zpracování připíše jako jeden řádek JSON na konec souboru a předá
+operačnímu systému, takže pád skriptu o něj nepřipraví. Na disk se deník
+ukládá (fsync) po dávkách - každých DAVKA_ULOZENI záznamů nebo
+INTERVAL_ULOZENI sekund a při zavření; při výpadku systému tak přijde
+nanejvýš o poslední dávku. Když běh spadne, lze ho spustit znovu
+s parametrem --resume a vše, co už v deníku je, se znovu nestahuje ani
+neparsuje. Do paměti se při pokračování načítají jen pozice záznamů
+v souboru, samotné výsledky se čtou z disku až ve chvíli, kdy jsou potřeba.
+
+Běh bez --resume existující deník nepřepíše: přejmenuje ho (přidá časové
+razítko) a začne nový, takže omylem spuštěný běh nepřipraví o hotovou práci.
+"""
+
+import json           # Formát záznamů deníku (vestavěná v Pythonu)
+import os             # Zápis na disk a mazání souboru (vestavěná v Pythonu)
+import threading      # Zámek pro zápis z více vláken (vestavěná v Pythonu)
+import time           # Interval ukládání na disk (vestavěná v Pythonu)
+from datetime import datetime  # Časové razítko odloženého deníku
+from pathlib import Path
+
+# Po kolika záznamech se deník uloží na disk (fsync)
+DAVKA_ULOZENI = 100
+# Nejdelší doba (v sekundách) mezi dvěma uloženími na disk
+INTERVAL_ULOZENI = 2.0
+
+
+class Denik:
+    """
+    Deník zpracovaných položek uložený jako JSONL soubor.
+
+    Parametry:
+        cesta (str nebo Path): Cesta k souboru deníku.
+        pokracovat (bool): True = navázat na existující deník,
+                           False = začít s prázdným deníkem (neprázdný
+                           existující deník se odloží, viz _odloz).
+    """
+
+    def __init__(self, cesta, pokracovat=False):
+        self.cesta = Path(cesta)
+        self._zamek = threading.Lock()
+        self._pozice = {}
+        self._neulozeno = 0          # Záznamy zapsané od posledního fsync
+        self._ulozeno = time.monotonic()
+        if pokracovat and self.cesta.exists():
+            self._nacti_pozice()
+        else:
+            if self.cesta.exists() and self.cesta.stat().st_size:
+                self._odloz()
+            self.cesta.write_text("", encoding="utf-8")
+        self._zapis = open(self.cesta, "ab")
+        self._cteni = open(self.cesta, "rb")
+
+    def _odloz(self):
+        """
+        Přejmenuje existující deník (např. denik_okres_5.20250101_120000.jsonl),
+        aby ho nový běh bez --resume nepřepsal.
+        """
+        razitko = datetime.now().strftime("%Y%m%d_%H%M%S")
+        odlozeny = self.cesta.with_name(f"{self.cesta.stem}.{razitko}{self.cesta.suffix}")
+        self.cesta.rename(odlozeny)
+        print(f"Deník {self.cesta.name} z předchozího běhu (bez --resume) "
+              f"byl přejmenován na {odlozeny.name}.")
+
+    def _nacti_pozice(self):
+        """
+        Projde existující deník a zapamatuje si, kde začíná záznam pro každý
+        klíč. Poslední řádek může být po pádu useknutý - takový se ignoruje
+        a soubor se na jeho začátku zkrátí.
+        """
+        platna_delka = 0
+        with open(self.cesta, "rb") as soubor:
+            for radek in soubor:
+                try:
+                    klic = json.loads(radek)["klic"]
+                except (ValueError, KeyError):
+                    break
+                if not radek.endswith(b"\n"):
+                    break
+                self._pozice[klic] = platna_delka
+                platna_delka += len(radek)
+        with open(self.cesta, "r+b") as soubor:
+            soubor.truncate(platna_delka)
+        print(f"Deník {self.cesta.name}: {len(self._pozice)} položek už je hotových.")
+
+    def je_hotovo(self, klic):
+        """
+        Zjistí, zda je položka s daným klíčem už v deníku.
+        """
+        return klic in self._pozice
+
+    def vysledek(self, klic):
+        """
+        Načte z deníku uložený výsledek položky.
+        """
+        with self._zamek:
+            self._cteni.seek(self._pozice[klic])
+            return json.loads(self._cteni.readline())["vysledek"]
+
+    def zapis(self, klic, vysledek):
+        """
+        Připíše výsledek položky na konec deníku; na disk se uloží s dávkou.
+
+        Parametry:
+            klic (str): Jednoznačný klíč položky (např. URL detailní stránky).
+            vysledek: Výsledek zpracování (musí jít převést do JSON).
+        """
+        radek = json.dumps({"klic": klic, "vysledek": vysledek}, ensure_ascii=False)
+        with self._zamek:
+            pozice = self._zapis.tell()
+            self._zapis.write(radek.encode("utf-8") + b"\n")
+            # Záznam musí být v souboru hned - čte se z něj přes _cteni
+            self._zapis.flush()
+            self._pozice[klic] = pozice
+            self._neulozeno += 1
+            if (self._neulozeno >= DAVKA_ULOZENI
+                    or time.monotonic() - self._ulozeno >= INTERVAL_ULOZENI):
+                self._uloz()
+
+    def _uloz(self):
+        """
+        Uloží zapsané záznamy na disk (volá se se zámkem).
+        """
+        os.fsync(self._zapis.fileno())
+        self._neulozeno = 0
+        self._ulozeno = time.monotonic()
+
+    def zavri(self, smazat=False):
+        """
+        Uloží zbývající záznamy na disk a zavře deník; po úspěšném
+        dokončení běhu ho lze rovnou smazat.
+        """
+        with self._zamek:
+            if self._neulozeno and not smazat:
+                self._uloz()
+        self._zapis.close()
+        self._cteni.close()
+        if smazat:
+            self.cesta.unlink(missing_ok=True)
+
+
+def zpracuj_s_denikem(polozky, klic, denik, zpracovani):
+    """
+    Generátor: vrací výsledky pro všechny položky v jejich pořadí. Položky,
+    které už jsou v deníku, se vezmou z něj; ostatní se předají funkci
+    'zpracovani' a jejich výsledky se hned zapíšou do deníku.
+
+    Parametry:
+        polozky (list): Položky ke zpracování.
+        klic (callable): Funkce(polozka) -> klíč položky v deníku.
+        denik (Denik nebo None): Deník; při None se jen zavolá 'zpracovani'.
+        zpracovani (callable): Funkce(seznam položek) -> iterátor výsledků
+                               ve stejném pořadí (např. stahni_a_zpracuj_postupne).
+
+    Vrací:
+        generator: Výsledky v pořadí položek. Výsledky None (stránku se
+                   nepodařilo stáhnout) se do deníku nezapisují.
+    """
+    polozky = list(polozky)
+    if denik is None:
+        yield from zpracovani(polozky)
+        return
+
+    # Seznam hotových položek určíme předem, protože deník se během
+    # zpracování doplňuje
+    hotovo = [denik.je_hotovo(klic(polozka)) for polozka in polozky]
+    nove = iter(zpracovani([p for p, h in zip(polozky, hotovo) if not h]))
+    for polozka, je_hotova in zip(polozky, hotovo):
+        if je_hotova:
+            yield denik.vysledek(klic(polozka))
+            continue
+        vysledek = next(nove)
+        if vysledek is not None:
+            denik.zapis(klic(polozka), vysledek)
+        yield vysledek
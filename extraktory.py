@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Předkompilované extraktory pro stránky volby.cz se známým rozložením.
+Obecné zpracování (BeautifulSoup) na každé stránce znovu prochází strom:
+hledá buňky podle tříd a regulárních výrazů, na každou buňku volá
+get_text a u zahraničních okrsků pokaždé sestavuje seznam hlaviček.
+Rozložení stránek je ale pro každý typ stránky (ps3, ps32, ps311, ps36,
+ps361) pevné, proto se pro každý typ jednou sestaví plán extrakce -
+předkompilované výrazy XPath (lxml) a pevné pozice buněk - a ten se pak
+používá pro všechny stránky daného typu. Stránka se naparsuje přímo do
+stromu lxml (v C), bez stavby stromu BeautifulSoup.
+
+Před extrakcí plán ověří, že stránka má očekávané rozložení (počty buněk
+a jejich hlavičky 'headers'). Pokud se rozložení změnilo, extraktor vrátí
+None a volající použije obecné zpracování; upozornění se vypíše jednou
+za typ stránky. Bez knihovny lxml (nebo s proměnnou prostředí
+VOLBY_EXTRAKTORY=0) se používá vždy obecné zpracování.
+"""
+
+import os             # Čtení proměnných prostředí (vestavěná v Pythonu)
+import threading      # Zámek pro jednorázové sestavení plánů (vestavěná v Pythonu)
+
+from parsovani import na_cislo, na_hodnotu
+
+try:
+    from lxml import etree  # Volitelná knihovna: parsování a XPath v C
+except ImportError:
+    etree = None
+
+# Zda se mají předkompilované extraktory používat (jinak obecné zpracování)
+POVOLENO = os.environ.get("VOLBY_EXTRAKTORY", "1") != "0"
+
+# XPath podmínka pro element s třídou 'table' (jako class_="table" v BeautifulSoup)
+_TRIDA_TABLE = "contains(concat(' ', normalize-space(@class), ' '), ' table ')"
+
+# Sestavené plány (typ stránky -> dict předkompilovaných výrazů)
+_plany = {}
+_zamek = threading.Lock()
+# Typy stránek, u kterých už se vypsalo upozornění na změnu rozložení
+_nahlaseno = set()
+
+
+class NeocekavaneRozlozeni(ValueError):
+    """
+    Stránka neodpovídá plánu extrakce (změnilo se rozložení stránky).
+    """
+
+
+def je_dostupne():
+    """
+    True, pokud lze předkompilované extraktory použít (lxml je nainstalováno
+    a extraktory nejsou vypnuté).
+    """
+    return POVOLENO and etree is not None
+
+
+def _sestav_plan(typ):
+    """
+    Sestaví (zkompiluje) výrazy XPath pro jeden typ stránky.
+    """
+    x = etree.XPath
+    spolecne = {
+        "tabulky": x(f"//table[{_TRIDA_TABLE}]"),
+        "radky": x(".//tr"),
+        "td": x("./td"),
+        "th": x(".//th"),
+        "odkaz": x("string((.//a/@href)[1])", smart_strings=False),
+    }
+    if typ == "ps3":
+        spolecne.update({
+            "kraje": x("//h3[contains(concat(' ', normalize-space(@class), ' '), ' kraj ')]"),
+            "tabulka_kraje": x(f"following::table[{_TRIDA_TABLE}][1]"),
+        })
+    elif typ == "ps32":
+        spolecne["odkaz_okrsku"] = x("string((.//a[contains(@href, 'ps34?')]/@href)[1])",
+                                     smart_strings=False)
+    return spolecne
+
+
+def _plan(typ):
+    """
+    Vrátí plán pro typ stránky; sestaví se jen při prvním použití v procesu.
+    """
+    plan = _plany.get(typ)
+    if plan is None:
+        with _zamek:
+            plan = _plany.get(typ)
+            if plan is None:
+                plan = _plany[typ] = _sestav_plan(typ)
+    return plan
+
+
+def _text(element):
+    """
+    Text elementu jako BeautifulSoup get_text(strip=True): každý kousek textu
+    oříznutý a spojený bez oddělovače.
+    """
+    return "".join(kus.strip() for kus in element.itertext())
+
+
+def _over(podminka, popis):
+    """
+    Vyvolá NeocekavaneRozlozeni, pokud podmínka neplatí.
+    """
+    if not podminka:
+        raise NeocekavaneRozlozeni(popis)
+
+
+def _over_hlavicky(bunka, konec, popis):
+    """
+    Ověří, že atribut 'headers' buňky končí očekávaným identifikátorem
+    (např. 'sb2' u 't1sa1 t1sb2').
+    """
+    _over((bunka.get("headers") or "").endswith(konec), popis)
+
+
+def extrahuj(typ, html):
+    """
+    Vytáhne data ze stránky předkompilovaným plánem.
+
+    Parametry:
+        typ (str): Typ stránky ('ps3', 'ps32', 'ps311', 'ps36', 'ps361').
+        html (str): Obsah stránky.
+
+    Vrací:
+        Data ve tvaru podle typu stránky (viz funkce _extrahuj_<typ>), nebo
+        None, pokud extraktory nelze použít nebo stránka neodpovídá plánu -
+        pak má volající použít obecné zpracování.
+    """
+    if not je_dostupne() or not html:
+        return None
+    plan = _plan(typ)
+    try:
+        koren = etree.HTML(html)
+        if koren is None:
+            raise NeocekavaneRozlozeni("prázdná stránka")
+        return _EXTRAKTORY[typ](plan, koren)
+    except (NeocekavaneRozlozeni, ValueError) as chyba:
+        if typ not in _nahlaseno:
+            _nahlaseno.add(typ)
+            print(f"Stránka {typ} má neočekávané rozložení ({chyba}), "
+                  f"použije se obecné zpracování.")
+        return None
+
+
+def _hlasy_stran(plan, tabulky, jen_cisla):
+    """
+    Dvojice (název strany, hlasy) z tabulek stran: dva řádky hlavičky,
+    pak řádky s buňkami číslo, název, hlasy celkem, hlasy v %, ...
+    """
+    for tabulka in tabulky:
+        radky = plan["radky"](tabulka)
+        _over(len(radky) >= 2 and not plan["td"](radky[0]) and not plan["td"](radky[1]),
+              "hlavička tabulky stran")
+        for radek in radky[2:]:
+            bunky = plan["td"](radek)
+            _over(len(bunky) >= 3, "počet buněk strany")
+            _over_hlavicky(bunky[1], "sb2", "buňka názvu strany")
+            _over_hlavicky(bunky[2], "sb3", "buňka hlasů strany")
+            nazev = _text(bunky[1])
+            hlasy = _text(bunky[2])
+            if jen_cisla and not "".join(hlasy.split()).isdigit():
+                continue
+            yield nazev, hlasy
+
+
+def _extrahuj_ps311(plan, koren):
+    """
+    Stránka obce (nebo okrsku): slovník jako volby_okresy.zpracuj_data_obce
+    bez čísla a názvu obce - 'Voliči celkem', 'Odevzdané obálky',
+    'Platné hlasy' a hlasy stran (int).
+    """
+    tabulky = plan["tabulky"](koren)
+    _over(tabulky, "chybí tabulky")
+    data = {}
+    radky = plan["radky"](tabulky[0])
+    _over(radky, "prázdná první tabulka")
+    bunky = plan["td"](radky[-1])
+    # Stránka obce má navíc 3 sloupce o okrscích, stránka okrsku ne
+    _over(len(bunky) in (6, 9), "počet buněk souhrnu")
+    posun = 3 if len(bunky) == 9 else 0
+    for pozice, nazev, hlavicka in ((0, "Voliči celkem", "sa2"),
+                                    (3, "Odevzdané obálky", "sa5"),
+                                    (4, "Platné hlasy", "sa6")):
+        _over_hlavicky(bunky[posun + pozice], hlavicka, f"buňka '{nazev}'")
+        data[nazev] = na_cislo(_text(bunky[posun + pozice]))
+    for nazev, hlasy in _hlasy_stran(plan, tabulky[1:], jen_cisla=False):
+        if nazev.lower() != "název" and nazev:
+            data[nazev] = na_cislo(hlasy)
+    return data
+
+
+def _extrahuj_ps361(plan, koren):
+    """
+    Stránka zahraničního okrsku: slovník jako Zahranici.zpracuj_data_z_odkazu.
+    """
+    tabulky = plan["tabulky"](koren)
+    _over(len(tabulky) >= 3, "méně než 3 tabulky")
+    hlavicky = [" ".join(kus.strip() for kus in th.itertext() if kus.strip())
+                for th in plan["th"](tabulky[0])]
+    table_1_data = []
+    for radek in plan["radky"](tabulky[0])[1:]:
+        bunky = plan["td"](radek)
+        _over(len(bunky) <= len(hlavicky), "počet buněk souhrnu")
+        table_1_data.append({
+            hlavicky[i]: na_hodnotu(_text(bunka)) for i, bunka in enumerate(bunky)
+        })
+    table_2_3_data = {}
+    for strana, hlasy in _hlasy_stran(plan, tabulky[1:3], jen_cisla=True):
+        table_2_3_data[strana] = table_2_3_data.get(strana, 0) + na_cislo(hlasy)
+    return {"table_1": table_1_data, "table_2_3": table_2_3_data}
+
+
+def _extrahuj_ps3(plan, koren):
+    """
+    Seznam okresů: trojice (kraj, název okresu, odkaz na seznam obcí ps32)
+    v pořadí na stránce.
+    """
+    okresy = []
+    for kraj in plan["kraje"](koren):
+        nazev_kraje = "".join(kraj.itertext()).strip()
+        tabulka = plan["tabulka_kraje"](kraj)
+        if not tabulka:
+            continue
+        for radek in plan["radky"](tabulka[0]):
+            bunky = plan["td"](radek)
+            if not bunky:
+                continue            # Řádek hlavičky
+            _over(len(bunky) == 4, "počet buněk okresu")
+            _over_hlavicky(bunky[1], "sb2", "buňka názvu okresu")
+            _over_hlavicky(bunky[3], "sa3", "buňka výběru obce")
+            odkaz = plan["odkaz"](bunky[3])
+            _over(odkaz, "chybí odkaz na obce okresu")
+            okresy.append((nazev_kraje, "".join(bunky[1].itertext()).strip(), odkaz))
+    return okresy
+
+
+def _extrahuj_ps32(plan, koren):
+    """
+    Seznam obcí okresu: čtveřice (číslo obce, název, odkaz na stránku obce,
+    odkaz na výběr okrsku nebo None).
+    """
+    obce = []
+    for tabulka in plan["tabulky"](koren):
+        for radek in plan["radky"](tabulka):
+            bunky = plan["td"](radek)
+            if not bunky:
+                continue            # Řádek hlavičky
+            _over(len(bunky) == 3, "počet buněk obce")
+            _over("cislo" in (bunky[0].get("class") or "").split(), "buňka čísla obce")
+            _over("overflow_name" in (bunky[1].get("class") or "").split(), "buňka názvu obce")
+            odkaz = plan["odkaz"](bunky[0])
+            if not odkaz:
+                continue
+            obce.append((
+                "".join(bunky[0].itertext()).strip(),
+                "".join(bunky[1].itertext()).strip(),
+                odkaz,
+                plan["odkaz_okrsku"](radek) or None,
+            ))
+    return obce
+
+
+def _extrahuj_ps36(plan, koren):
+    """
+    Tabulka 1 zahraničních okrsků: pro každý řádek (kromě hlavičky) seznam
+    dvojic (text buňky, první odkaz v buňce nebo None).
+    """
+    tabulky = plan["tabulky"](koren)
+    _over(tabulky, "chybí tabulka")
+    radky = []
+    for radek in plan["radky"](tabulky[0])[1:]:
+        bunky = plan["td"](radek)
+        _over(2 <= len(bunky) <= 4, "počet buněk okrsku")
+        radky.append([(_text(bunka), plan["odkaz"](bunka) or None) for bunka in bunky])
+    return radky
+
+
+_EXTRAKTORY = {
+    "ps3": _extrahuj_ps3,
+    "ps32": _extrahuj_ps32,
+    "ps311": _extrahuj_ps311,
+    "ps36": _extrahuj_ps36,
+    "ps361": _extrahuj_ps361,
+}
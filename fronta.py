@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Sdílená fronta úloh v SQLite databázi pro stahování ve více procesech
+nebo na více počítačích (parametry --fronta a --pracovnik).
+Koordinátor do fronty vloží úlohy (stránky obcí a zahraničních okrsků),
+libovolný počet pracovníků si je po dávkách "půjčuje", zpracuje je
+a výsledek zapíše zpět. Každá půjčka má omezenou platnost: úloha, jejíž
+pracovník spadl nebo se odmlčel, se po vypršení půjčky automaticky vrátí
+do fronty a převezme ji jiný pracovník. Úloha, která selže, se vrátí
+do fronty hned; po MAX_POKUSU neúspěšných pokusech se označí jako chybná.
+
+Stavy úloh:
+    ceka       - čeká na zpracování
+    zpracovava - půjčená pracovníkovi (do času 'platnost_do')
+    hotovo     - zpracovaná, výsledek je ve sloupci 'vysledek'
+    chyba      - ani po MAX_POKUSU pokusech se nepodařilo zpracovat
+
+Frontu lze sdílet mezi procesy jednoho počítače, případně přes sdílený
+disk; zápisy jsou krátké transakce a databáze běží v režimu WAL. Půjčování
+úloh nevyžaduje novější SQLite (bez UPDATE ... RETURNING).
+"""
+
+import json           # Data a výsledky úloh (vestavěná v Pythonu)
+import sqlite3        # Úložiště fronty (vestavěná v Pythonu)
+import threading      # Prodlužování půjček na pozadí (vestavěná v Pythonu)
+import time           # Platnost půjček (vestavěná v Pythonu)
+from pathlib import Path
+
+# Na jak dlouho (v sekundách) si pracovník úlohu půjčí
+DOBA_PUJCKY = 120
+# Kolikrát se úloha zkusí, než se označí jako chybná
+MAX_POKUSU = 5
+# Jak dlouho (v sekundách) čekat na zámek databáze, když do ní zrovna
+# zapisuje jiný pracovník
+CEKANI_NA_ZAMEK = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ulohy (
+    id INTEGER PRIMARY KEY,
+    klic TEXT NOT NULL UNIQUE,
+    typ TEXT NOT NULL,
+    data TEXT NOT NULL,
+    stav TEXT NOT NULL DEFAULT 'ceka',
+    pracovnik TEXT,
+    platnost_do REAL,
+    pokusy INTEGER NOT NULL DEFAULT 0,
+    vysledek TEXT,
+    chyba TEXT
+);
+CREATE INDEX IF NOT EXISTS ulohy_stav ON ulohy (stav, id);
+"""
+
+
+class Fronta:
+    """
+    Fronta úloh uložená v SQLite databázi. Jedna instance patří jednomu
+    procesu (a vláknu, které ji vytvořilo).
+
+    Parametry:
+        cesta (str nebo Path): Cesta k souboru fronty (při neexistenci se založí).
+        doba_pujcky (float): Platnost půjčky úlohy v sekundách.
+    """
+
+    def __init__(self, cesta, doba_pujcky=DOBA_PUJCKY):
+        self.cesta = Path(cesta)
+        self.doba_pujcky = doba_pujcky
+        self._db = sqlite3.connect(str(self.cesta), timeout=CEKANI_NA_ZAMEK)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def pridej(self, ulohy):
+        """
+        Vloží úlohy do fronty. Úlohy, které už ve frontě jsou (stejný klíč),
+        se přeskočí - opakované naplánování tak navazuje na předchozí běh.
+
+        Parametry:
+            ulohy (iterable): Trojice (klíč, typ, data), data musí jít
+                              převést do JSON.
+
+        Vrací:
+            int: Počet nově vložených úloh.
+        """
+        with self._db:
+            pred = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO ulohy (klic, typ, data) VALUES (?, ?, ?)",
+                ((klic, typ, json.dumps(data, ensure_ascii=False)) for klic, typ, data in ulohy)
+            )
+            return self._db.total_changes - pred
+
+    def vezmi(self, pracovnik, pocet):
+        """
+        Půjčí si až 'pocet' úloh: čekající úlohy a úlohy, jejichž půjčka
+        vypršela. Úlohy s vyčerpanými pokusy se označí jako chybné.
+
+        Parametry:
+            pracovnik (str): Identifikace pracovníka (počítač a proces).
+            pocet (int): Nejvyšší počet půjčených úloh.
+
+        Vrací:
+            list: Slovníky s klíči 'id', 'klic', 'typ', 'data' (v pořadí vložení).
+        """
+        ted = time.time()
+        with self._db:
+            # Zámek pro zápis hned na začátku: mezi výběrem úloh a jejich
+            # půjčením je nemůže převzít jiný pracovník
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                "UPDATE ulohy SET stav = 'chyba', chyba = 'vypršela půjčka' "
+                "WHERE stav = 'zpracovava' AND platnost_do < ? AND pokusy >= ?",
+                (ted, MAX_POKUSU)
+            )
+            radky = self._db.execute(
+                "SELECT id, klic, typ, data FROM ulohy WHERE stav = 'ceka' "
+                "OR (stav = 'zpracovava' AND platnost_do < ?) ORDER BY id LIMIT ?",
+                (ted, pocet)
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE ulohy SET stav = 'zpracovava', pracovnik = ?, platnost_do = ?, "
+                "pokusy = pokusy + 1 WHERE id = ?",
+                ((pracovnik, ted + self.doba_pujcky, radek[0]) for radek in radky)
+            )
+        return [
+            {"id": id_, "klic": klic, "typ": typ, "data": json.loads(data)}
+            for id_, klic, typ, data in radky
+        ]
+
+    def dokonci(self, uloha, pracovnik, vysledek):
+        """
+        Uloží výsledek úlohy. Pokud pracovníkovi mezitím půjčka vypršela
+        a úlohu převzal někdo jiný, výsledek se zahodí.
+
+        Vrací:
+            bool: True, pokud byl výsledek uložen.
+        """
+        with self._db:
+            kurzor = self._db.execute(
+                "UPDATE ulohy SET stav = 'hotovo', vysledek = ?, platnost_do = NULL "
+                "WHERE id = ? AND stav = 'zpracovava' AND pracovnik = ?",
+                (json.dumps(vysledek, ensure_ascii=False), uloha["id"], pracovnik)
+            )
+        return kurzor.rowcount == 1
+
+    def prodluz(self, ulohy, pracovnik):
+        """
+        Prodlouží půjčku úloh, které pracovník ještě zpracovává (např. čekají
+        ve stahování za pomalejšími stránkami), aby je nepřevzal jiný pracovník.
+
+        Parametry:
+            ulohy (iterable): Úlohy z metody vezmi.
+            pracovnik (str): Identifikace pracovníka.
+        """
+        platnost_do = time.time() + self.doba_pujcky
+        with self._db:
+            self._db.executemany(
+                "UPDATE ulohy SET platnost_do = ? "
+                "WHERE id = ? AND stav = 'zpracovava' AND pracovnik = ?",
+                ((platnost_do, uloha["id"], pracovnik) for uloha in ulohy)
+            )
+
+    def vrat(self, uloha, pracovnik, chyba):
+        """
+        Vrátí neúspěšnou úlohu do fronty (po MAX_POKUSU pokusech ji označí
+        jako chybnou).
+
+        Parametry:
+            uloha (dict): Úloha z metody vezmi.
+            pracovnik (str): Identifikace pracovníka.
+            chyba (str): Popis chyby.
+        """
+        with self._db:
+            self._db.execute(
+                "UPDATE ulohy SET stav = CASE WHEN pokusy >= ? THEN 'chyba' ELSE 'ceka' END, "
+                "chyba = ?, platnost_do = NULL "
+                "WHERE id = ? AND stav = 'zpracovava' AND pracovnik = ?",
+                (MAX_POKUSU, chyba, uloha["id"], pracovnik)
+            )
+
+    def stav(self):
+        """
+        Vrátí počty úloh podle stavu.
+
+        Vrací:
+            dict: stav -> počet úloh (chybějící stav = 0).
+        """
+        return dict(self._db.execute("SELECT stav, COUNT(*) FROM ulohy GROUP BY stav"))
+
+    def vysledky(self, klice):
+        """
+        Vrátí výsledky zadaných úloh v pořadí klíčů.
+
+        Parametry:
+            klice (iterable): Klíče úloh.
+
+        Vrací:
+            generator: Výsledek každé úlohy (None u nedokončené nebo chybné).
+        """
+        for klic in klice:
+            radek = self._db.execute(
+                "SELECT vysledek FROM ulohy WHERE klic = ? AND stav = 'hotovo'", (klic,)
+            ).fetchone()
+            yield json.loads(radek[0]) if radek else None
+
+    def zavri(self):
+        """
+        Zavře spojení s databází fronty.
+        """
+        self._db.close()
+
+
+class DrzenePujcky:
+    """
+    Úlohy, které pracovník právě zpracovává, a vlákno, které jim každou
+    třetinu doby půjčky prodlouží půjčku - i když se dlouho nedokončí žádná
+    úloha (pomalý server, opakované pokusy). Vlákno má vlastní spojení
+    s databází, protože spojení SQLite patří vláknu, které ho otevřelo.
+
+    Parametry:
+        fronta (Fronta): Fronta, ze které jsou úlohy půjčené.
+        pracovnik (str): Identifikace pracovníka.
+
+    Použití:
+        with DrzenePujcky(fronta, pracovnik) as pujcky:
+            pujcky.drz(uloha)     # po vezmi
+            pujcky.pust(uloha)    # po dokonci nebo vrat
+    """
+
+    def __init__(self, fronta, pracovnik):
+        self.fronta = fronta
+        self.pracovnik = pracovnik
+        self._ulohy = {}             # id -> úloha
+        self._zamek = threading.Lock()
+        self._konec = threading.Event()
+        self._vlakno = threading.Thread(target=self._prodluzuj, daemon=True)
+
+    def __enter__(self):
+        self._vlakno.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._konec.set()
+        self._vlakno.join()
+
+    def drz(self, uloha):
+        """
+        Začne prodlužovat půjčku úlohy.
+        """
+        with self._zamek:
+            self._ulohy[uloha["id"]] = uloha
+
+    def pust(self, uloha):
+        """
+        Přestane prodlužovat půjčku úlohy.
+        """
+        with self._zamek:
+            self._ulohy.pop(uloha["id"], None)
+
+    def _prodluzuj(self):
+        fronta = Fronta(self.fronta.cesta, self.fronta.doba_pujcky)
+        try:
+            while not self._konec.wait(self.fronta.doba_pujcky / 3):
+                with self._zamek:
+                    ulohy = list(self._ulohy.values())
+                if not ulohy:
+                    continue
+                try:
+                    fronta.prodluz(ulohy, self.pracovnik)
+                except sqlite3.Error as e:
+                    # Další pokus při příštím prodloužení, půjčka ještě platí
+                    print(f"Prodloužení půjček se nepodařilo: {e}")
+        finally:
+            fronta.zavri()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Společný HTTP klient pro skripty volby_okresy.py a Zahranici.py.
+Všechny požadavky na volby.cz jdou přes jednu sdílenou session, takže se
+spojení (včetně TLS handshake) navazuje jen jednou za běh a dál se opakovaně
+používá (keep-alive). Klient si říká o komprimované odpovědi (gzip, případně
+brotli), každý požadavek má timeout a dočasné chyby serveru (5xx, 429,
+výpadek spojení) se opakují s exponenciálně rostoucí prodlevou.
+Počet souběžných požadavků a požadavků za sekundu na každý server řídí
+regulátor (viz regulace.py), který se sám přizpůsobuje zátěži serveru.
+Volitelně lze zapnout HTTP/2 (vyžaduje knihovnu httpx[http2]).
+Odpovědi se ukládají do trvalé mezipaměti (viz mezipamet.py); v režimu
+"jen mezipaměť" klient vůbec nepřistupuje k síti. Použité stránky lze
+zároveň ukládat do snímku, případně je naopak číst ze snímku (snimek.py).
+"""
+
+import os                   # Čtení proměnných prostředí (vestavěná v Pythonu)
+import threading            # Zámek pro bezpečné vytvoření session z více vláken
+import time                 # Prodleva mezi opakovanými pokusy
+from email.utils import parsedate_to_datetime   # Retry-After ve formě data
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import requests             # Knihovna pro HTTP požadavky
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from stahovani import VYCHOZI_POCET_VLAKEN
+from mezipamet import Mezipamet, ChybiVMezipameti
+from snimek import ChybiVeSnimku
+from profilovani import PROFIL   # Měření požadavků (--profile)
+from regulace import Regulator   # Řízení zátěže serveru (AIMD)
+
+# Timeout (v sekundách) pro každý požadavek, pokud volající nezadá jiný
+VYCHOZI_TIMEOUT = 10
+# Kolikrát celkem se požadavek zkusí, než se chyba předá volajícímu
+POCET_POKUSU = 4
+# Prodleva před prvním opakováním; každé další se zdvojnásobí
+ZAKLADNI_PRODLEVA = 0.5
+# Nejdelší prodleva mezi dvěma pokusy (i při hlavičce Retry-After)
+MAX_PRODLEVA = 30
+# Stavové kódy, u kterých má smysl požadavek zopakovat
+OPAKOVATELNE_STAVY = {429, 500, 502, 503, 504}
+
+# Hlavičky posílané s každým požadavkem. make_headers přidá "br" jen tehdy,
+# když je nainstalována knihovna pro dekompresi brotli.
+HLAVICKY = {
+    "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
+}
+
+_nastaveni = {
+    "http2": os.environ.get("VOLBY_HTTP2") == "1",
+    "pocet_spojeni": max(10, VYCHOZI_POCET_VLAKEN),
+    # Mezipaměť je ve výchozím stavu zapnutá; VOLBY_MEZIPAMET=0 ji vypne
+    "mezipamet": os.environ.get("VOLBY_MEZIPAMET", "1") != "0",
+    # VOLBY_JEN_MEZIPAMET=1 zapne režim bez přístupu k síti
+    "jen_mezipamet": os.environ.get("VOLBY_JEN_MEZIPAMET") == "1",
+    # Regulace zátěže je ve výchozím stavu zapnutá; VOLBY_REGULACE=0 ji vypne
+    "regulace": os.environ.get("VOLBY_REGULACE", "1") != "0",
+    # Snímek (Snimek), do kterého se ukládají použité stránky (--snimek)
+    "snimek": None,
+    # Snímek (Snimek), ze kterého se stránky čtou místo sítě (--ze-snimku)
+    "ze_snimku": None,
+}
+_session = None
+_mezipamet = None
+_regulatory = {}            # host -> Regulator (naučené limity platí celý běh)
+_zamek = threading.Lock()
+
+
+def nastav_klienta(http2=None, pocet_spojeni=None, mezipamet=None,
+                   jen_mezipamet=None, regulace=None, snimek=None, ze_snimku=None):
+    """
+    Změní nastavení sdíleného klienta. Případná existující session se zavře
+    a při dalším požadavku se vytvoří nová s novým nastavením.
+
+    Parametry:
+        http2 (bool): Zda používat HTTP/2 (pokud je k dispozici httpx).
+        pocet_spojeni (int): Velikost fondu spojení na jeden server.
+        mezipamet (bool nebo Mezipamet): Zapne/vypne mezipaměť, případně
+                                         předá vlastní instanci mezipaměti.
+        jen_mezipamet (bool): Režim bez sítě - stránky se berou jen
+                              z mezipaměti.
+        regulace (bool): Zapne/vypne regulaci zátěže serveru; změna
+                         zároveň zahodí dosud naučené limity.
+        snimek (Snimek): Snímek otevřený pro zápis, do kterého se uloží
+                         každá použitá stránka; False = přestat ukládat.
+        ze_snimku (Snimek): Snímek otevřený pro čtení; stránky se berou
+                            jen z něj (chybějící vyvolají ChybiVeSnimku).
+                            False = přestat číst.
+                            Snímky zavírá ten, kdo je otevřel.
+    """
+    zavri_klienta()
+    if http2 is not None:
+        _nastaveni["http2"] = http2
+    if pocet_spojeni is not None:
+        _nastaveni["pocet_spojeni"] = pocet_spojeni
+    if mezipamet is not None:
+        _nastaveni["mezipamet"] = mezipamet
+    if jen_mezipamet is not None:
+        _nastaveni["jen_mezipamet"] = jen_mezipamet
+    if regulace is not None or pocet_spojeni is not None:
+        with _zamek:
+            _regulatory.clear()
+    if regulace is not None:
+        _nastaveni["regulace"] = regulace
+    if snimek is not None:
+        _nastaveni["snimek"] = None if snimek is False else snimek
+    if ze_snimku is not None:
+        _nastaveni["ze_snimku"] = None if ze_snimku is False else ze_snimku
+
+
+def nastaveni_klienta():
+    """
+    Vrátí kopii aktuálního nastavení klienta, např. pro pozdější obnovení
+    přes nastav_klienta(**nastaveni) po dočasné změně.
+
+    Vrací:
+        dict: Klíče odpovídají parametrům funkce nastav_klienta.
+    """
+    return dict(_nastaveni)
+
+
+def zavri_klienta():
+    """
+    Zavře sdílenou session a mezipaměť a uvolní všechna otevřená spojení.
+    """
+    global _session, _mezipamet
+    with _zamek:
+        if _session is not None:
+            _session.close()
+            _session = None
+        if _mezipamet is not None:
+            # Instanci předanou zvenku zavírá ten, kdo ji vytvořil
+            if _nastaveni["mezipamet"] is True:
+                _mezipamet.zavri()
+            _mezipamet = None
+
+
+def _vytvor_session():
+    """
+    Vytvoří novou session podle aktuálního nastavení.
+
+    Vrací:
+        requests.Session nebo httpx.Client: Session se sdíleným fondem spojení.
+    """
+    if _nastaveni["http2"]:
+        try:
+            import httpx   # Volitelná knihovna, jen pro HTTP/2
+            limity = httpx.Limits(
+                max_connections=_nastaveni["pocet_spojeni"],
+                max_keepalive_connections=_nastaveni["pocet_spojeni"]
+            )
+            return httpx.Client(http2=True, headers=HLAVICKY, limits=limity)
+        except ImportError:
+            print("HTTP/2 není k dispozici (chybí httpx[http2]), používám HTTP/1.1.")
+            _nastaveni["http2"] = False
+
+    session = requests.Session()
+    session.headers.update(HLAVICKY)
+    adapter = HTTPAdapter(
+        pool_connections=_nastaveni["pocet_spojeni"],
+        pool_maxsize=_nastaveni["pocet_spojeni"]
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _ziskej_session():
+    """
+    Vrátí sdílenou session, případně ji při prvním použití vytvoří.
+    """
+    global _session
+    with _zamek:
+        if _session is None:
+            _session = _vytvor_session()
+        return _session
+
+
+def _ziskej_mezipamet():
+    """
+    Vrátí mezipaměť podle nastavení (při prvním použití ji otevře),
+    nebo None, pokud je mezipaměť vypnutá.
+    """
+    global _mezipamet
+    nastaveni = _nastaveni["mezipamet"]
+    if not nastaveni and not _nastaveni["jen_mezipamet"]:
+        return None
+    with _zamek:
+        if _mezipamet is None:
+            _mezipamet = nastaveni if isinstance(nastaveni, Mezipamet) else Mezipamet()
+        return _mezipamet
+
+
+def _ziskej_regulator(url):
+    """
+    Vrátí regulátor pro server dané URL (při prvním použití ho vytvoří),
+    nebo None, pokud je regulace vypnutá.
+    """
+    if not _nastaveni["regulace"]:
+        return None
+    host = urlsplit(url).netloc
+    with _zamek:
+        regulator = _regulatory.get(host)
+        if regulator is None:
+            regulator = _regulatory[host] = Regulator(_nastaveni["pocet_spojeni"])
+        return regulator
+
+
+def stav_regulace():
+    """
+    Vrátí aktuální limity regulátorů (okno, požadavky za sekundu, ...).
+
+    Vrací:
+        dict: host -> slovník se stavem regulátoru.
+    """
+    with _zamek:
+        regulatory = dict(_regulatory)
+    return {host: regulator.stav() for host, regulator in regulatory.items()}
+
+
+def _na_odpoved(url, stav, hlavicky, obsah):
+    """
+    Sestaví objekt requests.Response z již stažených dat, aby volající
+    pracovali vždy se stejným typem odpovědi (i při použití httpx).
+    """
+    odpoved = requests.Response()
+    odpoved.url = url
+    odpoved.status_code = stav
+    odpoved.headers = requests.structures.CaseInsensitiveDict(hlavicky)
+    odpoved._content = obsah
+    odpoved.encoding = requests.utils.get_encoding_from_headers(odpoved.headers)
+    return odpoved
+
+
+def _jeden_pokus(url, timeout, hlavicky):
+    """
+    Provede jeden GET požadavek přes sdílenou session.
+    """
+    session = _ziskej_session()
+    if isinstance(session, requests.Session):
+        return session.get(url, timeout=timeout, headers=hlavicky)
+
+    import httpx
+    try:
+        odpoved = session.get(url, timeout=timeout, headers=hlavicky)
+    except httpx.TimeoutException as e:
+        raise requests.Timeout(str(e)) from e
+    except httpx.HTTPError as e:
+        raise requests.ConnectionError(str(e)) from e
+    return _na_odpoved(str(odpoved.url), odpoved.status_code,
+                       odpoved.headers, odpoved.content)
+
+
+def _retry_after(odpoved):
+    """
+    Přečte hlavičku Retry-After (počet sekund nebo datum HTTP).
+
+    Vrací:
+        float: Počet sekund (nejvýše MAX_PRODLEVA), nebo None bez hlavičky.
+    """
+    hodnota = odpoved.headers.get("Retry-After", "").strip()
+    if not hodnota:
+        return None
+    if hodnota.isdigit():
+        return min(int(hodnota), MAX_PRODLEVA)
+    try:
+        datum = parsedate_to_datetime(hodnota)
+    except (TypeError, ValueError):
+        return None
+    if datum.tzinfo is None:
+        datum = datum.replace(tzinfo=timezone.utc)
+    sekundy = (datum - datetime.now(timezone.utc)).total_seconds()
+    return min(max(sekundy, 0.0), MAX_PRODLEVA)
+
+
+def _prodleva(pokus, odpoved=None):
+    """
+    Spočítá, jak dlouho čekat před dalším pokusem. Pokud server poslal
+    hlavičku Retry-After, má přednost.
+    """
+    prodleva = ZAKLADNI_PRODLEVA * (2 ** pokus)
+    if odpoved is not None:
+        prodleva = max(prodleva, _retry_after(odpoved) or 0)
+    return min(prodleva, MAX_PRODLEVA)
+
+
+def _stahni_s_opakovanim(url, timeout, hlavicky):
+    """
+    Stáhne stránku ze serveru; dočasné chyby (výpadek spojení, timeout,
+    stavové kódy z OPAKOVATELNE_STAVY) opakuje s exponenciálně rostoucí
+    prodlevou. Každý pokus nejdřív počká na povolení regulátoru serveru
+    a po dokončení mu ohlásí výsledek.
+    """
+    regulator = _ziskej_regulator(url)
+    for pokus in range(POCET_POKUSU):
+        posledni = pokus == POCET_POKUSU - 1
+        zacatek = regulator.zacni() if regulator is not None else None
+        start = time.perf_counter()
+        try:
+            odpoved = _jeden_pokus(url, timeout, hlavicky)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if regulator is not None:
+                regulator.dokonci(zacatek, time.perf_counter() - start, chyba=True)
+            PROFIL.chyba_spojeni()
+            if posledni:
+                raise
+            PROFIL.opakovani(type(e).__name__)
+            time.sleep(_prodleva(pokus))
+            continue
+        except BaseException:
+            # Jiné chyby (např. ChunkedEncodingError, TooManyRedirects) se
+            # neopakují, ale místo v okně regulátoru se musí uvolnit
+            if regulator is not None:
+                regulator.dokonci(zacatek, time.perf_counter() - start)
+            raise
+
+        if regulator is not None:
+            regulator.dokonci(zacatek, time.perf_counter() - start,
+                              odpoved.status_code, _retry_after(odpoved))
+        if PROFIL.zapnuto:
+            # Po síti se přenáší komprimovaný obsah - pokud server poslal
+            # jeho délku, počítáme s ní
+            delka = odpoved.headers.get("Content-Length", "")
+            bajty = int(delka) if delka.isdigit() else len(odpoved.content)
+            PROFIL.pozadavek(url, time.perf_counter() - start, bajty, odpoved.status_code)
+        if odpoved.status_code in OPAKOVATELNE_STAVY and not posledni:
+            PROFIL.opakovani(odpoved.status_code)
+            time.sleep(_prodleva(pokus, odpoved))
+            continue
+        return odpoved
+
+
+def stahni(url, timeout=VYCHOZI_TIMEOUT, overit=False):
+    """
+    Stáhne stránku metodou GET přes sdílenou session. Platné záznamy se vrací
+    přímo z mezipaměti, prošlé se ověří podmíněným požadavkem. Dočasné chyby
+    serveru se opakují s exponenciálně rostoucí prodlevou. Při čtení ze
+    snímku se stránka vrátí přímo z něj (bez sítě i mezipaměti); při ukládání
+    snímku se do něj zapíše každá úspěšně získaná stránka.
+
+    Parametry:
+        url (str): Plná URL adresa stránky.
+        timeout (float): Timeout jednoho pokusu v sekundách.
+        overit (bool): True = ověřit u serveru i platný záznam z mezipaměti
+                       (podmíněným požadavkem), např. při sledování změn.
+
+    Vrací:
+        requests.Response: Odpověď serveru. Kontrolu stavového kódu
+                           (raise_for_status) provádí volající.
+
+    Výjimky:
+        ChybiVMezipameti: V režimu "jen mezipaměť", pokud stránka chybí.
+        ChybiVeSnimku: Při čtení ze snímku, pokud stránka ve snímku chybí.
+    """
+    zdroj = _nastaveni["ze_snimku"]
+    if zdroj is not None:
+        stranka = zdroj.nacti(url)
+        if stranka is None:
+            # Opakované parsování musí běžet nad stejnými daty - chybějící
+            # stránka se nedoplní ze sítě ani z mezipaměti
+            raise ChybiVeSnimku(f"Stránka není ve snímku {zdroj.cesta}: {url}")
+        PROFIL.mezipamet("snimek")
+        obsah, typ = stranka
+        return _na_odpoved(url, 200, {"Content-Type": typ} if typ else {}, obsah)
+
+    odpoved = _stahni(url, timeout, overit)
+    snimek = _nastaveni["snimek"]
+    if snimek is not None and odpoved.status_code == 200:
+        snimek.zapis(url, odpoved.content, odpoved.headers.get("Content-Type"))
+    return odpoved
+
+
+def _stahni(url, timeout, overit):
+    """
+    Stáhne stránku z mezipaměti nebo ze serveru (viz stahni).
+    """
+    mezipamet = _ziskej_mezipamet()
+    if mezipamet is None:
+        return _stahni_s_opakovanim(url, timeout, None)
+
+    zaznam = mezipamet.nacti(url)
+    if zaznam is not None and (_nastaveni["jen_mezipamet"]
+                               or (not overit and mezipamet.je_platny(zaznam))):
+        PROFIL.mezipamet("zasah")
+        return _na_odpoved(url, 200, zaznam["hlavicky"], zaznam["obsah"])
+    if _nastaveni["jen_mezipamet"]:
+        raise ChybiVMezipameti(f"Stránka není v mezipaměti: {url}")
+
+    odpoved = _stahni_s_opakovanim(url, timeout, mezipamet.podminene_hlavicky(zaznam))
+    if odpoved.status_code == 304 and zaznam is not None:
+        # Stránka se nezměnila - použijeme uloženou verzi
+        PROFIL.mezipamet("304")
+        mezipamet.obnov(url)
+        return _na_odpoved(url, 200, zaznam["hlavicky"], zaznam["obsah"])
+    PROFIL.mezipamet("minuti")
+    if odpoved.status_code == 200:
+        mezipamet.uloz(url, odpoved)
+    return odpoved
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kontrola shody parserů na uložených vzorových stránkách (složka 'vzorky').
+Pro každý dostupný parser z parsovani.PODPOROVANE_PARSERY spustí funkce obou
+skriptů nad vzorovými stránkami a porovná výsledky se zmrazenými očekávanými
+výsledky (vzorky/ocekavane.json), které nezávisí na současném kódu. Stejně se
+ověří předkompilované extraktory (extraktory.py) a jejich záložní cesta:
+stránka se změněným rozložením se musí zpracovat obecně se stejným
+výsledkem. Ověří se také snímek stránek (snimek.py): zápis, připsání
+v dalším běhu a zpětné čtení s kompresí zlib a s zstd (je-li nainstalována
+knihovna zstandard). Stránky se nestahují ze sítě - podstrčí se klientovi přes
+mezipaměť v režimu "jen mezipaměť". Skript zároveň vypíše průměrnou dobu
+zpracování stránky (proti původnímu postupu: 'html.parser' a celý strom
+stránky) a pro každý typ stránky dobu obecného zpracování a extraktoru
+(mikrobenchmark).
+
+Použití:
+    python kontrola_parseru.py
+Návratový kód je 0, pokud jsou všechny výsledky shodné, jinak 1.
+"""
+
+import contextlib     # Potlačení výpisů během kontroly (vestavěná v Pythonu)
+import io             # Buffer pro potlačené výpisy (vestavěná v Pythonu)
+import json           # Načtení očekávaných výsledků (vestavěná v Pythonu)
+import sys            # Návratový kód skriptu (vestavěná v Pythonu)
+import tempfile       # Dočasná složka pro mezipaměť (vestavěná v Pythonu)
+import time           # Měření doby zpracování (vestavěná v Pythonu)
+from functools import partial  # Extraktor s pevným typem stránky
+from pathlib import Path
+
+import extraktory
+import klient
+import parsovani
+import snimek
+import volby_okresy
+import Zahranici
+from mezipamet import Mezipamet
+
+SLOZKA_VZORKU = Path(__file__).parent / "vzorky"
+# Zmrazené očekávané výsledky kontrolovaných funkcí nad vzorovými stránkami
+SOUBOR_OCEKAVANYCH = SLOZKA_VZORKU / "ocekavane.json"
+ZAKLADNI_URL_ZAHRANICI = "https://www.volby.cz/pls/ps2017nss/"
+URL_OBCI = ZAKLADNI_URL_ZAHRANICI + "ps32?xjazyk=CZ&xkraj=2&xnumnuts=2101"
+URL_ZAHRANICI = ZAKLADNI_URL_ZAHRANICI + "ps36?xjazyk=CZ"
+URL_OKRSKU = ZAKLADNI_URL_ZAHRANICI + "ps34?xjazyk=CZ&xkraj=2&xobec=529303&xvyber=2101"
+# Kolikrát se každá stránka zpracuje při měření času
+POCET_OPAKOVANI = 20
+
+
+def nacti_vzorek(nazev):
+    """
+    Načte vzorovou stránku ze složky 'vzorky'.
+    """
+    return (SLOZKA_VZORKU / nazev).read_text(encoding="utf-8")
+
+
+def nacti_ocekavane():
+    """
+    Načte zmrazené očekávané výsledky (název kontroly -> výsledek funkce).
+    """
+    with open(SOUBOR_OCEKAVANYCH, encoding="utf-8") as soubor:
+        return json.load(soubor)
+
+
+def priprav_mezipamet(slozka):
+    """
+    Vloží přehledové vzorové stránky do mezipaměti pod jejich URL adresami
+    a přepne klienta do režimu bez sítě.
+    """
+    mezipamet = Mezipamet(slozka)
+    stranky = {
+        volby_okresy.ZAKLADNI_URL: "ps3.html",
+        URL_OBCI: "ps32.html",
+        URL_ZAHRANICI: "ps36.html",
+        URL_OKRSKU: "ps34.html",
+    }
+    for url, nazev in stranky.items():
+        obsah = nacti_vzorek(nazev).encode("utf-8")
+        odpoved = klient._na_odpoved(
+            url, 200, {"Content-Type": "text/html; charset=utf-8"}, obsah
+        )
+        mezipamet.uloz(url, odpoved)
+    klient.nastav_klienta(mezipamet=mezipamet, jen_mezipamet=True)
+    return mezipamet
+
+
+def vytvor_vystupy(parser, jen_tabulky, s_extraktory=False):
+    """
+    Spustí všechny zpracovávající funkce se zadaným parserem (případně
+    s předkompilovanými extraktory).
+
+    Vrací:
+        dict: Název kontroly -> výsledek funkce.
+    """
+    parsovani.PARSER = parser
+    extraktory.POVOLENO = s_extraktory
+    obec = {"cislo": "529303", "obec": "Benešov", "odkaz": "", "okrsky": URL_OKRSKU}
+    okrsek = {"cislo": "529303", "obec": "Benešov", "okrsek": "1", "odkaz": ""}
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            "ps3 nacti_okresni_mesta": volby_okresy.nacti_okresni_mesta(),
+            "ps32 nacti_obce": volby_okresy.nacti_obce(URL_OBCI),
+            "ps311 zpracuj_data_obce": volby_okresy.zpracuj_data_obce(
+                obec, nacti_vzorek("ps311.html"), jen_tabulky=jen_tabulky
+            ),
+            "ps34 nacti_okrsky": volby_okresy.nacti_okrsky(obec),
+            "ps311 okrsek zpracuj_data_okrsku": volby_okresy.zpracuj_data_okrsku(
+                okrsek, nacti_vzorek("ps311_okrsek.html"), jen_tabulky=jen_tabulky
+            ),
+            "ps36 nacti_tabulku_1": Zahranici.nacti_tabulku_1(URL_ZAHRANICI),
+            "ps361 zpracuj_data_z_odkazu": Zahranici.zpracuj_data_z_odkazu(
+                nacti_vzorek("ps361.html"), "ps361", jen_tabulky=jen_tabulky
+            ),
+        }
+
+
+def zmer_cas(parser, jen_tabulky):
+    """
+    Změří průměrnou dobu zpracování detailní stránky obce (v milisekundách).
+    """
+    html = nacti_vzorek("ps311.html")
+    obec = {"cislo": "529303", "obec": "Benešov", "odkaz": ""}
+    start = time.perf_counter()
+    for _ in range(POCET_OPAKOVANI):
+        volby_okresy.zpracuj_data_obce(obec, html, parser=parser, jen_tabulky=jen_tabulky)
+    return (time.perf_counter() - start) / POCET_OPAKOVANI * 1000
+
+
+def zmer_extraktory():
+    """
+    Mikrobenchmark: pro každý typ stránky porovná dobu obecného zpracování
+    (BeautifulSoup s výchozím parserem) a předkompilovaného extraktoru.
+
+    Vrací:
+        dict: Vzorová stránka -> (ms obecně, ms extraktorem).
+    """
+    obec = {"cislo": "529303", "obec": "Benešov", "odkaz": ""}
+    parser = parsovani.PARSER
+    # Vzorek -> (typ stránky pro extraktor, obecné zpracování)
+    obecne = {
+        "ps3": ("ps3", lambda html: volby_okresy._okresy_ze_stranky(parsovani.vytvor_polevku(html))),
+        "ps32": ("ps32", lambda html: volby_okresy._obce_ze_stranky(parsovani.vytvor_polevku(html))),
+        "ps311": ("ps311", lambda html: volby_okresy.zpracuj_data_obce(obec, html, parser=parser)),
+        "ps311_okrsek": ("ps311", lambda html: volby_okresy.zpracuj_data_obce(obec, html,
+                                                                             parser=parser)),
+        "ps36": ("ps36", lambda html: Zahranici._radky_tabulky_1(parsovani.vytvor_polevku(html))),
+        "ps361": ("ps361", lambda html: Zahranici.zpracuj_data_z_odkazu(html, "ps361",
+                                                                        parser=parser)),
+    }
+    vysledky = {}
+    for vzorek, (typ, zpracuj_obecne) in obecne.items():
+        html = nacti_vzorek(f"{vzorek}.html")
+        casy = []
+        for zpracuj in (zpracuj_obecne, partial(extraktory.extrahuj, typ)):
+            start = time.perf_counter()
+            for _ in range(POCET_OPAKOVANI):
+                zpracuj(html)
+            casy.append((time.perf_counter() - start) / POCET_OPAKOVANI * 1000)
+        vysledky[vzorek] = tuple(casy)
+    return vysledky
+
+
+def zkontroluj_zalozni_cestu():
+    """
+    Ověří, že stránka obce se změněným rozložením (jiné hlavičky buněk)
+    extraktor odmítne a obecné zpracování dá stejný výsledek.
+    """
+    obec = {"cislo": "529303", "obec": "Benešov", "odkaz": ""}
+    zmenena = nacti_vzorek("ps311.html").replace('headers="sa2"', 'headers="sx2"')
+    extraktory.POVOLENO = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        odmitnuto = extraktory.extrahuj("ps311", zmenena) is None
+        vysledek = volby_okresy.zpracuj_data_obce(obec, zmenena)
+    extraktory.POVOLENO = False
+    return odmitnuto and vysledek == volby_okresy.zpracuj_data_obce(obec, zmenena)
+
+
+def zkontroluj_snimek(slozka, komprese):
+    """
+    Zapíše vzorové stránky do snímku, v druhém běhu do něj připíše změněnou
+    a opakovanou stránku a ověří, že se vše přečte zpět beze změny.
+
+    Parametry:
+        slozka (str): Dočasná složka pro archiv.
+        komprese (str): 'zstd' nebo 'zlib'.
+
+    Vrací:
+        bool: True, pokud snímek vrátil zapsané stránky.
+    """
+    cesta = Path(slozka) / f"kontrola_{komprese}.archiv"
+    stranky = {f"{nazev}.html": nacti_vzorek(f"{nazev}.html").encode("utf-8")
+               for nazev in ("ps3", "ps311", "ps361")}
+    zapis = snimek.Snimek(cesta, zapis=True, komprese=komprese)
+    for url, obsah in stranky.items():
+        zapis.zapis(url, obsah, "text/html; charset=utf-8")
+    zapis.zavri()
+
+    # Další běh: index se načte, stejná stránka se nepřipíše, změněná ano
+    velikost = cesta.stat().st_size
+    zapis = snimek.Snimek(cesta, zapis=True, komprese=komprese)
+    spravne = len(zapis) == len(stranky)
+    zapis.zapis("ps3.html", stranky["ps3.html"])
+    spravne = spravne and cesta.stat().st_size == velikost
+    stranky["ps311.html"] += b"<!-- zmena -->"
+    zapis.zapis("ps311.html", stranky["ps311.html"], "text/html; charset=utf-8")
+    zapis.zavri()
+
+    cteni = snimek.Snimek(cesta)
+    try:
+        spravne = spravne and len(cteni) == len(stranky) and all(
+            cteni.nacti(url)[0] == obsah for url, obsah in stranky.items()
+        )
+    finally:
+        cteni.zavri()
+    return spravne
+
+
+def dostupne_parsery():
+    """
+    Vrátí parsery z PODPOROVANE_PARSERY, které jsou nainstalované.
+    """
+    parsery = []
+    for parser in parsovani.PODPOROVANE_PARSERY:
+        try:
+            parsovani.vytvor_polevku("<table></table>", parser=parser)
+            parsery.append(parser)
+        except Exception:
+            print(f"Parser '{parser}' není k dispozici, přeskakuji.")
+    return parsery
+
+
+def porovnej(vystupy, ocekavane, popis):
+    """
+    Porovná výstupy s očekávanými výsledky a vypíše rozdíly.
+
+    Vrací:
+        bool: True, pokud se všechny výstupy shodují.
+    """
+    shoda = True
+    for nazev, ocekavano in ocekavane.items():
+        if vystupy.get(nazev) != ocekavano:
+            shoda = False
+            print(f"ROZDÍL: {popis} / {nazev}")
+    return shoda
+
+
+def main():
+    """
+    Porovná výstupy všech dostupných parserů se zmrazenými očekávanými výsledky.
+    """
+    ocekavane = nacti_ocekavane()
+    puvodni_parser = parsovani.PARSER
+    puvodni_extraktory = extraktory.POVOLENO
+    puvodni_nastaveni = klient.nastaveni_klienta()
+    with tempfile.TemporaryDirectory() as slozka:
+        mezipamet = priprav_mezipamet(slozka)
+        try:
+            # Původní postup: 'html.parser' a sestavení celého stromu stránky
+            shoda = porovnej(vytvor_vystupy("html.parser", jen_tabulky=False),
+                             ocekavane, "html.parser, celá stránka")
+            zakladni_cas = zmer_cas("html.parser", jen_tabulky=False)
+            print(f"html.parser, celá stránka: {zakladni_cas:.2f} ms/stránka (reference)")
+
+            for parser in dostupne_parsery():
+                vystupy = vytvor_vystupy(parser, jen_tabulky=True)
+                shoda = porovnej(vystupy, ocekavane, parser) and shoda
+                cas = zmer_cas(parser, jen_tabulky=True)
+                print(f"{parser}, jen tabulky: {cas:.2f} ms/stránka "
+                      f"({zakladni_cas / cas:.1f}x)")
+
+            if extraktory.etree is None:
+                print("Extraktory nejsou k dispozici (chybí lxml), přeskakuji.")
+            else:
+                parsovani.PARSER = puvodni_parser
+                vystupy = vytvor_vystupy(puvodni_parser, jen_tabulky=True, s_extraktory=True)
+                shoda = porovnej(vystupy, ocekavane, "extraktory") and shoda
+                if not zkontroluj_zalozni_cestu():
+                    shoda = False
+                    print("ROZDÍL: extraktory / záložní cesta při změněném rozložení")
+                extraktory.POVOLENO = True
+                print(f"Extraktory (obecně = BeautifulSoup + {puvodni_parser}):")
+                for typ, (obecne, vytazeno) in zmer_extraktory().items():
+                    print(f"  {typ}: obecně {obecne:.2f} ms, extraktor {vytazeno:.2f} ms "
+                          f"({obecne / vytazeno:.1f}x)")
+
+            komprese = ["zlib"]
+            if snimek.zstandard is None:
+                print("Knihovna zstandard není k dispozici, kontrola snímku se zstd se přeskakuje.")
+            else:
+                komprese.append("zstd")
+            for metoda in komprese:
+                if not zkontroluj_snimek(slozka, metoda):
+                    shoda = False
+                    print(f"ROZDÍL: snímek / {metoda}")
+        finally:
+            parsovani.PARSER = puvodni_parser
+            extraktory.POVOLENO = puvodni_extraktory
+            klient.nastav_klienta(**puvodni_nastaveni)
+            mezipamet.zavri()
+
+    print("Výsledky všech parserů jsou shodné." if shoda else "Nalezeny rozdíly!")
+    return 0 if shoda else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
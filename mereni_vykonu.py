@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Měření výkonu bez přístupu na volby.cz.
+Skript spustí lokální HTTP server, který místo webu volby.cz vrací vzorové
+stránky ze složky 'vzorky' (ps3, ps32, ps311, ps34, ps36, ps361; stránka
+ps311 s parametrem xokrsek vrací vzorek okrsku), s nastavitelnou
+prodlevou odpovědi, podílem chybných odpovědí (HTTP 503) a případně limitem
+počtu požadavků za sekundu (nad limitem odpovídá 429 s Retry-After, jako
+přetížený server). Proti serveru pak
+spustí funkce obou skriptů od začátku do konce:
+    nacti_okresni_mesta -> nacti_obce -> nacti_data_obce (pro každý okres)
+    nacti_tabulku_1 -> nacti_data_z_odkazu (zahraniční okrsky)
+a vypíše počet stránek za sekundu, dobu parsování jedné stránky, špičkovou
+spotřebu paměti (RSS), celkový čas pro každý okres a limity, na kterých se
+ustálila regulace zátěže klienta. Mezipaměť klienta je během měření
+vypnutá, aby se každá stránka opravdu stáhla.
+
+Použití:
+    python mereni_vykonu.py [--okresy 3] [--latence 20] [--chyby 0.0]
+                            [--limit 50] [--bez-regulace]
+                            [--vlakna 8] [--json vysledek.json]
+"""
+
+import argparse       # Zpracování parametrů příkazové řádky (vestavěná v Pythonu)
+import contextlib     # Potlačení výpisů během měření (vestavěná v Pythonu)
+import http.server    # Lokální HTTP server (vestavěná v Pythonu)
+import io             # Buffer pro potlačené výpisy (vestavěná v Pythonu)
+import json           # Uložení výsledků měření (vestavěná v Pythonu)
+import random         # Náhodné chybné odpovědi (vestavěná v Pythonu)
+import threading      # Běh serveru na pozadí (vestavěná v Pythonu)
+import time           # Měření času a prodleva odpovědí (vestavěná v Pythonu)
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import klient
+import volby_okresy
+import Zahranici
+from profilovani import spickova_pamet_mb
+from stahovani import zpracuj_paralelne
+
+SLOZKA_VZORKU = Path(__file__).parent / "vzorky"
+# Stránky, které server umí vrátit (název stránky v URL -> vzorový soubor)
+STRANKY = ("ps3", "ps32", "ps311", "ps311_okrsek", "ps34", "ps36", "ps361")
+# Kolikrát se detailní stránka zparsuje při měření doby parsování
+POCET_OPAKOVANI = 20
+
+
+class TestovaciServer:
+    """
+    Lokální HTTP server se vzorovými stránkami. Běží ve vlastním vlákně.
+
+    Parametry:
+        latence (float): Prodleva před každou odpovědí v sekundách.
+        chyby (float): Podíl odpovědí (0 až 1), které skončí chybou 503.
+        limit (float): Nejvyšší počet požadavků za sekundu; požadavky nad
+                       limitem dostanou 429 s Retry-After (None = bez limitu).
+        seminko (int): Semínko generátoru náhodných chyb (kvůli opakovatelnosti).
+    """
+
+    def __init__(self, latence=0.02, chyby=0.0, limit=None, seminko=1):
+        self.latence = latence
+        self.chyby = chyby
+        self.limit = limit
+        self.pocet_pozadavku = 0
+        self.pocet_chyb = 0
+        self.pocet_odmitnutych = 0
+        self._tokeny = limit or 0.0
+        self._doplneno = time.monotonic()
+        self._nahoda = random.Random(seminko)
+        self._zamek = threading.Lock()
+        self._stranky = {
+            nazev: (SLOZKA_VZORKU / f"{nazev}.html").read_bytes() for nazev in STRANKY
+        }
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._obsluha())
+        self._server.daemon_threads = True
+        self._vlakno = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def zakladni_url(self):
+        """
+        Základní URL serveru (obdoba https://www.volby.cz/pls/ps2017nss/).
+        """
+        return f"http://127.0.0.1:{self._server.server_port}/pls/ps2017nss/"
+
+    def _odpoved(self, cesta):
+        """
+        Rozhodne o odpovědi na požadavek.
+
+        Vrací:
+            tuple: (stavový kód, obsah)
+        """
+        with self._zamek:
+            self.pocet_pozadavku += 1
+            if self.limit:
+                # Token bucket s kapacitou jedné sekundy provozu
+                ted = time.monotonic()
+                self._tokeny = min(self.limit,
+                                   self._tokeny + (ted - self._doplneno) * self.limit)
+                self._doplneno = ted
+                if self._tokeny < 1:
+                    self.pocet_odmitnutych += 1
+                    return 429, b"Prilis mnoho pozadavku"
+                self._tokeny -= 1
+            if self.chyby and self._nahoda.random() < self.chyby:
+                self.pocet_chyb += 1
+                return 503, b"Sluzba neni dostupna"
+        casti = urlsplit(cesta)
+        nazev = casti.path.rsplit("/", 1)[-1]
+        if nazev == "ps311" and "xokrsek=" in casti.query:
+            nazev = "ps311_okrsek"      # Stránka jednoho okrsku
+        if nazev not in self._stranky:
+            return 404, b"Stranka nenalezena"
+        return 200, self._stranky[nazev]
+
+    def _obsluha(self):
+        """
+        Vytvoří třídu obsluhy požadavků napojenou na tento server.
+        """
+        server = self
+
+        class Obsluha(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"      # Udržování spojení (keep-alive)
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                time.sleep(server.latence)
+                stav, obsah = server._odpoved(self.path)
+                self.send_response(stav)
+                if stav == 429:
+                    self.send_header("Retry-After", "1")
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(obsah)))
+                self.end_headers()
+                self.wfile.write(obsah)
+
+            def log_message(self, *args):
+                pass                            # Bez výpisu každého požadavku
+
+        return Obsluha
+
+    def __enter__(self):
+        self._vlakno.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def zmer_parsovani():
+    """
+    Změří průměrnou dobu parsování detailních stránek (v milisekundách).
+
+    Vrací:
+        dict: Název stránky -> ms na stránku.
+    """
+    obec = {"cislo": "529303", "obec": "Benešov", "odkaz": ""}
+    html_obce = (SLOZKA_VZORKU / "ps311.html").read_text(encoding="utf-8")
+    html_okrsku = (SLOZKA_VZORKU / "ps361.html").read_text(encoding="utf-8")
+    okrsek = dict(obec, okrsek="1")
+    html_okrsku_obce = (SLOZKA_VZORKU / "ps311_okrsek.html").read_text(encoding="utf-8")
+    mereni = {
+        "ps311": lambda: volby_okresy.zpracuj_data_obce(obec, html_obce),
+        "ps311 okrsek": lambda: volby_okresy.zpracuj_data_okrsku(okrsek, html_okrsku_obce),
+        "ps361": lambda: Zahranici.zpracuj_data_z_odkazu(html_okrsku, "ps361"),
+    }
+    vysledky = {}
+    for nazev, funkce in mereni.items():
+        start = time.perf_counter()
+        for _ in range(POCET_OPAKOVANI):
+            funkce()
+        vysledky[nazev] = (time.perf_counter() - start) / POCET_OPAKOVANI * 1000
+    return vysledky
+
+
+def zmer_okresy(server, pocet_okresu, pocet_vlaken):
+    """
+    Projde první okresy stejně jako skript volby_okresy.py (seznam okresů,
+    seznam obcí a detail každé obce) a změří čas každého okresu.
+
+    Vrací:
+        list: Slovníky s klíči 'okres', 'obce', 'stranky', 'cas_s'.
+    """
+    okresy = [o for o in volby_okresy.nacti_okresni_mesta() if "ps36" not in o["odkaz"]]
+    vysledky = []
+    for okres in okresy[:pocet_okresu]:
+        pred = server.pocet_pozadavku
+        start = time.perf_counter()
+        obce = volby_okresy.nacti_obce(okres["odkaz"])
+        zpracuj_paralelne(volby_okresy.nacti_data_obce, obce, pocet_vlaken)
+        vysledky.append({
+            "okres": okres["nazev"],
+            "obce": len(obce),
+            "stranky": server.pocet_pozadavku - pred,
+            "cas_s": time.perf_counter() - start,
+        })
+    return vysledky
+
+
+def zmer_zahranici(server, pocet_vlaken):
+    """
+    Projde zahraniční okrsky stejně jako skript Zahranici.py.
+
+    Vrací:
+        dict: Klíče 'okrsky', 'stranky', 'cas_s'.
+    """
+    pred = server.pocet_pozadavku
+    start = time.perf_counter()
+    zakladni_url = server.zakladni_url
+    tabulka_1_data = Zahranici.nacti_tabulku_1(zakladni_url + "ps36?xjazyk=CZ")
+    zpracuj_paralelne(
+        lambda zaznam: Zahranici.nacti_data_z_odkazu(zakladni_url, zaznam["Odkaz"]),
+        tabulka_1_data, pocet_vlaken
+    )
+    return {
+        "okrsky": len(tabulka_1_data),
+        "stranky": server.pocet_pozadavku - pred,
+        "cas_s": time.perf_counter() - start,
+    }
+
+
+def zpracuj_parametry(argv=None):
+    """
+    Zpracuje parametry příkazové řádky.
+    """
+    parser = argparse.ArgumentParser(description="Měření výkonu proti lokálnímu serveru.")
+    parser.add_argument("--okresy", type=int, default=3,
+                        help="počet měřených okresů (výchozí 3)")
+    parser.add_argument("--latence", type=float, default=20,
+                        help="prodleva odpovědi serveru v ms (výchozí 20)")
+    parser.add_argument("--chyby", type=float, default=0.0,
+                        help="podíl odpovědí s chybou 503, 0 až 1 (výchozí 0)")
+    parser.add_argument("--limit", type=float, default=None,
+                        help="limit serveru v požadavcích za sekundu (nad ním 429)")
+    parser.add_argument("--bez-regulace", action="store_true",
+                        help="vypnout regulaci zátěže v klientovi (pro srovnání)")
+    parser.add_argument("--vlakna", type=int, default=None,
+                        help="počet souběžně stahovaných stránek")
+    parser.add_argument("--json", metavar="SOUBOR",
+                        help="uložit výsledky měření do JSON souboru")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Spustí server, provede měření a vypíše výsledky.
+    """
+    parametry = zpracuj_parametry(argv)
+    puvodni_url = volby_okresy.ZAKLADNI_URL
+    # Nastavení zadané uživatelem (VOLBY_MEZIPAMET, VOLBY_REGULACE) se po
+    # měření obnoví
+    puvodni_nastaveni = klient.nastaveni_klienta()
+    klient.nastav_klienta(mezipamet=False, regulace=not parametry.bez_regulace)
+
+    with TestovaciServer(parametry.latence / 1000, parametry.chyby,
+                         parametry.limit) as server:
+        volby_okresy.ZAKLADNI_URL = server.zakladni_url + "ps3?xjazyk=CZ"
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                okresy = zmer_okresy(server, parametry.okresy, parametry.vlakna)
+                zahranici = zmer_zahranici(server, parametry.vlakna)
+            celkovy_cas = time.perf_counter() - start
+            regulace = klient.stav_regulace()
+        finally:
+            volby_okresy.ZAKLADNI_URL = puvodni_url
+            klient.nastav_klienta(mezipamet=puvodni_nastaveni["mezipamet"],
+                                  regulace=puvodni_nastaveni["regulace"])
+        pocet_pozadavku = server.pocet_pozadavku
+        pocet_chyb = server.pocet_chyb
+        pocet_odmitnutych = server.pocet_odmitnutych
+
+    parsovani = zmer_parsovani()
+    pamet = spickova_pamet_mb()
+    vysledek = {
+        "latence_ms": parametry.latence,
+        "chyby": parametry.chyby,
+        "limit": parametry.limit,
+        "okresy": okresy,
+        "zahranici": zahranici,
+        "pozadavky": pocet_pozadavku,
+        "chybne_odpovedi": pocet_chyb,
+        "odmitnute_429": pocet_odmitnutych,
+        "celkovy_cas_s": celkovy_cas,
+        "stranek_za_s": pocet_pozadavku / celkovy_cas,
+        "parsovani_ms": parsovani,
+        "spickova_pamet_mb": pamet,
+        "regulace": regulace,
+    }
+
+    print(f"Latence {parametry.latence:g} ms, chybné odpovědi {parametry.chyby:.0%}"
+          + (f", limit serveru {parametry.limit:g} požadavků/s" if parametry.limit else ""))
+    for okres in okresy:
+        print(f"  {okres['okres']}: {okres['obce']} obcí, {okres['stranky']} stránek, "
+              f"{okres['cas_s']:.2f} s")
+    print(f"  Zahraničí: {zahranici['okrsky']} okrsků, {zahranici['stranky']} stránek, "
+          f"{zahranici['cas_s']:.2f} s")
+    print(f"Celkem: {pocet_pozadavku} požadavků ({pocet_chyb} chybných, "
+          f"{pocet_odmitnutych} odmítnutých 429) "
+          f"za {celkovy_cas:.2f} s = {vysledek['stranek_za_s']:.1f} stránek/s")
+    for host, stav in regulace.items():
+        print(f"Regulace {host}: okno {stav['okno']:g}, {stav['rychlost']:g} požadavků/s, "
+              f"{stav['snizeni']}x sníženo")
+    for nazev, ms in parsovani.items():
+        print(f"Parsování {nazev}: {ms:.2f} ms/stránka")
+    print("Špičková paměť (RSS): " + (f"{pamet:.0f} MB" if pamet is not None else "nelze zjistit"))
+
+    if parametry.json:
+        with open(parametry.json, "w", encoding="utf-8") as soubor:
+            json.dump(vysledek, soubor, ensure_ascii=False, indent=4)
+        print(f"Výsledky uloženy do {parametry.json}")
+
+
+if __name__ == "__main__":
+    main()
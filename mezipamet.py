@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Trvalá mezipaměť (cache) HTTP odpovědí na disku.
+Stažené stránky z volby.cz se ukládají do SQLite databáze podle URL adresy
+spolu s hlavičkami ETag a Last-Modified. Dokud je záznam platný (podle
+pravidel v PRAVIDLA_PLATNOSTI), vrací se přímo z disku bez jediného
+požadavku na server. Po vypršení platnosti se stránka ověří podmíněným
+požadavkem (If-None-Match / If-Modified-Since) a při odpovědi 304 se znovu
+použije uložená verze. Při překročení velikostního limitu se mažou nejdéle
+nepoužité záznamy (LRU).
+"""
+
+import json           # Serializace uložených hlaviček (vestavěná v Pythonu)
+import re             # Regulární výrazy pro pravidla platnosti (vestavěná v Pythonu)
+import sqlite3        # Úložiště mezipaměti (vestavěná v Pythonu)
+import threading      # Zámek pro přístup z více vláken (vestavěná v Pythonu)
+import time           # Časová razítka záznamů (vestavěná v Pythonu)
+import zlib           # Komprese uložených stránek (vestavěná v Pythonu)
+from pathlib import Path
+import requests       # Kvůli společnému předkovi výjimek
+
+# Výchozí umístění mezipaměti (vedle skriptů)
+VYCHOZI_SLOZKA = Path(__file__).parent / ".mezipamet"
+# Výchozí maximální velikost uložených stránek v bajtech (200 MB)
+VYCHOZI_LIMIT = 200 * 1024 * 1024
+# Časy použití záznamů (pro LRU) se zapisují do databáze po dávkách: nejpozději
+# po tolika čteních nebo po tolika sekundách, ne při každém čtení
+DAVKA_POUZITI = 256
+INTERVAL_POUZITI = 5.0
+
+DEN = 24 * 60 * 60
+# Doba platnosti záznamu (v sekundách) podle typu stránky. Použije se první
+# pravidlo, jehož vzor odpovídá URL. Přehledové stránky (ps3 - kraje a okresy,
+# ps32 - obce v okrese, ps36 - zahraniční okrsky) se mění jen výjimečně,
+# detailní stránky obcí a okrsků se ověřují častěji.
+PRAVIDLA_PLATNOSTI = [
+    (re.compile(r"/ps3\?"), 30 * DEN),
+    (re.compile(r"/ps32\?"), 30 * DEN),
+    (re.compile(r"/ps36\?"), 30 * DEN),
+    (re.compile(r""), 7 * DEN),
+]
+
+# Hlavičky, které má smysl ukládat (obsah je už dekomprimovaný, takže
+# Content-Encoding ani Content-Length se neukládají)
+UKLADANE_HLAVICKY = ("Content-Type", "ETag", "Last-Modified", "Date")
+
+
+class ChybiVMezipameti(requests.RequestException):
+    """
+    Stránka není v mezipaměti a klient běží v režimu "jen mezipaměť"
+    (bez přístupu k síti).
+    """
+
+
+class Mezipamet:
+    """
+    Mezipaměť HTTP odpovědí uložená v SQLite databázi.
+
+    Parametry:
+        slozka (str nebo Path): Složka, ve které bude databáze uložena.
+        limit_bajtu (int): Maximální celková velikost uložených stránek.
+        pravidla (list): Seznam dvojic (regulární výraz, platnost v sekundách).
+    """
+
+    def __init__(self, slozka=VYCHOZI_SLOZKA, limit_bajtu=VYCHOZI_LIMIT,
+                 pravidla=PRAVIDLA_PLATNOSTI):
+        self.slozka = Path(slozka)
+        self.limit_bajtu = limit_bajtu
+        self.pravidla = pravidla
+        self.slozka.mkdir(parents=True, exist_ok=True)
+        self._zamek = threading.Lock()
+        self._db = sqlite3.connect(
+            str(self.slozka / "odpovedi.sqlite"), check_same_thread=False
+        )
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS odpovedi (
+                url TEXT PRIMARY KEY,
+                hlavicky TEXT NOT NULL,
+                obsah BLOB NOT NULL,
+                velikost INTEGER NOT NULL,
+                ulozeno REAL NOT NULL,
+                pouzito REAL NOT NULL
+            )
+        """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS odpovedi_pouzito ON odpovedi (pouzito)"
+        )
+        self._db.commit()
+        # Celková velikost uložených stránek se sečte jen jednou, dál se
+        # upravuje při každém vložení a smazání záznamu
+        self._celkem = self._db.execute(
+            "SELECT COALESCE(SUM(velikost), 0) FROM odpovedi"
+        ).fetchone()[0]
+        # Dosud nezapsané časy použití (url -> čas)
+        self._pouzito = {}
+        self._zapsano = time.monotonic()
+
+    def platnost(self, url):
+        """
+        Vrátí dobu platnosti (v sekundách) pro danou URL podle pravidel.
+        """
+        for vzor, sekundy in self.pravidla:
+            if vzor.search(url):
+                return sekundy
+        return 0
+
+    def nacti(self, url):
+        """
+        Načte záznam z mezipaměti a označí ho jako naposledy použitý.
+
+        Vrací:
+            dict: Klíče 'url', 'hlavicky', 'obsah' (bytes), 'ulozeno',
+                  nebo None, pokud URL v mezipaměti není.
+        """
+        with self._zamek:
+            radek = self._db.execute(
+                "SELECT hlavicky, obsah, ulozeno FROM odpovedi WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if radek is None:
+                return None
+            self._pouzito[url] = time.time()
+            if (len(self._pouzito) >= DAVKA_POUZITI
+                    or time.monotonic() - self._zapsano >= INTERVAL_POUZITI):
+                self._zapis_pouziti()
+                self._db.commit()
+        return {
+            "url": url,
+            "hlavicky": json.loads(radek[0]),
+            "obsah": zlib.decompress(radek[1]),
+            "ulozeno": radek[2],
+        }
+
+    def je_platny(self, zaznam):
+        """
+        Zjistí, zda záznam ještě nepřekročil dobu platnosti.
+        """
+        return time.time() - zaznam["ulozeno"] < self.platnost(zaznam["url"])
+
+    @staticmethod
+    def podminene_hlavicky(zaznam):
+        """
+        Sestaví hlavičky pro podmíněný GET požadavek podle uloženého záznamu.
+
+        Vrací:
+            dict: Hlavičky If-None-Match / If-Modified-Since (může být prázdný).
+        """
+        if zaznam is None:
+            return {}
+        hlavicky = {}
+        if "ETag" in zaznam["hlavicky"]:
+            hlavicky["If-None-Match"] = zaznam["hlavicky"]["ETag"]
+        if "Last-Modified" in zaznam["hlavicky"]:
+            hlavicky["If-Modified-Since"] = zaznam["hlavicky"]["Last-Modified"]
+        return hlavicky
+
+    def uloz(self, url, odpoved):
+        """
+        Uloží úspěšnou odpověď serveru do mezipaměti.
+
+        Parametry:
+            url (str): URL adresa stránky (klíč záznamu).
+            odpoved (requests.Response): Odpověď se stavem 200.
+        """
+        hlavicky = {
+            nazev: odpoved.headers[nazev]
+            for nazev in UKLADANE_HLAVICKY if nazev in odpoved.headers
+        }
+        obsah = zlib.compress(odpoved.content)
+        ted = time.time()
+        with self._zamek:
+            puvodni = self._db.execute(
+                "SELECT velikost FROM odpovedi WHERE url = ?", (url,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO odpovedi VALUES (?, ?, ?, ?, ?, ?)",
+                (url, json.dumps(hlavicky), obsah, len(obsah), ted, ted)
+            )
+            self._pouzito.pop(url, None)
+            self._celkem += len(obsah) - (puvodni[0] if puvodni else 0)
+            self._uvolni_misto()
+            self._db.commit()
+
+    def obnov(self, url):
+        """
+        Prodlouží platnost záznamu po odpovědi 304 Not Modified.
+        """
+        ted = time.time()
+        with self._zamek:
+            self._db.execute(
+                "UPDATE odpovedi SET ulozeno = ?, pouzito = ? WHERE url = ?",
+                (ted, ted, url)
+            )
+            self._pouzito.pop(url, None)
+            self._db.commit()
+
+    def _zapis_pouziti(self):
+        """
+        Zapíše nashromážděné časy použití záznamů (bez potvrzení transakce).
+        Volá se se zamčeným zámkem.
+        """
+        if self._pouzito:
+            self._db.executemany(
+                "UPDATE odpovedi SET pouzito = ? WHERE url = ?",
+                [(cas, url) for url, cas in self._pouzito.items()]
+            )
+            self._pouzito.clear()
+        self._zapsano = time.monotonic()
+
+    def _uvolni_misto(self):
+        """
+        Smaže nejdéle nepoužité záznamy, dokud celková velikost nepřesahuje
+        limit. Volá se se zamčeným zámkem.
+        """
+        if self._celkem <= self.limit_bajtu:
+            return
+        # Pořadí LRU musí zohlednit i dosud nezapsaná použití
+        self._zapis_pouziti()
+        kurzor = self._db.execute(
+            "SELECT url, velikost FROM odpovedi ORDER BY pouzito"
+        )
+        ke_smazani = []
+        for url, velikost in kurzor:
+            if self._celkem <= self.limit_bajtu:
+                break
+            ke_smazani.append((url,))
+            self._celkem -= velikost
+        self._db.executemany("DELETE FROM odpovedi WHERE url = ?", ke_smazani)
+
+    def zavri(self):
+        """
+        Zapíše nashromážděné časy použití a zavře databázi mezipaměti.
+        """
+        with self._zamek:
+            self._zapis_pouziti()
+            self._db.commit()
+            self._db.close()
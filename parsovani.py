@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Společné vytváření BeautifulSoup objektů pro oba skripty.
+Umožňuje zvolit parser (rychlý 'lxml', pokud je nainstalován, jinak
+vestavěný 'html.parser') a u detailních stránek sestavit strom jen
+z výsledkových tabulek (<table class="table">), protože nic jiného se
+z nich nečte. Obsahuje i převod čísel z textu stránek na int.
+"""
+
+import os                                   # Čtení proměnných prostředí (vestavěná v Pythonu)
+from importlib.util import find_spec         # Zjištění, zda je knihovna nainstalována
+from bs4 import BeautifulSoup, SoupStrainer  # Knihovna pro parsování HTML
+
+# Parsery, které lze zvolit. 'lxml' je řádově rychlejší, ale vyžaduje
+# instalaci knihovny lxml (pip install lxml).
+PODPOROVANE_PARSERY = ("lxml", "html.parser")
+
+# Filtr, který při parsování ponechá jen výsledkové tabulky
+JEN_TABULKY = SoupStrainer("table", class_="table")
+
+
+def _vychozi_parser():
+    """
+    Zvolí parser podle proměnné prostředí VOLBY_PARSER, případně 'lxml',
+    pokud je knihovna k dispozici, jinak 'html.parser'.
+    """
+    parser = os.environ.get("VOLBY_PARSER")
+    if parser:
+        if parser not in PODPOROVANE_PARSERY:
+            raise ValueError(
+                f"Neznámý parser '{parser}', podporované: {', '.join(PODPOROVANE_PARSERY)}"
+            )
+        return parser
+    # Knihovnu jen vyhledáme, načte ji až BeautifulSoup při prvním parsování
+    return "lxml" if find_spec("lxml") else "html.parser"
+
+
+PARSER = _vychozi_parser()
+
+
+def vytvor_polevku(html, jen_tabulky=False, parser=None):
+    """
+    Převede HTML stránky na objekt BeautifulSoup.
+
+    Parametry:
+        html (str): Obsah stránky.
+        jen_tabulky (bool): Pokud je True a parser je 'lxml', strom obsahuje
+                            jen elementy <table class="table"> (včetně jejich
+                            obsahu). S 'html.parser' je filtrování pomalejší
+                            než sestavení celého stromu, proto se nepoužije.
+        parser (str): Parser z PODPOROVANE_PARSERY; výchozí je PARSER.
+
+    Vrací:
+        BeautifulSoup: Naparsovaná stránka.
+    """
+    parser = parser or PARSER
+    return BeautifulSoup(
+        html,
+        parser,
+        parse_only=JEN_TABULKY if jen_tabulky and parser == "lxml" else None
+    )
+
+
+def na_cislo(text):
+    """
+    Převede číslo z webu volby.cz (např. '1 234' s nezlomitelnou mezerou)
+    na int. Prázdné nebo nečíselné hodnoty převede na 0.
+    """
+    if isinstance(text, int):
+        return text
+    cislo = "".join(str(text).split())
+    return int(cislo) if cislo.isdigit() else 0
+
+
+def na_hodnotu(text):
+    """
+    Převede text buňky na int, pokud jde o celé číslo (včetně oddělovačů
+    tisíců); jinak (např. procenta '51,98') vrátí text beze změny.
+    """
+    cislo = "".join(text.split())
+    return int(cislo) if cislo.isdigit() else text
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Měření průběhu běhu skriptů (parametr --profile).
+Zaznamenává dobu jednotlivých etap (stahování, parsování, zápis), dobu
+a velikost každého HTTP požadavku, opakované pokusy, zásahy mezipaměti,
+dobu parsování podle typu stránky, počet zapsaných řádků a špičkovou
+paměť. Na konci běhu se vše uloží do JSON zprávy. Volitelně lze parsovací
+funkce spouštět pod cProfile (parametr --cprofile) - souhrn se uloží do
+souboru .prof, který lze prohlížet např. modulem pstats nebo nástrojem snakeviz.
+
+Dokud se měření nezapne funkcí zapni(), všechny funkce modulu hned končí,
+takže běžný běh nezpomalují.
+"""
+
+import contextlib     # Správce kontextu pro měření etap (vestavěná v Pythonu)
+import json           # Formát zprávy (vestavěná v Pythonu)
+import sys            # Rozlišení systému pro jednotky paměti (vestavěná v Pythonu)
+import threading      # Zámek pro záznam z více vláken (vestavěná v Pythonu)
+import time           # Měření času (vestavěná v Pythonu)
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    import resource   # Špičková paměť procesu (jen Linux a macOS)
+except ImportError:
+    resource = None
+
+# Horní hranice přihrádek histogramu doby požadavků (v milisekundách)
+HRANICE_HISTOGRAMU = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Profil:
+    """
+    Sběr měření jednoho běhu. Bezpečné pro použití z více vláken.
+    """
+
+    def __init__(self):
+        self.zapnuto = False
+        self.cprofile = False
+        self._zamek = threading.Lock()
+        self._vynuluj()
+
+    def _vynuluj(self):
+        self._start = time.perf_counter()
+        self._zacatek = datetime.now()
+        self._etapy = {}
+        self._pozadavky = []             # (typ stránky, ms, bajty, stav)
+        self._chyby_spojeni = 0
+        self._opakovani = {}
+        self._mezipamet = {}
+        self._parsovani = {}             # typ stránky -> [počet, součet s, max s]
+        self._radky = 0
+        self._statistiky = None          # Souhrn cProfile (pstats.Stats)
+
+    def zapni(self, cprofile=False):
+        """
+        Zapne měření (a případně cProfile parsovacích funkcí) od této chvíle.
+        """
+        with self._zamek:
+            self._vynuluj()
+            self.zapnuto = True
+            self.cprofile = cprofile
+
+    @contextlib.contextmanager
+    def etapa(self, nazev):
+        """
+        Správce kontextu: změří dobu běhu bloku a připočte ji k etapě.
+
+        Příklad:
+            with PROFIL.etapa("zapis"):
+                uloz_vysledky(...)
+        """
+        if not self.zapnuto:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            doba = time.perf_counter() - start
+            with self._zamek:
+                self._etapy[nazev] = self._etapy.get(nazev, 0.0) + doba
+
+    def pozadavek(self, url, doba, bajty, stav):
+        """
+        Zaznamená jeden HTTP pokus (doba v sekundách, bajty přenesené po síti).
+        """
+        if not self.zapnuto:
+            return
+        with self._zamek:
+            self._pozadavky.append((typ_stranky(url), doba * 1000, bajty, stav))
+
+    def chyba_spojeni(self):
+        """
+        Zaznamená pokus, který skončil výpadkem spojení nebo timeoutem.
+        """
+        if not self.zapnuto:
+            return
+        with self._zamek:
+            self._chyby_spojeni += 1
+
+    def opakovani(self, duvod):
+        """
+        Zaznamená opakovaný pokus (důvod: stavový kód nebo typ chyby).
+        """
+        if not self.zapnuto:
+            return
+        with self._zamek:
+            self._opakovani[str(duvod)] = self._opakovani.get(str(duvod), 0) + 1
+
+    def mezipamet(self, vysledek):
+        """
+        Zaznamená výsledek dotazu do mezipaměti ('zasah', '304', 'minuti').
+        """
+        if not self.zapnuto:
+            return
+        with self._zamek:
+            self._mezipamet[vysledek] = self._mezipamet.get(vysledek, 0) + 1
+
+    def parsovani(self, typ, doba, statistiky=None):
+        """
+        Zaznamená dobu parsování jedné stránky daného typu (v sekundách)
+        a případně připojí statistiky cProfile (slovník Profile.stats).
+        """
+        if not self.zapnuto:
+            return
+        with self._zamek:
+            zaznam = self._parsovani.setdefault(typ, [0, 0.0, 0.0])
+            zaznam[0] += 1
+            zaznam[1] += doba
+            zaznam[2] = max(zaznam[2], doba)
+            if statistiky:
+                import pstats   # Jen při --cprofile
+                sada = _SadaStatistik(statistiky)
+                if self._statistiky is None:
+                    self._statistiky = pstats.Stats(sada)
+                else:
+                    self._statistiky.add(sada)
+
+    def radky(self, pocet):
+        """
+        Připočte počet zapsaných řádků výstupu.
+        """
+        if not self.zapnuto:
+            return
+        with self._zamek:
+            self._radky += pocet
+
+    def zprava(self):
+        """
+        Sestaví zprávu o běhu.
+
+        Vrací:
+            dict: Data zprávy (lze přímo uložit do JSON).
+        """
+        with self._zamek:
+            celkem = time.perf_counter() - self._start
+            doby = sorted(ms for _, ms, _, _ in self._pozadavky)
+            histogram = {f"<{h} ms": 0 for h in HRANICE_HISTOGRAMU}
+            histogram[f">={HRANICE_HISTOGRAMU[-1]} ms"] = 0
+            for ms in doby:
+                prihradka = next(
+                    (f"<{h} ms" for h in HRANICE_HISTOGRAMU if ms < h),
+                    f">={HRANICE_HISTOGRAMU[-1]} ms"
+                )
+                histogram[prihradka] += 1
+            stavy = {}
+            podle_typu = {}
+            for typ, ms, bajty, stav in self._pozadavky:
+                stavy[str(stav)] = stavy.get(str(stav), 0) + 1
+                zaznam = podle_typu.setdefault(typ, {"pocet": 0, "bajty": 0, "ms_celkem": 0.0})
+                zaznam["pocet"] += 1
+                zaznam["bajty"] += bajty
+                zaznam["ms_celkem"] += ms
+            for zaznam in podle_typu.values():
+                zaznam["ms_celkem"] = round(zaznam["ms_celkem"], 1)
+            zapis = self._etapy.get("zapis")
+            return {
+                "zacatek": self._zacatek.isoformat(timespec="seconds"),
+                "celkovy_cas_s": round(celkem, 3),
+                "etapy_s": {nazev: round(doba, 3) for nazev, doba in self._etapy.items()},
+                "pozadavky": {
+                    "pocet": len(doby),
+                    "bajty": sum(bajty for _, _, bajty, _ in self._pozadavky),
+                    "stavy": stavy,
+                    "chyby_spojeni": self._chyby_spojeni,
+                    "opakovani": self._opakovani,
+                    "mezipamet": self._mezipamet,
+                    "ms_p50": _percentil(doby, 50),
+                    "ms_p90": _percentil(doby, 90),
+                    "ms_p99": _percentil(doby, 99),
+                    "ms_max": round(doby[-1], 1) if doby else None,
+                    "histogram": histogram,
+                    "podle_typu_stranky": podle_typu,
+                },
+                "parsovani": {
+                    typ: {
+                        "stranek": pocet,
+                        "ms_prumer": round(soucet / pocet * 1000, 2),
+                        "ms_max": round(nejvic * 1000, 2),
+                    }
+                    for typ, (pocet, soucet, nejvic) in self._parsovani.items()
+                },
+                "radky": self._radky,
+                "radku_za_s": round(self._radky / celkem, 1) if celkem else None,
+                "radku_za_s_zapisu": round(self._radky / zapis, 1) if zapis else None,
+                "spickova_pamet_mb": _spickova_pamet_procesu(),
+            }
+
+    def uloz(self, cesta):
+        """
+        Uloží zprávu do JSON souboru; při zapnutém cProfile uloží vedle ní
+        i souhrn profilování (stejný název s příponou .prof).
+
+        Vrací:
+            Path: Cesta k uložené zprávě.
+        """
+        cesta = Path(cesta)
+        zprava = self.zprava()
+        if self._statistiky is not None:
+            cesta_prof = cesta.with_suffix(".prof")
+            self._statistiky.dump_stats(str(cesta_prof))
+            zprava["cprofile"] = str(cesta_prof)
+        with open(cesta, "w", encoding="utf-8") as soubor:
+            json.dump(zprava, soubor, ensure_ascii=False, indent=4)
+        print(f"Zpráva o běhu uložena do {cesta}")
+        return cesta
+
+
+class _SadaStatistik:
+    """
+    Obal statistik cProfile přenesených z jiného procesu, aby je šlo
+    předat do pstats.Stats (očekává objekt s metodou create_stats).
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _percentil(serazene, procento):
+    """
+    Vrátí percentil ze seřazeného seznamu (zaokrouhlený na 0,1), nebo None.
+    """
+    if not serazene:
+        return None
+    index = min(len(serazene) - 1, round(procento / 100 * (len(serazene) - 1)))
+    return round(serazene[index], 1)
+
+
+def spickova_pamet_mb(podprocesy=False):
+    """
+    Vrátí špičkovou paměť (RSS) v MB, nebo None, pokud ji na tomto systému
+    nelze zjistit.
+
+    Parametry:
+        podprocesy (bool): True = nejnáročnější z ukončených podřízených
+                           procesů (fond pro parsování) místo tohoto procesu.
+    """
+    if resource is None:
+        return None
+    kdo = resource.RUSAGE_CHILDREN if podprocesy else resource.RUSAGE_SELF
+    # Linux vrací ru_maxrss v kilobajtech, macOS v bajtech
+    jednotka = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(kdo).ru_maxrss / jednotka
+
+
+def _spickova_pamet_procesu():
+    """
+    Špičková paměť (RSS) hlavního procesu a nejnáročnějšího podřízeného
+    procesu v MB pro zprávu, nebo None, pokud ji nelze zjistit.
+    """
+    if resource is None:
+        return None
+    return {
+        "hlavni_proces": round(spickova_pamet_mb(), 1),
+        "podprocesy": round(spickova_pamet_mb(podprocesy=True), 1),
+    }
+
+
+def typ_stranky(url):
+    """
+    Vrátí typ stránky volby.cz podle URL (např. 'ps311' pro výsledky obce).
+    """
+    return urlsplit(url).path.rsplit("/", 1)[-1] or "?"
+
+
+def zmer_zpracovani(funkce, cprofile, *args):
+    """
+    Zavolá parsovací funkci a změří dobu jejího běhu. Je definována na
+    úrovni modulu, aby ji šlo předat do fondu procesů. Měří se procesorový
+    čas vlákna, takže výsledek nezkresluje čekání na ostatní stahovací vlákna.
+
+    Vrací:
+        tuple: (výsledek funkce, doba v sekundách, statistiky cProfile nebo None)
+    """
+    profiler = None
+    if cprofile:
+        import cProfile   # Jen při --cprofile
+        profiler = cProfile.Profile()
+    start = time.thread_time()
+    if profiler is not None:
+        vysledek = profiler.runcall(funkce, *args)
+        profiler.create_stats()
+    else:
+        vysledek = funkce(*args)
+    return vysledek, time.thread_time() - start, profiler.stats if profiler else None
+
+
+# Společný profil pro celý běh programu
+PROFIL = Profil()
+
+
+def pridej_parametry(parser):
+    """
+    Přidá do argparse parseru parametry --profile a --cprofile.
+    """
+    parser.add_argument("--profile", nargs="?", const="", metavar="SOUBOR",
+                        help="uložit zprávu o běhu do JSON (výchozí profil_<čas>.json)")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="navíc profilovat parsování (soubor .prof); zapne i --profile")
+
+
+def zapni_podle_parametru(parametry, slozka):
+    """
+    Zapne měření podle parametrů z pridej_parametry. Samotné --cprofile
+    zapne i --profile (s výchozím názvem zprávy).
+
+    Vrací:
+        Path nebo None: Cesta, kam se na konci uloží zpráva (None = měření vypnuto).
+    """
+    if parametry.profile is None and not parametry.cprofile:
+        return None
+    PROFIL.zapni(cprofile=parametry.cprofile)
+    nazev = parametry.profile or f"profil_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
+    return Path(slozka) / nazev
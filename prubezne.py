@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Průběžné výsledky během stahování (parametr --prubezne SEKUNDY).
+Obce se stahují v pořadí podle velikosti - nejdřív ty s největším počtem
+voličů - takže už po zlomku běhu je zpracována velká část voličů a průběžné
+součty se blíží konečným. Každých N sekund se do souborů
+<výstup>_prubezne_okresy a <výstup>_prubezne_stat přepíší dosavadní součty
+za okresy a za celý stát, včetně sloupce 'Pokrytí voličů %' (jaký podíl
+voličů naplánovaných obcí už je v součtech).
+
+Velikosti obcí (počty voličů) se berou z minulých běhů: po každém
+dokončeném stahování obcí se uloží do souboru velikosti_obci.json ve složce
+mezipaměti. Obce, jejichž velikost ještě neznáme, dostanou průměrnou
+známou velikost; bez jakýchkoli znalostí mají přednost obce rozdělené na
+okrsky (odkaz na výběr okrsku mají jen větší obce).
+"""
+
+import json           # Soubor s velikostmi obcí (vestavěná v Pythonu)
+import os             # Atomické nahrazení souborů (vestavěná v Pythonu)
+import time           # Interval zveřejňování (vestavěná v Pythonu)
+from pathlib import Path
+
+from mezipamet import VYCHOZI_SLOZKA
+from zapisovace import vytvor_zapisovac
+
+# Soubor s počty voličů obcí (kód obce -> voliči), společný pro všechny volby
+SOUBOR_VELIKOSTI = Path(VYCHOZI_SLOZKA) / "velikosti_obci.json"
+# Název sloupce s podílem zpracovaných voličů
+SLOUPEC_POKRYTI = "Pokrytí voličů %"
+# Počet stran v průběžném výpisu na obrazovku
+POCET_STRAN_VYPISU = 5
+
+
+def nacti_velikosti(cesta=SOUBOR_VELIKOSTI):
+    """
+    Načte počty voličů obcí z minulých běhů.
+
+    Vrací:
+        dict: Kód obce -> počet voličů (prázdný, pokud soubor chybí).
+    """
+    try:
+        with open(cesta, encoding="utf-8") as soubor:
+            return {str(cislo): int(pocet) for cislo, pocet in json.load(soubor).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def uloz_velikosti(tabulka, cesta=SOUBOR_VELIKOSTI):
+    """
+    Doplní (případně aktualizuje) počty voličů obcí z tabulky výsledků do
+    souboru velikostí. Zahraniční okrsky se neukládají.
+
+    Parametry:
+        tabulka (TabulkaVysledku): Tabulka obcí (sloupce 'Číslo obce',
+                                   'Voliči celkem', případně 'Okres').
+        cesta (str nebo Path): Soubor velikostí.
+
+    Vrací:
+        int: Počet obcí v tabulce, jejichž velikost se uložila.
+    """
+    sloupce = tabulka.zakladni_sloupce
+    if "Číslo obce" not in sloupce or "Voliči celkem" not in sloupce:
+        return 0
+    okresy = tabulka.sloupec("Okres") if "Okres" in sloupce else [None] * len(tabulka)
+    nove = {
+        cislo: pocet
+        for okres, cislo, pocet in zip(okresy, tabulka.sloupec("Číslo obce"),
+                                       tabulka.sloupec("Voliči celkem").tolist())
+        if okres != "Zahraničí" and cislo
+    }
+    if not nove:
+        return 0
+    velikosti = nacti_velikosti(cesta)
+    velikosti.update(nove)
+    cesta = Path(cesta)
+    cesta.parent.mkdir(parents=True, exist_ok=True)
+    docasny = cesta.with_name(cesta.name + ".tmp")
+    with open(docasny, "w", encoding="utf-8") as soubor:
+        json.dump(velikosti, soubor, separators=(",", ":"))
+    os.replace(docasny, cesta)
+    return len(nove)
+
+
+class PrubezneVysledky:
+    """
+    Plán stahování podle velikosti obcí a pravidelné zveřejňování
+    průběžných součtů.
+
+    Parametry:
+        vystup (str): Cesta k výstupnímu souboru bez přípony; průběžné
+                      soubory dostanou příponu _prubezne_okresy a _prubezne_stat.
+        format_vystupu (str): 'xlsx', 'csv' nebo 'parquet'.
+        interval (float): Jak často (v sekundách) se součty přepíší.
+        zaklad_okresu (callable): Okres -> základní údaje řádku ('Volby',
+                                  'Kraj', 'Okres'), podle kterých se sčítá.
+        klic_obce (callable): (okres, obec) -> hodnota klíče řádku obce
+                              v tabulce výsledků.
+        velikosti (dict): Kód obce -> počet voličů (výchozí z nacti_velikosti).
+    """
+
+    def __init__(self, vystup, format_vystupu, interval, zaklad_okresu, klic_obce,
+                 velikosti=None):
+        self.vystup = vystup
+        self.format_vystupu = format_vystupu
+        self.interval = interval
+        self._zaklad_okresu = zaklad_okresu
+        self._klic_obce = klic_obce
+        self.velikosti = nacti_velikosti() if velikosti is None else velikosti
+        self.poradi_klicu = []           # Klíče obcí v původním pořadí
+        self._plan = {}                  # klíč obce -> (skupina, váha)
+        self._planovano = {}             # skupina (okres) -> součet vah
+        self._zpracovano = {}            # skupina (okres) -> součet vah hotových obcí
+        self._hotove = set()
+        self._zacatek = time.monotonic()
+        self._posledni = self._zacatek
+        self.cesty = []
+
+    def naplanuj(self, ulohy):
+        """
+        Seřadí obce od největší po nejmenší a zapamatuje si jejich váhy
+        pro výpočet pokrytí.
+
+        Parametry:
+            ulohy (list): Dvojice (okres, obec) v pořadí okresů a obcí.
+
+        Vrací:
+            list: Stejné dvojice seřazené sestupně podle velikosti obce.
+        """
+        zname = [self.velikosti[obec["cislo"]] for _, obec in ulohy
+                 if obec["cislo"] in self.velikosti]
+        odhad = sum(zname) / len(zname) if zname else 1
+        vahy = []
+        for okres, obec in ulohy:
+            skupina = tuple(self._zaklad_okresu(okres).values())
+            vaha = self.velikosti.get(obec["cislo"], odhad)
+            klic = self._klic_obce(okres, obec)
+            self.poradi_klicu.append(klic)
+            self._plan[klic] = (skupina, vaha)
+            self._planovano[skupina] = self._planovano.get(skupina, 0) + vaha
+            vahy.append((vaha, bool(obec.get("okrsky"))))
+        poradi = sorted(range(len(ulohy)), key=lambda i: (-vahy[i][0], not vahy[i][1]))
+        znamych = len(zname)
+        print(f"Pořadí podle velikosti: známá velikost u {znamych} z {len(ulohy)} obcí.")
+        return [ulohy[i] for i in poradi]
+
+    def zaznamenej(self, tabulka, zaklad):
+        """
+        Započte právě přidaný řádek do pokrytí; po uplynutí intervalu
+        zveřejní průběžné součty.
+
+        Parametry:
+            tabulka (TabulkaVysledku): Tabulka, do které se řádek přidal.
+            zaklad (dict): Základní údaje přidaného řádku.
+        """
+        if isinstance(tabulka.klic, tuple):
+            klic = tuple(zaklad.get(sloupec) for sloupec in tabulka.klic)
+        else:
+            klic = zaklad.get(tabulka.klic)
+        plan = self._plan.get(klic)
+        if plan is not None and klic not in self._hotove:
+            self._hotove.add(klic)
+            skupina, vaha = plan
+            self._zpracovano[skupina] = self._zpracovano.get(skupina, 0) + vaha
+        if time.monotonic() - self._posledni >= self.interval:
+            self.zverejni(tabulka)
+
+    def _pokryti(self, skupina):
+        """
+        Podíl zpracovaných voličů v procentech pro skupinu (n-tici hodnot
+        skupinových sloupců; kratší n-tice = součet přes všechny okresy
+        s touto předponou). Skupina bez naplánovaných obcí vrací None.
+        """
+        planovano = sum(vaha for klic, vaha in self._planovano.items()
+                        if klic[:len(skupina)] == skupina)
+        if not planovano:
+            return None
+        zpracovano = sum(vaha for klic, vaha in self._zpracovano.items()
+                         if klic[:len(skupina)] == skupina)
+        return round(100.0 * zpracovano / planovano, 2)
+
+    def zverejni(self, tabulka):
+        """
+        Přepíše soubory průběžných součtů za okresy a za stát a vypíše
+        pokrytí a vedoucí strany.
+
+        Parametry:
+            tabulka (TabulkaVysledku): Dosud sestavená tabulka obcí.
+        """
+        self._posledni = time.monotonic()
+        if not len(tabulka):
+            return
+        predpona = ("Volby",) if "Volby" in tabulka.zakladni_sloupce else ()
+        self.cesty = []
+        for uroven, skupiny in (("okresy", predpona + ("Kraj", "Okres")), ("stat", predpona)):
+            sloupce, radky = tabulka.souhrn(
+                skupiny,
+                podily={"Účast %": ("Odevzdané obálky", "Voliči celkem")},
+                zaklad_podilu="Platné hlasy",
+                nazev_poctu="Počet obcí",
+            )
+            for radek in radky:
+                radek[SLOUPEC_POKRYTI] = self._pokryti(tuple(radek[s] for s in skupiny))
+            sloupce = sloupce[:len(skupiny)] + [SLOUPEC_POKRYTI] + sloupce[len(skupiny):]
+            self.cesty.append(self._prepis(f"{self.vystup}_prubezne_{uroven}", sloupce, radky))
+            if uroven == "stat":
+                self._vypis(radky, predpona, tabulka.strany)
+
+    def _prepis(self, cesta_bez_pripony, sloupce, radky):
+        """
+        Zapíše řádky do dočasného souboru a ten pak přejmenuje na cílový,
+        takže čtenář průběžného souboru nikdy neuvidí rozepsaný soubor.
+        """
+        with vytvor_zapisovac(self.format_vystupu, f"{cesta_bez_pripony}_tmp",
+                              sloupce) as zapisovac:
+            for radek in radky:
+                zapisovac.zapis(radek)
+        cilova = zapisovac.cesta.with_name(
+            zapisovac.cesta.name.replace("_tmp.", ".", 1)
+        )
+        os.replace(zapisovac.cesta, cilova)
+        return cilova
+
+    def _vypis(self, radky, predpona, strany):
+        """
+        Vypíše pokrytí a nejsilnější strany za celý stát (za každé volby).
+        """
+        doba = time.monotonic() - self._zacatek
+        for radek in radky:
+            popis = f" {radek['Volby']}" if predpona else ""
+            vedouci = sorted(strany, key=lambda strana: -radek.get(strana, 0))[:POCET_STRAN_VYPISU]
+            print(
+                f"[průběžně{popis}, {doba:.0f} s] {radek['Počet obcí']} obcí, "
+                f"pokryto {radek[SLOUPEC_POKRYTI] or 0:.1f} % voličů: "
+                + ", ".join(f"{strana} {radek[f'{strana} %']:.1f} %" for strana in vedouci)
+            )
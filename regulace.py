@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ohleduplné řízení zátěže serveru (regulace požadavků podle serveru).
+Pro každý server (host) se drží dva limity:
+    okno     - kolik požadavků smí být rozpracováno najednou
+    rychlost - kolik požadavků smí začít za sekundu (token bucket)
+Oba limity se řídí metodou AIMD (jako řízení zahlcení v TCP): dokud server
+odpovídá rychle a bez chyb, limity rostou - do prvního přetížení rychle
+(zdvojnásobení za každé okno odpovědí), potom už jen aditivně; při odpovědi
+429/503, timeoutu, výpadku spojení nebo náhlém nárůstu doby odpovědi se
+skokově sníží na 70 % (multiplikativně). Hlavička Retry-After pozastaví
+všechny požadavky na daný server na požadovanou dobu. Propustnost se tak
+sama ustálí těsně pod skutečným limitem serveru, bez ručního ladění.
+"""
+
+import os             # Čtení proměnných prostředí (vestavěná v Pythonu)
+import threading      # Čekání vláken na volné místo (vestavěná v Pythonu)
+import time           # Měření času (vestavěná v Pythonu)
+
+# Počáteční a nejmenší počet souběžných požadavků na jeden server
+POCATECNI_OKNO = 2
+MIN_OKNO = 1
+# Počáteční, nejmenší a největší počet požadavků za sekundu na jeden server
+POCATECNI_RYCHLOST = 10.0
+MIN_RYCHLOST = 0.5
+MAX_RYCHLOST = float(os.environ.get("VOLBY_MAX_RYCHLOST", "200"))
+# O kolik požadavků za sekundu se rychlost zvýší po každé zdravé odpovědi
+PRIRUSTEK_RYCHLOSTI = 0.5
+# Kolikrát se limity zmenší při přetížení serveru (jako v TCP CUBIC)
+SNIZENI = 0.7
+# Stavové kódy, které znamenají přetížení serveru
+STAVY_PRETIZENI = {429, 503}
+# Odpověď je "špička", pokud trvá déle než NASOBEK_SPICKY x průměrná doba
+# odpovědi a zároveň déle než MIN_SPICKA sekund
+NASOBEK_SPICKY = 3.0
+MIN_SPICKA = 0.5
+# Váha nové odpovědi v klouzavém průměru doby odpovědi
+VAHA_PRUMERU = 0.1
+# Počet odpovědí, po kterém je průměr dost spolehlivý pro hledání špiček
+MIN_ODPOVEDI_PRUMERU = 10
+# Nejdelší čekání na volné místo v okně, během kterého žádný požadavek
+# neskončil (v sekundách); pak se místa považují za ztracená a požadavek
+# se pustí, aby se stahování nezastavilo navždy
+MAX_CEKANI_OKNA = float(os.environ.get("VOLBY_MAX_CEKANI_OKNA", "120"))
+
+
+class Regulator:
+    """
+    Regulace požadavků na jeden server. Bezpečné pro použití z více vláken.
+
+    Parametry:
+        max_okno (int): Nejvyšší povolený počet souběžných požadavků
+                        (obvykle velikost fondu spojení).
+        max_rychlost (float): Nejvyšší povolený počet požadavků za sekundu.
+    """
+
+    def __init__(self, max_okno, max_rychlost=MAX_RYCHLOST):
+        self.max_okno = max(MIN_OKNO, max_okno)
+        self.max_rychlost = max_rychlost
+        self.okno = float(min(POCATECNI_OKNO, self.max_okno))
+        self.rychlost = min(POCATECNI_RYCHLOST, max_rychlost)
+        self.prumerna_doba = None
+        self.pocet_odpovedi = 0
+        self.pocet_snizeni = 0
+        self._podminka = threading.Condition()
+        self._rozpracovano = 0
+        self._tokeny = 1.0
+        self._doplneno = time.monotonic()
+        self._pauza_do = 0.0
+        self._posledni_snizeni = 0.0
+        self._posledni_dokonceni = time.monotonic()
+
+    def _dopln_tokeny(self, ted):
+        """
+        Doplní tokeny podle uplynulého času (nejvýše na jedno okno naráz).
+        """
+        kapacita = max(1.0, min(self.okno, self.rychlost))
+        self._tokeny = min(kapacita, self._tokeny + (ted - self._doplneno) * self.rychlost)
+        self._doplneno = ted
+
+    def zacni(self):
+        """
+        Počká, až smí začít další požadavek (volné místo v okně, token
+        rychlosti a žádná pauza po Retry-After), a zabere místo v okně.
+
+        Vrací:
+            float: Okamžik začátku (time.monotonic) pro metodu dokonci.
+        """
+        with self._podminka:
+            nad_ramec = False
+            while True:
+                ted = time.monotonic()
+                if ted < self._pauza_do:
+                    self._podminka.wait(self._pauza_do - ted)
+                    continue
+                if self._rozpracovano >= int(self.okno) and not nad_ramec:
+                    zbyva = self._posledni_dokonceni + MAX_CEKANI_OKNA - ted
+                    if zbyva > 0:
+                        self._podminka.wait(zbyva)
+                        continue
+                    # Dlouho žádný požadavek neskončil - místa v okně jsou
+                    # nejspíš ztracená; požadavek se pustí nad rámec okna
+                    nad_ramec = True
+                    self._posledni_dokonceni = ted
+                self._dopln_tokeny(ted)
+                if self._tokeny < 1.0:
+                    self._podminka.wait((1.0 - self._tokeny) / self.rychlost)
+                    continue
+                self._tokeny -= 1.0
+                self._rozpracovano += 1
+                return ted
+
+    def dokonci(self, zacatek, doba, stav=None, chyba=False, retry_after=None):
+        """
+        Uvolní místo v okně a podle výsledku požadavku upraví limity.
+
+        Parametry:
+            zacatek (float): Hodnota vrácená metodou zacni.
+            doba (float): Doba odpovědi v sekundách.
+            stav (int): Stavový kód odpovědi (None při chybě spojení).
+            chyba (bool): Požadavek skončil timeoutem nebo výpadkem spojení.
+            retry_after (float): Hodnota hlavičky Retry-After v sekundách.
+        """
+        with self._podminka:
+            self._rozpracovano = max(0, self._rozpracovano - 1)
+            ted = time.monotonic()
+            self._posledni_dokonceni = ted
+            if retry_after:
+                self._pauza_do = max(self._pauza_do, ted + retry_after)
+            pretizeni = chyba or stav in STAVY_PRETIZENI or self._je_spicka(doba)
+            if pretizeni:
+                # Na jednu vlnu přetížení se reaguje jen jednou - požadavky
+                # odeslané ještě před posledním snížením se nezapočítávají
+                if zacatek >= self._posledni_snizeni:
+                    self.okno = max(MIN_OKNO, self.okno * SNIZENI)
+                    self.rychlost = max(MIN_RYCHLOST, self.rychlost * SNIZENI)
+                    self._tokeny = min(self._tokeny, 1.0)
+                    self._posledni_snizeni = ted
+                    self.pocet_snizeni += 1
+            elif stav is not None and stav < 500:
+                if self.pocet_snizeni == 0:
+                    # Rychlý start: za každé okno odpovědí se limity zdvojnásobí
+                    self.rychlost += self.rychlost / self.okno
+                    self.okno += 1
+                else:
+                    # Okno roste zhruba o 1 za každé plné okno zdravých odpovědí
+                    self.okno += 1 / self.okno
+                    self.rychlost += PRIRUSTEK_RYCHLOSTI
+                self.okno = min(self.max_okno, self.okno)
+                self.rychlost = min(self.max_rychlost, self.rychlost)
+                self.pocet_odpovedi += 1
+                if self.prumerna_doba is None:
+                    self.prumerna_doba = doba
+                else:
+                    self.prumerna_doba += VAHA_PRUMERU * (doba - self.prumerna_doba)
+            self._podminka.notify_all()
+
+    def _je_spicka(self, doba):
+        """
+        Zjistí, zda doba odpovědi výrazně přesahuje dosavadní průměr.
+        """
+        return (self.pocet_odpovedi >= MIN_ODPOVEDI_PRUMERU
+                and doba > MIN_SPICKA
+                and doba > NASOBEK_SPICKY * self.prumerna_doba)
+
+    def stav(self):
+        """
+        Vrátí aktuální limity a statistiku (pro výpis a zprávu o běhu).
+        """
+        with self._podminka:
+            return {
+                "okno": round(self.okno, 2),
+                "rychlost": round(self.rychlost, 2),
+                "prumerna_doba_ms": (round(self.prumerna_doba * 1000, 1)
+                                     if self.prumerna_doba is not None else None),
+                "odpovedi": self.pocet_odpovedi,
+                "snizeni": self.pocet_snizeni,
+            }
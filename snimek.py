@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Snímek stažených stránek (archiv surového HTML) pro opakované parsování.
+S parametrem --snimek se každá stránka, kterou běh použije, připíše do
+archivu: do datového souboru se na konec zapíše komprimovaný obsah stránky
+a do indexu (vedlejší soubor .idx, jeden řádek JSON na stránku) její URL,
+pozice a délka v datovém souboru - podobně jako WARC s indexem CDX.
+Stránky se komprimují jednotlivě, takže lze kteroukoli přečíst samostatně.
+
+S parametrem --ze-snimku se archiv namapuje do paměti (mmap) a klient vrací
+stránky přímo z něj, bez sítě i bez mezipaměti. Po změně parsování tak jde
+celý běh zopakovat nad stejnými daty a jeho rychlost určuje jen procesor.
+Stránka, která v archivu chybí, se nestahuje - klient vyvolá ChybiVeSnimku
+a URL se zapamatuje v seznamu chybějících stránek.
+
+Komprese je zstd (knihovna zstandard), pokud je nainstalována, jinak zlib
+(vestavěná v Pythonu; archiv je asi o 15 % větší).
+Metoda komprese se ukládá u každé stránky, takže archiv zapsaný s zstd
+přečte jen prostředí se zstandard, archiv se zlib přečte každé. Do jednoho
+archivu lze připisovat i z prostředí s různými knihovnami.
+
+Při opakovaném zápisu do existujícího archivu se načte jeho index, takže
+počet stránek i poslední verze stránek zahrnují dřívější běhy. U každé
+stránky se ukládá i otisk obsahu; stránka se stejným obsahem, jaký už má
+poslední verze její URL, se znovu nezapisuje.
+"""
+
+import hashlib        # Otisky obsahu stránek (vestavěná v Pythonu)
+
+import json           # Formát indexu (vestavěná v Pythonu)
+import mmap           # Čtení archivu bez kopírování do paměti (vestavěná v Pythonu)
+import os             # Zápis na disk (vestavěná v Pythonu)
+import threading      # Zámek pro zápis z více vláken (vestavěná v Pythonu)
+import zlib           # Záložní komprese (vestavěná v Pythonu)
+from pathlib import Path
+
+import requests       # Základní třída výjimky pro chybějící stránku
+
+try:
+    import zstandard  # Volitelná knihovna: rychlejší a účinnější komprese
+except ImportError:
+    zstandard = None
+
+# Přípona indexu vedle datového souboru archivu
+PRIPONA_INDEXU = ".idx"
+# Úroveň komprese (zstd 1-22, zlib 1-9)
+UROVEN_ZSTD = 10
+UROVEN_ZLIB = 6
+
+
+class ChybiVeSnimku(requests.RequestException):
+    """
+    Stránka, o kterou běh se --ze-snimku požádal, v archivu není.
+    """
+
+
+class Snimek:
+    """
+    Archiv stránek: datový soubor s komprimovanými stránkami a index
+    URL -> (pozice, délka, komprese, Content-Type). Při opakovaném zápisu
+    stejné URL (např. v režimu --watch nebo v dalším běhu) platí poslední
+    verze.
+
+    Parametry:
+        cesta (str nebo Path): Cesta k datovému souboru archivu.
+        zapis (bool): True = otevřít pro zápis (připisování na konec,
+                      existující index se načte), False = otevřít pro čtení
+                      (namapovat do paměti).
+        komprese (str): 'zstd' nebo 'zlib' pro zápis; výchozí je zstd,
+                        pokud je nainstalována knihovna zstandard.
+    """
+
+    def __init__(self, cesta, zapis=False, komprese=None):
+        self.cesta = Path(cesta)
+        self.cesta_indexu = self.cesta.with_name(self.cesta.name + PRIPONA_INDEXU)
+        self.zapis_povolen = zapis
+        self._zamek = threading.Lock()
+        self._mistni = threading.local()
+        self._index = {}
+        self._otisky = {}            # URL -> otisk obsahu poslední verze stránky
+        self._mapa = None
+        self.chybejici = {}          # URL stránek, které v archivu nebyly (v pořadí)
+        if zapis:
+            if komprese == "zstd" and zstandard is None:
+                raise RuntimeError("Komprese zstd vyžaduje knihovnu zstandard.")
+            self.komprese = komprese or ("zstd" if zstandard is not None else "zlib")
+            if self.cesta_indexu.exists():
+                self._nacti_index()
+            self._data = open(self.cesta, "ab")
+            self._soubor_indexu = open(self.cesta_indexu, "a", encoding="utf-8")
+        else:
+            self._nacti_index()
+            self._data = open(self.cesta, "rb")
+            if os.path.getsize(self.cesta):
+                self._mapa = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _nacti_index(self):
+        """
+        Načte index do paměti. Neúplný poslední řádek (po pádu během zápisu)
+        se přeskočí. Starší indexy nemají otisk obsahu (šestý prvek chybí).
+        """
+        with open(self.cesta_indexu, encoding="utf-8") as soubor:
+            for radek in soubor:
+                try:
+                    url, pozice, delka, komprese, typ, *otisk = json.loads(radek)
+                except ValueError:
+                    continue
+                self._index[url] = (pozice, delka, komprese, typ)
+                self._otisky[url] = otisk[0] if otisk else None
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, url):
+        return url in self._index
+
+    def zapis(self, url, obsah, typ=None):
+        """
+        Připíše stránku na konec archivu.
+
+        Parametry:
+            url (str): URL stránky.
+            obsah (bytes): Obsah stránky (nekomprimovaný).
+            typ (str): Hlavička Content-Type (kvůli kódování textu).
+        """
+        otisk = hashlib.blake2b(obsah, digest_size=16).hexdigest()
+        if self._otisky.get(url) == otisk:
+            return
+        if self.komprese == "zstd":
+            # Kompresor nelze sdílet mezi vlákny - každé má vlastní
+            kompresor = getattr(self._mistni, "kompresor", None)
+            if kompresor is None:
+                kompresor = self._mistni.kompresor = zstandard.ZstdCompressor(level=UROVEN_ZSTD)
+            data = kompresor.compress(obsah)
+        else:
+            data = zlib.compress(obsah, UROVEN_ZLIB)
+        with self._zamek:
+            if self._otisky.get(url) == otisk:
+                return
+            pozice = self._data.tell()
+            self._data.write(data)
+            # Data musí být v souboru dřív, než na ně ukáže index
+            self._data.flush()
+            self._soubor_indexu.write(
+                json.dumps([url, pozice, len(data), self.komprese, typ, otisk],
+                           ensure_ascii=False)
+                + "\n"
+            )
+            self._soubor_indexu.flush()
+            self._index[url] = (pozice, len(data), self.komprese, typ)
+            self._otisky[url] = otisk
+
+    def nacti(self, url):
+        """
+        Přečte stránku z archivu.
+
+        Parametry:
+            url (str): URL stránky.
+
+        Vrací:
+            tuple nebo None: (obsah v bajtech, Content-Type), nebo None,
+                             pokud stránka v archivu není.
+        """
+        zaznam = self._index.get(url)
+        if zaznam is None or self._mapa is None:
+            with self._zamek:
+                self.chybejici[url] = None
+            return None
+        pozice, delka, komprese, typ = zaznam
+        data = self._mapa[pozice:pozice + delka]
+        if komprese == "zstd":
+            if zstandard is None:
+                raise RuntimeError(
+                    "Snímek je komprimován zstd; pro čtení nainstalujte knihovnu zstandard."
+                )
+            # Dekompresor nelze sdílet mezi vlákny - každé má vlastní
+            dekompresor = getattr(self._mistni, "dekompresor", None)
+            if dekompresor is None:
+                dekompresor = self._mistni.dekompresor = zstandard.ZstdDecompressor()
+            return dekompresor.decompress(data), typ
+        return zlib.decompress(data), typ
+
+    def zavri(self):
+        """
+        Zavře soubory archivu.
+        """
+        with self._zamek:
+            if self._mapa is not None:
+                self._mapa.close()
+                self._mapa = None
+            self._data.close()
+            if self.zapis_povolen:
+                self._soubor_indexu.close()
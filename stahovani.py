@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Společný modul pro souběžné stahování detailních stránek z webu volby.cz.
+Používají ho oba skripty (volby_okresy.py i Zahranici.py) - místo toho, aby
+se stránky obcí a zahraničních okrsků stahovaly jedna po druhé, stahuje se
+jich najednou několik v omezeném počtu vláken. Parsování stažených stránek
+lze navíc přesunout do fondu procesů, aby se využila všechna jádra procesoru.
+Výsledky se vrací ve stejném pořadí, v jakém byly předány vstupní položky.
+"""
+
+import os                                          # Čtení proměnných prostředí (vestavěná v Pythonu)
+from collections import deque                      # Fronta rozpracovaných položek
+from concurrent.futures import ThreadPoolExecutor  # Fond vláken (fond procesů se načte až při použití)
+from profilovani import PROFIL, zmer_zpracovani    # Měření doby parsování (--profile)
+
+# Výchozí počet souběžně stahovaných stránek. Lze změnit proměnnou prostředí
+# VOLBY_VLAKNA nebo parametrem 'pocet_vlaken' u funkce zpracuj_paralelne.
+VYCHOZI_POCET_VLAKEN = int(os.environ.get("VOLBY_VLAKNA", "8"))
+# Výchozí počet procesů pro parsování stránek (proměnná prostředí VOLBY_PROCESY).
+# Hodnota 1 znamená parsování přímo ve stahovacích vláknech.
+VYCHOZI_POCET_PROCESU = int(os.environ.get("VOLBY_PROCESY", str(os.cpu_count() or 1)))
+
+
+def zpracuj_postupne(funkce, polozky, pocet_vlaken=None, okno=None):
+    """
+    Generátor: volá funkci pro položky v omezeném počtu vláken a výsledky
+    vrací postupně ve stejném pořadí jako vstupní položky. Najednou je
+    rozpracováno nejvýše 'okno' položek, takže paměť nezávisí na jejich počtu.
+
+    Parametry:
+        funkce (callable): Funkce s jedním parametrem (např. nacti_data_obce).
+        polozky (iterable): Položky, pro které se má funkce zavolat.
+        pocet_vlaken (int): Maximální počet souběžných volání. Pokud není
+                            zadán, použije se VYCHOZI_POCET_VLAKEN.
+        okno (int): Maximální počet rozpracovaných položek (výchozí
+                    čtyřnásobek počtu vláken).
+
+    Vrací:
+        generator: Výsledky funkce v pořadí vstupních položek. Pokud některé
+                   volání vyvolá výjimku, předá se volajícímu.
+    """
+    if pocet_vlaken is None:
+        pocet_vlaken = VYCHOZI_POCET_VLAKEN
+    pocet_vlaken = max(1, pocet_vlaken)
+    if okno is None:
+        okno = 4 * pocet_vlaken
+
+    # Při jednom vlákně nemá smysl zakládat fond - chování je pak stejné
+    # jako u původní sekvenční smyčky
+    if pocet_vlaken == 1:
+        for polozka in polozky:
+            yield funkce(polozka)
+        return
+
+    with ThreadPoolExecutor(max_workers=pocet_vlaken) as executor:
+        rozpracovane = deque()
+        for polozka in polozky:
+            rozpracovane.append(executor.submit(funkce, polozka))
+            if len(rozpracovane) >= okno:
+                yield rozpracovane.popleft().result()
+        while rozpracovane:
+            yield rozpracovane.popleft().result()
+
+
+def zpracuj_paralelne(funkce, polozky, pocet_vlaken=None):
+    """
+    Zavolá funkci pro každou položku seznamu v omezeném počtu vláken.
+
+    Parametry:
+        funkce (callable): Funkce s jedním parametrem (např. nacti_data_obce).
+        polozky (iterable): Položky, pro které se má funkce zavolat.
+        pocet_vlaken (int): Maximální počet souběžných volání. Pokud není
+                            zadán, použije se VYCHOZI_POCET_VLAKEN.
+
+    Vrací:
+        list: Výsledky funkce ve stejném pořadí jako vstupní položky.
+              Pokud některé volání vyvolá výjimku, předá se volajícímu.
+    """
+    return list(zpracuj_postupne(funkce, polozky, pocet_vlaken))
+
+
+def stahni_a_zpracuj_postupne(polozky, stahni_stranku, zpracuj_stranku,
+                              pocet_vlaken=None, pocet_procesu=None, typ_stranky=None):
+    """
+    Generátor: stáhne stránky pro všechny položky ve fondu vláken a každou
+    staženou stránku hned předá k parsování do fondu procesů. Stahování
+    dalších stránek tak probíhá současně s parsováním již stažených.
+    Výsledky se vrací postupně a rozpracovaných stránek je vždy jen omezený
+    počet, takže paměť nezávisí na počtu položek.
+
+    Parametry:
+        polozky (iterable): Položky ke zpracování (např. slovníky obcí).
+        stahni_stranku (callable): Funkce(polozka) -> HTML stránky (str),
+                                   případně None, pokud se stránku
+                                   nepodařilo stáhnout.
+        zpracuj_stranku (callable): Funkce(polozka, html) -> výsledek. Musí
+                                    být definována na úrovni modulu, aby ji
+                                    šlo předat do jiného procesu.
+        pocet_vlaken (int): Počet souběžně stahovaných stránek.
+        pocet_procesu (int): Počet procesů pro parsování.
+        typ_stranky (str nebo callable): Typ stránky pro měření doby
+                                         parsování (--profile), např. 'ps311',
+                                         nebo funkce(polozka) -> typ. Bez
+                                         zadání se použije název funkce.
+
+    Vrací:
+        generator: Výsledky zpracování ve stejném pořadí jako vstupní
+                   položky (None u položek, jejichž stránku se nepodařilo
+                   stáhnout).
+    """
+    if pocet_procesu is None:
+        pocet_procesu = VYCHOZI_POCET_PROCESU
+
+    # Při měření (--profile) se parsování spouští přes zmer_zpracovani, které
+    # vrací i dobu parsování; zaznamená ji až hlavní proces
+    merit = PROFIL.zapnuto
+    if typ_stranky is None:
+        typ_stranky = zpracuj_stranku.__name__.lstrip("_")
+
+    def zaznamenej(polozka, mereni):
+        vysledek, doba, statistiky = mereni
+        typ = typ_stranky(polozka) if callable(typ_stranky) else typ_stranky
+        PROFIL.parsovani(typ, doba, statistiky)
+        return vysledek
+
+    # Bez fondu procesů se stránka zparsuje rovnou ve stahovacím vlákně
+    if pocet_procesu <= 1:
+        def stahni_a_zparsuj(polozka):
+            html = stahni_stranku(polozka)
+            if html is None:
+                return None
+            if merit:
+                return zaznamenej(
+                    polozka, zmer_zpracovani(zpracuj_stranku, PROFIL.cprofile, polozka, html)
+                )
+            return zpracuj_stranku(polozka, html)
+        yield from zpracuj_postupne(stahni_a_zparsuj, polozky, pocet_vlaken)
+        return
+
+    # Modul fondu procesů (multiprocessing) se načítá až tady, aby nezdržoval start
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=pocet_procesu) as procesy:
+        def stahni_a_predej(polozka):
+            html = stahni_stranku(polozka)
+            if html is None:
+                return None
+            if merit:
+                return polozka, procesy.submit(
+                    zmer_zpracovani, zpracuj_stranku, PROFIL.cprofile, polozka, html
+                )
+            return procesy.submit(zpracuj_stranku, polozka, html)
+
+        # Vlákna vrací "příslib" výsledku parsování, na který se pak počká
+        for budouci in zpracuj_postupne(stahni_a_predej, polozky, pocet_vlaken):
+            if budouci is None:
+                yield None
+            elif merit:
+                polozka, budouci = budouci
+                yield zaznamenej(polozka, budouci.result())
+            else:
+                yield budouci.result()
+
+
+def stahni_a_zpracuj(polozky, stahni_stranku, zpracuj_stranku,
+                     pocet_vlaken=None, pocet_procesu=None, typ_stranky=None):
+    """
+    Stejné jako stahni_a_zpracuj_postupne, ale vrací všechny výsledky
+    najednou jako seznam.
+
+    Vrací:
+        list: Výsledky zpracování ve stejném pořadí jako vstupní položky.
+    """
+    return list(stahni_a_zpracuj_postupne(
+        polozky, stahni_stranku, zpracuj_stranku, pocet_vlaken, pocet_procesu, typ_stranky
+    ))
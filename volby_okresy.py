@@ -12,16 +12,64 @@ Pro podrobnou nápovědu k jednotlivým funkcím viz 'napoveda.md'.
 """
 
 import requests       # Knihovna pro HTTP požadavky
-from bs4 import BeautifulSoup   # Knihovna pro parsování HTML
+from parsovani import vytvor_polevku, na_cislo  # Parsování HTML (BeautifulSoup, volitelně lxml)
 import json           # Knihovna pro práci s formátem JSON (vestavěná v Pythonu)
 import os             # Práce se soubory a operačním systémem (vestavěná v Pythonu)
 from datetime import datetime  # Práce s datem a časem (vestavěná v Pythonu)
-import pandas as pd   # Knihovna pro tabulková data
 import re             # Regulární výrazy (vestavěná v Pythonu)
-import subprocess     # Knihovna pro volání externích procesů (využijeme k volání Zahranici.py)
+import argparse       # Zpracování parametrů příkazové řádky (vestavěná v Pythonu)
+import hashlib        # Otisky stránek pro sledování změn (vestavěná v Pythonu)
+import time           # Interval sledování (vestavěná v Pythonu)
+import sqlite3        # Chyba zamčené databáze při --db (vestavěná v Pythonu)
+import socket         # Název počítače pro identifikaci pracovníka fronty (vestavěná v Pythonu)
+from collections import deque  # Úlohy rozpracované pracovníkem fronty
+from urllib.parse import urlsplit, parse_qs  # Čísla okrsků z odkazů (vestavěná v Pythonu)
+from stahovani import zpracuj_postupne, stahni_a_zpracuj_postupne  # Souběžné stahování a parsování
+from zapisovace import vytvor_zapisovac, FORMATY  # Průběžný zápis výsledků (xlsx, csv, parquet)
+from denik import Denik, zpracuj_s_denikem  # Deník hotových obcí pro pokračování po pádu
+from adresar import Adresar, cesta_adresare  # Trvalý adresář okresů a obcí
+import Zahranici      # Zpracování zahraničních okrsků (volba 14 a celostátní režim)
+from klient import stahni, nastav_klienta  # Sdílený HTTP klient (keep-alive, timeouty, opakování)
+from snimek import Snimek, ChybiVeSnimku   # Archiv stažených stránek pro opakované parsování
+from fronta import Fronta, DrzenePujcky  # Sdílená fronta úloh pro více pracovníků
+from prubezne import PrubezneVysledky, uloz_velikosti  # Pořadí podle velikosti a průběžné součty
+from extraktory import extrahuj  # Předkompilované extraktory stránek (lxml)
+from profilovani import PROFIL, pridej_parametry, zapni_podle_parametru, typ_stranky  # Zpráva o běhu (--profile)
 
-# Základní URL adresa pro volby
-ZAKLADNI_URL = "https://www.volby.cz/pls/ps2017nss/ps3?xjazyk=CZ"
+# Stránka se seznamem okresů v rámci adresy voleb
+STRANKA_OKRESU = "ps3?xjazyk=CZ"
+# Základní URL adresa pro volby (výchozí volby, jiné viz parametr --volby)
+ZAKLADNI_URL = Zahranici.url_voleb(Zahranici.VYCHOZI_VOLBY) + STRANKA_OKRESU
+
+# Společné sloupce celostátního výstupu (za nimi následují sloupce stran)
+SLOUPCE_CELOSTATNI = [
+    "Kraj", "Okres", "Číslo obce", "Název obce",
+    "Voliči celkem", "Odevzdané obálky", "Platné hlasy"
+]
+# Sloupce z nacti_data_obce (a zpracuj_data_okrsku), které nejsou stranami
+SLOUPCE_OBCE = {
+    "Číslo obce", "Název obce", "Okrsek", "Voliči celkem", "Odevzdané obálky", "Platné hlasy"
+}
+# Textové sloupce mezi nimi (ostatní jsou počty)
+TEXTOVE_SLOUPCE_OBCE = ("Číslo obce", "Název obce", "Okrsek")
+# Souhrnné tabulky celostátního výstupu: přípona souboru -> sloupce, podle
+# kterých se obce sčítají (v dávce více voleb navíc vždy podle 'Volby')
+UROVNE_SOUHRNU = {
+    "okresy": ("Kraj", "Okres"),
+    "kraje": ("Kraj",),
+    "stat": (),
+}
+# V režimu okrsků (--okrsky) se okrsky navíc sčítají i za obce
+UROVNE_SOUHRNU_OKRSKU = {"obce": ("Kraj", "Okres", "Číslo obce", "Název obce"), **UROVNE_SOUHRNU}
+# Buňky s názvem okresu a s odkazem na jeho obce na stránce ps3
+HLAVICKY_NAZVU_OKRESU = re.compile(r"t[1-9][0-4]?sa1 t[1-9][0-4]?sb2")
+HLAVICKY_ODKAZU_OKRESU = re.compile(r"t[1-9][0-4]?sa3")
+# Otevřené adresáře okresů a obcí (URL stránky ps3 -> Adresar)
+_adresare = {}
+# Kolik úloh si pracovník fronty půjčí najednou
+VELIKOST_DAVKY = 16
+# Jak dlouho (v sekundách) pracovník čeká, když zbývající úlohy zpracovávají jiní
+CEKANI_NA_FRONTU = 2
 
 
 def ziskej_plnou_url(zakladni_url, relativni_url):
@@ -38,29 +86,55 @@ def ziskej_plnou_url(zakladni_url, relativni_url):
     return requests.compat.urljoin(zakladni_url, relativni_url)
 
 
-def nacti_okresni_mesta():
+def nacti_okresni_mesta(url=None):
     """
     Načte z hlavní stránky seznam tzv. 'krajů' a v nich vyhledá okresní města
-    (resp. odkazy na detailní výpis obcí v daném okrese).
+    (resp. odkazy na detailní výpis obcí v daném okrese). Seznam se
+    stahuje ze serveru; běžně se čte z adresáře (viz adresar_voleb).
+
+    Parametry:
+        url (str): URL hlavní stránky voleb (ps3). Pokud není zadána,
+                   použije se ZAKLADNI_URL.
 
     Vrací:
         list: Seznam slovníků s klíči:
             - 'cislo': Pořadové číslo (int)
             - 'nazev': Název okresního města (str)
+            - 'kraj': Název kraje, pod kterým je okres uveden (str)
             - 'odkaz': Plná URL adresa vedoucí k detailu okresu (str)
     """
-    response = requests.get(ZAKLADNI_URL)
+    url = url or ZAKLADNI_URL
+    response = stahni(url)
     response.raise_for_status()  # Pokud dojde k chybě, vyvolá výjimku
-    soup = BeautifulSoup(response.text, "html.parser")
+    # Předkompilovaný extraktor; při změně rozložení stránky obecné zpracování
+    okresy = extrahuj("ps3", response.text)
+    if okresy is None:
+        okresy = _okresy_ze_stranky(vytvor_polevku(response.text))
+    return [
+        {
+            "cislo": cislo,
+            "nazev": nazev,
+            "kraj": kraj,
+            "odkaz": ziskej_plnou_url(url, odkaz),
+        }
+        for cislo, (kraj, nazev, odkaz) in enumerate(okresy, start=1)
+    ]
+
+
+def _okresy_ze_stranky(soup):
+    """
+    Obecné zpracování stránky ps3 (BeautifulSoup).
 
+    Vrací:
+        list: Trojice (kraj, název okresu, odkaz na seznam obcí).
+    """
     # Vyhledáme všechny elementy <h3> s class="kraj", což označuje kraje
     kraje = soup.find_all("h3", class_="kraj")
-    okresni_mesta = []
-    global_pocitadlo = 1
+    okresy = []
 
     # Pro každý kraj vyhledáme tabulku s okresními městy
     for kraj in kraje:
-        print(f"\nKraj: {kraj.text.strip()}")
+        nazev_kraje = kraj.text.strip()
         tabulka = kraj.find_next("table", class_="table")
         if not tabulka:
             continue
@@ -68,26 +142,99 @@ def nacti_okresni_mesta():
         # Projdeme všechny řádky tabulky a hledáme data pro okresní města
         for radek in tabulka.find_all("tr"):
             # Pomocí regulárních výrazů najdeme požadované buňky
-            obec_bunka = radek.find(
-                "td",
-                headers=re.compile(r"t[1-9][0-4]?sa1 t[1-9][0-4]?sb2")
-            )
-            odkaz_bunka = radek.find(
-                "td",
-                headers=re.compile(r"t[1-9][0-4]?sa3")
-            )
+            obec_bunka = radek.find("td", headers=HLAVICKY_NAZVU_OKRESU)
+            odkaz_bunka = radek.find("td", headers=HLAVICKY_ODKAZU_OKRESU)
             if obec_bunka and odkaz_bunka:
-                nazev_obce = obec_bunka.text.strip()
-                link = odkaz_bunka.find("a")["href"]
-                okresni_mesta.append({
-                    "cislo": global_pocitadlo,
-                    "nazev": nazev_obce,
-                    "odkaz": ziskej_plnou_url(ZAKLADNI_URL, link)
-                })
-                print(f"{global_pocitadlo}. {nazev_obce}")
-                global_pocitadlo += 1
+                okresy.append((nazev_kraje, obec_bunka.text.strip(),
+                               odkaz_bunka.find("a")["href"]))
+
+    return okresy
 
-    return okresni_mesta
+
+def vypis_okresy(okresni_mesta):
+    """
+    Vypíše očíslovaný seznam okresních měst rozdělený podle krajů.
+
+    Parametry:
+        okresni_mesta (list): Položky z nacti_okresni_mesta.
+    """
+    kraj = None
+    for mesto in okresni_mesta:
+        if mesto["kraj"] != kraj:
+            kraj = mesto["kraj"]
+            print(f"\nKraj: {kraj}")
+        print(f"{mesto['cislo']}. {mesto['nazev']}")
+
+
+def adresar_voleb(volby=None, obnovit=False):
+    """
+    Vrátí trvalý adresář okresů a obcí zadaných voleb (viz adresar.py).
+    Adresář se načte z disku, případně se při prvním použití sestaví ze
+    serveru; během běhu se pro stejné volby používá stále stejná instance.
+
+    Parametry:
+        volby (str): Kód voleb; None znamená výchozí volby (ZAKLADNI_URL).
+        obnovit (bool): True = uložený adresář zahodit a sestavit znovu.
+
+    Vrací:
+        Adresar: Adresář voleb.
+    """
+    url = url_okresu(volby)
+    if obnovit or url not in _adresare:
+        _adresare[url] = Adresar(
+            cesta_adresare(volby or Zahranici.VYCHOZI_VOLBY), url,
+            nacti_okresni_mesta, nacti_obce, obnovit
+        )
+    return _adresare[url]
+
+
+def url_okresu(volby=None):
+    """
+    Vrátí URL hlavní stránky (seznamu okresů) zadaných voleb.
+
+    Parametry:
+        volby (str): Kód voleb z adresy volby.cz (např. 'ps2013'). Pokud
+                     není zadán, vrátí se ZAKLADNI_URL.
+
+    Vrací:
+        str: URL stránky se seznamem okresů.
+    """
+    if volby is None:
+        return ZAKLADNI_URL
+    return Zahranici.url_voleb(volby) + STRANKA_OKRESU
+
+
+def vyber_okresy(volby, cisla=None):
+    """
+    Načte seznamy okresů zadaných voleb (z adresáře, viz adresar_voleb),
+    vypíše je a vybere z nich požadované okresy.
+    Při více volbách (dávka) dostane každý vybraný okres navíc klíč 'volby'
+    s kódem voleb, podle kterého se pak rozliší řádky výstupu.
+
+    Parametry:
+        volby (list): Kódy voleb (např. ['ps2013', 'ps2017nss']); None
+                      v seznamu znamená výchozí volby (ZAKLADNI_URL).
+        cisla (list): Pořadová čísla okresů. Pokud nejsou zadána, vyberou
+                      se všechny okresy včetně zahraničí.
+
+    Vrací:
+        list nebo None: Vybrané položky z nacti_okresni_mesta; None, pokud
+                        některé číslo okresu v některých volbách neexistuje.
+    """
+    vybrane = []
+    for kod in volby:
+        if len(volby) > 1:
+            print(f"\nVolby {kod}:")
+        okresni_mesta = adresar_voleb(kod).okresy()
+        vypis_okresy(okresni_mesta)
+        if cisla is not None:
+            okresni_mesta = [mesto for mesto in okresni_mesta if mesto["cislo"] in cisla]
+            if len(okresni_mesta) != len(set(cisla)):
+                return None
+        if len(volby) > 1:
+            okresni_mesta = [dict(mesto, volby=kod) for mesto in okresni_mesta]
+        vybrane.extend(okresni_mesta)
+    return vybrane
 
 
 def nacti_obce(okres_odkaz):
@@ -102,11 +249,33 @@ def nacti_obce(okres_odkaz):
             - 'cislo': Číslo obce (str)
             - 'obec': Název obce (str)
             - 'odkaz': Plná URL adresa k detailu obce (str)
+            - 'okrsky': URL výběru okrsků obce (ps34), nebo None u obce,
+                        která není rozdělena na okrsky
     """
-    response = requests.get(okres_odkaz)
+    response = stahni(okres_odkaz)
     response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
+    obce = extrahuj("ps32", response.text)
+    if obce is None:
+        obce = _obce_ze_stranky(vytvor_polevku(response.text))
+    return [
+        {
+            "cislo": cislo,
+            "obec": nazev,
+            "odkaz": ziskej_plnou_url(okres_odkaz, odkaz),
+            "okrsky": ziskej_plnou_url(okres_odkaz, odkaz_okrsku) if odkaz_okrsku else None,
+        }
+        for cislo, nazev, odkaz, odkaz_okrsku in obce
+    ]
 
+
+def _obce_ze_stranky(soup):
+    """
+    Obecné zpracování stránky ps32 (BeautifulSoup).
+
+    Vrací:
+        list: Čtveřice (číslo obce, název, odkaz na obec, odkaz na výběr
+              okrsku nebo None).
+    """
     obce = []
     radky = soup.find_all('tr')
     for radek in radky:
@@ -115,12 +284,10 @@ def nacti_obce(okres_odkaz):
         if cislo_td and nazev_td:
             link_tag = cislo_td.find('a')
             link = link_tag['href'] if link_tag else None
+            odkaz_okrsku = radek.find('a', href=re.compile(r"ps34\?"))
             if link:
-                obce.append({
-                    "cislo": cislo_td.text.strip(),
-                    "obec": nazev_td.text.strip(),
-                    "odkaz": ziskej_plnou_url(ZAKLADNI_URL, link)
-                })
+                obce.append((cislo_td.text.strip(), nazev_td.text.strip(), link,
+                             odkaz_okrsku['href'] if odkaz_okrsku else None))
 
     return obce
 
@@ -135,34 +302,67 @@ def nacti_data_obce(obec):
     Vrací:
         dict: Slovník s detailními údaji o obci, včetně celkových statistik
               (např. počet voličů, odevzdaných obálek, platných hlasů) a
-              hlasů pro jednotlivé strany.
+              hlasů pro jednotlivé strany. Počty jsou celá čísla (int).
     """
-    url = obec["odkaz"]
-    print(f"Zpracovávám obec: {obec['cislo']} - {obec['obec']}")
+    return zpracuj_data_obce(obec, _stahni_stranku_obce(obec))
+
 
-    response = requests.get(url, timeout=10)
+def _stahni_stranku_obce(obec):
+    """
+    Stáhne detailní stránku obce a vrátí její HTML (pro stahovani.stahni_a_zpracuj).
+    """
+    print(f"Zpracovávám obec: {obec['cislo']} - {obec['obec']}")
+    response = stahni(obec["odkaz"])
     response.raise_for_status()
-    soup = BeautifulSoup(response.text, 'html.parser')
+    return response.text
 
-    tabulky = soup.find_all('table', class_='table')
 
+def zpracuj_data_obce(obec, html, parser=None, jen_tabulky=True):
+    """
+    Vytáhne volební data obce z již stažené stránky (bez přístupu k síti).
+
+    Parametry:
+        obec (dict): Slovník obsahující klíče 'cislo', 'obec', 'odkaz'.
+        html (str): Obsah detailní stránky obce.
+        parser (str): Parser pro BeautifulSoup (viz parsovani.py); zadaný
+                      parser vynutí obecné zpracování místo extraktoru.
+        jen_tabulky (bool): Zda parsovat jen výsledkové tabulky (False
+                            vynutí obecné zpracování celé stránky).
+
+    Vrací:
+        dict: Stejný slovník jako nacti_data_obce.
+    """
     # Připravíme základní strukturu vraceného slovníku
     data = {
         "Číslo obce": obec["cislo"],
         "Název obce": obec["obec"]
     }
 
+    # Bez požadavku na konkrétní parser nebo celý strom se použije
+    # předkompilovaný extraktor (pokud stránka odpovídá jeho rozložení)
+    if parser is None and jen_tabulky:
+        vytazeno = extrahuj("ps311", html)
+        if vytazeno is not None:
+            data.update(vytazeno)
+            return data
+
+    soup = vytvor_polevku(html, jen_tabulky=jen_tabulky, parser=parser)
+
+    tabulky = soup.find_all('table', class_='table')
+
     # 1. tabulka obsahuje celkové statistiky: voliči celkem, obálky, platné hlasy
     if tabulky:
         radky = tabulky[0].find_all('tr')
         if radky:
             posledni_radek = radky[-1]
             bunky = posledni_radek.find_all('td')
-            # Očekáváme aspoň 8 sloupců
-            if len(bunky) >= 8:
-                data["Voliči celkem"] = bunky[3].get_text(strip=True)
-                data["Odevzdané obálky"] = bunky[6].get_text(strip=True)
-                data["Platné hlasy"] = bunky[7].get_text(strip=True)
+            # Stránka obce má před počtem voličů ještě 3 sloupce o okrscích
+            # (celkem, zpracováno, v %), stránka jednoho okrsku je nemá
+            if len(bunky) >= 6:
+                posun = 3 if len(bunky) >= 8 else 0
+                data["Voliči celkem"] = na_cislo(bunky[posun].get_text(strip=True))
+                data["Odevzdané obálky"] = na_cislo(bunky[posun + 3].get_text(strip=True))
+                data["Platné hlasy"] = na_cislo(bunky[posun + 4].get_text(strip=True))
 
     # Ostatní tabulky (2. a dál) obsahují výsledky pro jednotlivé strany
     for tabulka in tabulky[1:]:
@@ -174,43 +374,1051 @@ def nacti_data_obce(obec):
                 hlasy_strany = bunky[2].get_text(strip=True)
                 # Přeskočíme případy, kdy "název_strany" je prázdný nebo "název"
                 if nazev_strany.lower() != "název" and nazev_strany.strip():
-                    data[nazev_strany] = hlasy_strany
+                    data[nazev_strany] = na_cislo(hlasy_strany)
 
     return data
 
 
-def main():
+def _cislo_okrsku(url):
+    """
+    Vrátí číslo okrsku z parametru 'xokrsek' odkazu (obec bez okrsků = '1').
+    """
+    return parse_qs(urlsplit(url).query).get("xokrsek", ["1"])[0]
+
+
+def nacti_okrsky(obec):
+    """
+    Načte seznam okrsků obce ze stránky výběru okrsku (ps34). Obec, která
+    není rozdělena na okrsky, tvoří jediný okrsek s výsledky na stránce obce
+    (nic se nestahuje).
+
+    Parametry:
+        obec (dict): Položka z nacti_obce.
+
+    Vrací:
+        list: Seznam slovníků s klíči:
+            - 'cislo': Číslo obce (str)
+            - 'obec': Název obce (str)
+            - 'okrsek': Číslo okrsku (str)
+            - 'odkaz': Plná URL adresa k detailu okrsku (str)
+    """
+    if not obec.get("okrsky"):
+        return [{
+            "cislo": obec["cislo"],
+            "obec": obec["obec"],
+            "okrsek": _cislo_okrsku(obec["odkaz"]),
+            "odkaz": obec["odkaz"],
+        }]
+    response = stahni(obec["okrsky"])
+    response.raise_for_status()
+    soup = vytvor_polevku(response.text, jen_tabulky=True)
+    return [
+        {
+            "cislo": obec["cislo"],
+            "obec": obec["obec"],
+            # Číslo okrsku se bere z odkazu, aby odpovídalo stránce, která se stáhne
+            "okrsek": _cislo_okrsku(odkaz["href"]),
+            "odkaz": ziskej_plnou_url(obec["okrsky"], odkaz["href"]),
+        }
+        for odkaz in soup.find_all("a", href=re.compile(r"xokrsek="))
+    ]
+
+
+def _stahni_stranku_okrsku(okrsek):
+    """
+    Stáhne stránku okrsku a vrátí její HTML (pro stahovani.stahni_a_zpracuj).
+    """
+    response = stahni(okrsek["odkaz"])
+    response.raise_for_status()
+    return response.text
+
+
+def zpracuj_data_okrsku(okrsek, html, parser=None, jen_tabulky=True):
+    """
+    Vytáhne volební data jednoho okrsku ze stažené stránky (bez přístupu
+    k síti). Stránka okrsku má stejné tabulky stran jako stránka obce, takže
+    se zpracuje stejně a sloupce stran odpovídají řádkům obcí.
+
+    Parametry:
+        okrsek (dict): Položka z nacti_okrsky.
+        html (str): Obsah stránky okrsku.
+        parser (str): Parser pro BeautifulSoup (viz parsovani.py).
+        jen_tabulky (bool): Jako u zpracuj_data_obce.
+
+    Vrací:
+        dict: Stejný slovník jako zpracuj_data_obce, za názvem obce navíc
+              s klíčem 'Okrsek'.
+    """
+    data = zpracuj_data_obce(okrsek, html, parser, jen_tabulky)
+    return {
+        "Číslo obce": data.pop("Číslo obce"),
+        "Název obce": data.pop("Název obce"),
+        "Okrsek": okrsek["okrsek"],
+        **data,
+    }
+
+
+def rozdel_data_obce(data_obce, zaklad=None):
+    """
+    Rozdělí výsledek nacti_data_obce na základní údaje a hlasy stran
+    (podoba, ve které se ukládá do TabulkaVysledku).
+
+    Parametry:
+        data_obce (dict): Výsledek nacti_data_obce / zpracuj_data_obce.
+        zaklad (dict): Další základní údaje, které se dají na začátek
+                       (např. {'Okres': 'Benešov'}).
+
+    Vrací:
+        tuple: (zaklad, hlasy) - dva slovníky.
+    """
+    zaklad = dict(zaklad or {})
+    hlasy = {}
+    for klic, hodnota in data_obce.items():
+        if klic in SLOUPCE_OBCE:
+            # Starší deník může obsahovat čísla ještě jako text
+            zaklad[klic] = hodnota if klic in TEXTOVE_SLOUPCE_OBCE else na_cislo(hodnota)
+        else:
+            hlasy[klic] = hodnota
+    return zaklad, hlasy
+
+
+def _zaklad_okresu(okres):
+    """
+    Základní údaje, které se dají na začátek řádku každé obce okresu
+    (v dávce více voleb i kód voleb).
+    """
+    zaklad = {"Volby": okres["volby"]} if "volby" in okres else {}
+    zaklad["Kraj"] = okres.get("kraj", "")
+    zaklad["Okres"] = okres["nazev"]
+    return zaklad
+
+
+def _popis_voleb(okres):
+    """
+    Doplněk výpisu s kódem voleb (jen v dávce více voleb).
+    """
+    return f" ({okres['volby']})" if "volby" in okres else ""
+
+
+def _klic_tabulky(okresy, okrsky=False):
+    """
+    Klíč TabulkaVysledku pro vybrané okresy - v dávce více voleb se obce
+    dohledávají podle dvojice (volby, číslo obce), okrsky navíc podle
+    čísla okrsku.
+    """
+    klic = ("Číslo obce", "Okrsek") if okrsky else ("Číslo obce",)
+    if any("volby" in okres for okres in okresy):
+        klic = ("Volby",) + klic
+    return klic if len(klic) > 1 else klic[0]
+
+
+def _klic_obce(okres, obec):
+    """
+    Hodnota klíče tabulky (viz _klic_tabulky) pro obec okresu.
+    """
+    return (okres["volby"], obec["cislo"]) if "volby" in okres else obec["cislo"]
+
+
+def _radek_zahranici(zaklad, hlasy, volby=None, s_okrskem=False):
+    """
+    Převede výsledek ze Zahranici.nacti_detaily na řádek celostátního výstupu
+    (okrsek se chová jako obec v okrese 'Zahraničí'). V dávce více voleb
+    se na začátek řádku přidá kód voleb, v režimu okrsků číslo okrsku.
+    """
+    radek = {"Volby": volby} if volby else {}
+    radek.update({
+        "Kraj": "Zahraničí",
+        "Okres": "Zahraničí",
+        "Číslo obce": zaklad["Okrsek"],
+        "Název obce": f"{zaklad['Město']} ({zaklad['Země']})",
+    })
+    if s_okrskem:
+        radek["Okrsek"] = zaklad["Okrsek"]
+    radek.update({
+        "Voliči celkem": na_cislo(zaklad.get("Voliči v seznamu", 0)),
+        "Odevzdané obálky": na_cislo(zaklad.get("Odevzdané obálky", 0)),
+        "Platné hlasy": na_cislo(zaklad.get("Platné hlasy", 0)),
+    })
+    return radek, hlasy
+
+
+def zpracuj_okresy(okresy, pocet_vlaken=None, pocet_procesu=None, denik=None, prubezne=None):
+    """
+    Zpracuje více okresů najednou (včetně zahraničí) a postupně vrací řádky.
+    Seznamy obcí všech okresů se načtou souběžně a detailní stránky všech obcí
+    se pak zpracují v jednom společném běhu (stahování ve vláknech, parsování
+    ve fondu procesů), takže se fondy nevyprazdňují mezi okresy.
+
+    Parametry:
+        okresy (list): Vybrané položky z nacti_okresni_mesta. Položky
+                       s klíčem 'volby' (dávka více voleb, viz vyber_okresy)
+                       mají na začátku řádků navíc sloupec 'Volby'.
+        pocet_vlaken (int): Počet souběžně stahovaných stránek.
+        pocet_procesu (int): Počet procesů pro parsování stránek.
+        denik (Denik): Deník hotových položek; co v něm už je, se nestahuje.
+        prubezne (PrubezneVysledky): Průběžné výsledky (--prubezne); obce
+                                     se pak stahují od největší po nejmenší.
+
+    Vrací:
+        generator: Dvojice (zaklad, hlasy) v pořadí okresů a obcí (s průběžnými
+                   výsledky v pořadí velikosti obcí), kde 'zaklad' má sloupce
+                   SLOUPCE_CELOSTATNI (případně i 'Volby') a 'hlasy' je
+                   slovník {název strany: počet hlasů}.
+    """
+    ulohy = _nacti_ulohy(okresy, pocet_vlaken)
+    if prubezne is not None:
+        ulohy = prubezne.naplanuj(ulohy)
+    print(f"Načteno {len(ulohy)} obcí. Zpracovávám detailní data...")
+
+    vysledky = zpracuj_s_denikem(
+        [obec for _, obec in ulohy], lambda obec: obec["odkaz"], denik,
+        lambda zbyvajici: stahni_a_zpracuj_postupne(
+            zbyvajici, _stahni_stranku_obce, zpracuj_data_obce,
+            pocet_vlaken, pocet_procesu, "ps311"
+        )
+    )
+    for (okres, _), data in zip(ulohy, vysledky):
+        yield rozdel_data_obce(data, _zaklad_okresu(okres))
+
+    yield from _radky_zahranici(okresy, pocet_vlaken, pocet_procesu, denik)
+
+
+def zpracuj_okrsky(okresy, pocet_vlaken=None, pocet_procesu=None, denik=None):
+    """
+    Jako zpracuj_okresy, ale výsledky vrací po jednotlivých okrscích
+    (parametr --okrsky). U každé obce se ze stránky výběru okrsku (ps34)
+    zjistí odkazy na okrsky a všechny stránky okrsků (celostátně zhruba
+    15 000) se pak zpracují v jednom společném běhu. Stránky se stahují
+    a parsují postupně v omezeném okně, v paměti zůstávají jen seznamy
+    odkazů a hotové řádky.
+
+    Parametry:
+        okresy (list): Vybrané položky z nacti_okresni_mesta nebo vyber_okresy.
+        pocet_vlaken (int): Počet souběžně stahovaných stránek.
+        pocet_procesu (int): Počet procesů pro parsování stránek.
+        denik (Denik): Deník hotových položek; co v něm už je, se nestahuje.
+
+    Vrací:
+        generator: Dvojice (zaklad, hlasy) jako u zpracuj_okresy; 'zaklad'
+                   má navíc za názvem obce sloupec 'Okrsek'. Zahraniční
+                   okrsky mají jako číslo obce i okrsku číslo okrsku.
+    """
+    ulohy = _nacti_ulohy(okresy, pocet_vlaken)
+    print(f"Načteno {len(ulohy)} obcí. Načítám seznamy okrsků...")
+    seznamy_okrsku = zpracuj_s_denikem(
+        [obec for _, obec in ulohy],
+        lambda obec: "okrsky:" + (obec.get("okrsky") or obec["odkaz"]), denik,
+        lambda zbyvajici: zpracuj_postupne(nacti_okrsky, zbyvajici, pocet_vlaken)
+    )
+    okrsky = [
+        (okres, okrsek)
+        for (okres, _), seznam in zip(ulohy, seznamy_okrsku)
+        for okrsek in seznam
+    ]
+    print(f"Načteno {len(okrsky)} okrsků. Zpracovávám detailní data...")
+
+    vysledky = zpracuj_s_denikem(
+        [okrsek for _, okrsek in okrsky], lambda okrsek: okrsek["odkaz"], denik,
+        lambda zbyvajici: stahni_a_zpracuj_postupne(
+            zbyvajici, _stahni_stranku_okrsku, zpracuj_data_okrsku,
+            pocet_vlaken, pocet_procesu, lambda okrsek: typ_stranky(okrsek["odkaz"])
+        )
+    )
+    for (okres, _), data in zip(okrsky, vysledky):
+        yield rozdel_data_obce(data, _zaklad_okresu(okres))
+
+    yield from _radky_zahranici(okresy, pocet_vlaken, pocet_procesu, denik, s_okrskem=True)
+
+
+def _nacti_ulohy(okresy, pocet_vlaken=None):
+    """
+    Načte seznamy obcí vybraných okresů (bez zahraničí) z adresářů voleb;
+    obce okresů, které v adresáři ještě nejsou, se stáhnou souběžně.
+
+    Vrací:
+        list: Dvojice (okres, obec) v pořadí okresů a obcí.
+    """
+    domaci = [o for o in okresy if "ps36" not in o["odkaz"]]
+    print(f"\nNačítám seznamy obcí pro {len(domaci)} okresů...")
+    seznamy_obci = {}
+    for kod in dict.fromkeys(okres.get("volby") for okres in domaci):
+        okresy_voleb = [okres for okres in domaci if okres.get("volby") == kod]
+        seznamy = adresar_voleb(kod).obce(okresy_voleb, pocet_vlaken)
+        seznamy_obci.update(
+            ((kod, okres["odkaz"]), obce) for okres, obce in zip(okresy_voleb, seznamy)
+        )
+    return [
+        (okres, obec)
+        for okres in domaci
+        for obec in seznamy_obci[(okres.get("volby"), okres["odkaz"])]
+    ]
+
+
+def _radky_zahranici(okresy, pocet_vlaken=None, pocet_procesu=None, denik=None,
+                     s_okrskem=False):
+    """
+    Generátor řádků zahraničních okrsků pro vybrané okresy (položky s odkazem
+    na ps36), viz _radek_zahranici.
+    """
+    for okres in okresy:
+        if "ps36" not in okres["odkaz"]:
+            continue
+        print(f"\nZpracovávám zahraniční okrsky{_popis_voleb(okres)}...")
+        zakladni_url = ziskej_plnou_url(okres["odkaz"], ".")
+        tabulka_1_data = Zahranici.nacti_tabulku_1(okres["odkaz"])
+        podrobna_data = Zahranici.nacti_detaily(
+            zakladni_url, tabulka_1_data, pocet_vlaken, pocet_procesu, denik
+        )
+        for zaklad, hlasy in podrobna_data:
+            yield _radek_zahranici(zaklad, hlasy, okres.get("volby"), s_okrskem)
+
+
+def naplan_frontu(fronta, okresy, pocet_vlaken=None):
+    """
+    Vloží do fronty úlohy pro všechny obce a zahraniční okrsky vybraných
+    okresů. Úlohy, které ve frontě už jsou (i hotové z dřívějšího běhu),
+    se nevkládají znovu.
+
+    Parametry:
+        fronta (Fronta): Fronta úloh.
+        okresy (list): Vybrané položky z vyber_okresy.
+        pocet_vlaken (int): Počet souběžně stahovaných seznamů obcí.
+
+    Vrací:
+        list: Plán pro radky_z_fronty - čtveřice (klíč, typ, okres, data)
+              v pořadí výstupu.
+    """
+    plan = [
+        (obec["odkaz"], "obec", okres, {"obec": obec})
+        for okres, obec in _nacti_ulohy(okresy, pocet_vlaken)
+    ]
+    for okres in okresy:
+        if "ps36" not in okres["odkaz"]:
+            continue
+        zakladni_url = ziskej_plnou_url(okres["odkaz"], ".")
+        plan.extend(
+            (zakladni_url + zaznam["Odkaz"], "zahranici", okres,
+             {"zakladni_url": zakladni_url, "zaznam": zaznam})
+            for zaznam in Zahranici.nacti_tabulku_1(okres["odkaz"]) if zaznam["Odkaz"]
+        )
+    nove = fronta.pridej((klic, typ, data) for klic, typ, _, data in plan)
+    print(f"Ve frontě {fronta.cesta} je naplánováno {len(plan)} úloh ({nove} nových).")
+    return plan
+
+
+def _stahni_stranku_ulohy(uloha):
+    """
+    Stáhne stránku úlohy z fronty (obec nebo zahraniční okrsek). Chyba
+    stažení (např. 404) nesmí ukončit pracovníka - úloha vrátí None
+    a pracovník ji vrátí do fronty.
+    """
+    data = uloha["data"]
+    try:
+        if uloha["typ"] == "obec":
+            return _stahni_stranku_obce(data["obec"])
+        return Zahranici._stahni_stranku_okrsku(data["zakladni_url"], data["zaznam"])
+    except (requests.RequestException, OSError) as e:
+        print(f"Chyba při stahování úlohy {uloha['klic']}: {e}")
+        return None
+
+
+def _zpracuj_stranku_ulohy(uloha, html):
+    """
+    Zparsuje stránku úlohy z fronty; běží ve fondu procesů, proto je
+    definována na úrovni modulu. Stránka, kterou nejde zpracovat, vrátí
+    None (úloha se vrátí do fronty) místo ukončení pracovníka.
+    """
+    data = uloha["data"]
+    try:
+        if uloha["typ"] == "obec":
+            return zpracuj_data_obce(data["obec"], html)
+        return Zahranici._zpracuj_stranku_okrsku(data["zaznam"], html)
+    except Exception as e:
+        print(f"Chyba při zpracování úlohy {uloha['klic']}: {e}")
+        return None
+
+
+def pracuj_na_fronte(fronta, pocet_vlaken=None, pocet_procesu=None):
+    """
+    Pracovník fronty: půjčuje si úlohy po dávkách, stahuje a parsuje jejich
+    stránky (stejně jako zpracuj_okresy) a výsledky zapisuje zpět do fronty.
+    Skončí, až ve frontě nezbude žádná čekající ani rozpracovaná úloha;
+    dokud úlohy zpracovávají jiní pracovníci, čeká (a převezme ty, jejichž
+    půjčka vyprší).
+
+    Parametry:
+        fronta (Fronta): Fronta úloh.
+        pocet_vlaken (int): Počet souběžně stahovaných stránek.
+        pocet_procesu (int): Počet procesů pro parsování stránek.
+
+    Vrací:
+        int: Počet úloh, které tento pracovník dokončil.
+    """
+    pracovnik = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"\nPracovník {pracovnik} zpracovává úlohy z fronty {fronta.cesta}...")
+    hotovo = 0
+    # Úlohy čekající ve stahování za pomalejšími stránkami si pracovník drží
+    # (půjčky se prodlužují na pozadí) - jinak by je po vypršení půjčky
+    # převzal a zpracoval podruhé jiný pracovník
+    with DrzenePujcky(fronta, pracovnik) as pujcky:
+        while True:
+            prevzate = deque()
+
+            def prideluj():
+                # Úlohy se půjčují průběžně, jak se uvolňuje místo ve stahování
+                while True:
+                    ulohy = fronta.vezmi(pracovnik, VELIKOST_DAVKY)
+                    if not ulohy:
+                        return
+                    for uloha in ulohy:
+                        prevzate.append(uloha)
+                        pujcky.drz(uloha)
+                        yield uloha
+
+            for vysledek in stahni_a_zpracuj_postupne(
+                prideluj(), _stahni_stranku_ulohy, _zpracuj_stranku_ulohy,
+                pocet_vlaken, pocet_procesu,
+                lambda uloha: "ps311" if uloha["typ"] == "obec" else "ps361"
+            ):
+                uloha = prevzate.popleft()
+                if vysledek is None:
+                    fronta.vrat(uloha, pracovnik, "stránku se nepodařilo stáhnout nebo zpracovat")
+                elif fronta.dokonci(uloha, pracovnik, vysledek):
+                    hotovo += 1
+                    if hotovo % 500 == 0:
+                        print(f"Zpracováno {hotovo} úloh.")
+                pujcky.pust(uloha)
+
+            stav = fronta.stav()
+            if not stav.get("ceka") and not stav.get("zpracovava"):
+                break
+            time.sleep(CEKANI_NA_FRONTU)
+    print(f"Pracovník {pracovnik} dokončil {hotovo} úloh.")
+    return hotovo
+
+
+def radky_z_fronty(fronta, plan):
+    """
+    Spojí výsledky úloh z fronty do řádků v pořadí plánu (koordinátor).
+    Úlohy, které se nepodařilo zpracovat, se vynechají.
+
+    Parametry:
+        fronta (Fronta): Fronta úloh.
+        plan (list): Výsledek naplan_frontu.
+
+    Vrací:
+        generator: Dvojice (zaklad, hlasy) jako u zpracuj_okresy.
+    """
+    vysledky = fronta.vysledky(klic for klic, _, _, _ in plan)
+    for (_, typ, okres, data), vysledek in zip(plan, vysledky):
+        if vysledek is None:
+            continue
+        if typ == "obec":
+            yield rozdel_data_obce(vysledek, _zaklad_okresu(okres))
+        else:
+            zaklad, hlasy = Zahranici.sestav_zaznam(data["zaznam"], vysledek)
+            yield _radek_zahranici(zaklad, hlasy, okres.get("volby"))
+
+
+def zpracuj_frontou(okresy, cesta_fronty, pocet_vlaken=None, pocet_procesu=None):
+    """
+    Koordinátor fronty (parametr --fronta): naplánuje úlohy vybraných okresů,
+    sám je zpracovává spolu s dalšími pracovníky (--pracovnik), počká na
+    dokončení všech úloh a postupně vrací řádky jako zpracuj_okresy.
+    Přerušený běh lze se stejnou frontou spustit znovu - hotové úlohy se
+    nezpracovávají podruhé.
+
+    Parametry:
+        okresy (list): Vybrané položky z vyber_okresy.
+        cesta_fronty (str): Cesta k souboru fronty.
+        pocet_vlaken (int): Počet souběžně stahovaných stránek.
+        pocet_procesu (int): Počet procesů pro parsování stránek.
+
+    Vrací:
+        generator: Dvojice (zaklad, hlasy) v pořadí okresů a obcí.
+    """
+    fronta = Fronta(cesta_fronty)
+    try:
+        plan = naplan_frontu(fronta, okresy, pocet_vlaken)
+        pracuj_na_fronte(fronta, pocet_vlaken, pocet_procesu)
+        chybne = fronta.stav().get("chyba", 0)
+        if chybne:
+            print(f"{chybne} úloh se nepodařilo zpracovat (stav 'chyba' ve frontě).")
+        yield from radky_z_fronty(fronta, plan)
+    finally:
+        fronta.zavri()
+
+
+def sestav_tabulku(vysledky, klic="Číslo obce", prubezne=None):
+    """
+    Uloží výsledky obcí do sloupcové tabulky (hlasy jako int32, strany
+    podle společného rejstříku).
+
+    Parametry:
+        vysledky (iterable): Dvojice (zaklad, hlasy), např. ze zpracuj_okresy.
+        klic (str nebo tuple): Sloupec (nebo n-tice sloupců), podle kterého
+                               se obce v tabulce dohledávají.
+        prubezne (PrubezneVysledky): Po každé obci se započte do průběžných
+                                     součtů (a ty se případně zveřejní).
+
+    Vrací:
+        TabulkaVysledku: Tabulka se všemi obcemi v pořadí zpracování.
+    """
+    # NumPy se načítá až při sestavení tabulky, aby nezdržovalo zobrazení nabídky
+    from vysledky import TabulkaVysledku
+    tabulka = TabulkaVysledku(klic)
+    # Výsledky se stahují a parsují až při procházení generátoru
+    with PROFIL.etapa("stahovani a parsovani"):
+        for zaklad, hlasy in vysledky:
+            tabulka.pridej(zaklad, hlasy)
+            if prubezne is not None:
+                prubezne.zaznamenej(tabulka, zaklad)
+    return tabulka
+
+
+def uloz_vysledky(radky, vystup, format_vystupu="xlsx", vyplnit=None, sloupce=None):
+    """
+    Postupně zapíše řádky do výstupního souboru zvoleného formátu.
+
+    Parametry:
+        radky (iterable): Řádky (slovníky) v pořadí, v jakém se mají zapsat.
+        vystup (str): Cesta k výstupnímu souboru bez přípony.
+        format_vystupu (str): 'xlsx', 'csv' nebo 'parquet'.
+        vyplnit: Hodnota pro sloupce, které v řádku chybí (např. 0 hlasů
+                 u strany, která v okrese nekandidovala).
+        sloupce (list): Pořadí sloupců, pokud je známé předem (např.
+                        TabulkaVysledku.sloupce_vystupu()).
+
+    Vrací:
+        tuple: (cesta k vytvořenému souboru, počet zapsaných řádků)
+    """
+    with PROFIL.etapa("zapis"):
+        with vytvor_zapisovac(format_vystupu, vystup, sloupce, vyplnit=vyplnit) as zapisovac:
+            for radek in radky:
+                zapisovac.zapis(radek)
+    PROFIL.radky(zapisovac.pocet_radku)
+    return zapisovac.cesta, zapisovac.pocet_radku
+
+
+def sestav_souhrny(tabulka):
+    """
+    Sečte obce tabulky za okresy, kraje a celý stát (viz UROVNE_SOUHRNU),
+    tabulku okrsků navíc i za obce. Ke každé úrovni spočte součty voličů,
+    obálek, platných hlasů a hlasů stran, volební účast a podíly stran na
+    platných hlasech v procentech.
+
+    Parametry:
+        tabulka (TabulkaVysledku): Tabulka obcí (nebo okrsků) se sloupci
+                                   SLOUPCE_CELOSTATNI.
+
+    Vrací:
+        dict: Přípona souboru -> (sloupce, řádky), viz TabulkaVysledku.souhrn.
+    """
+    predpona = ("Volby",) if "Volby" in tabulka.zakladni_sloupce else ()
+    okrsky = "Okrsek" in tabulka.zakladni_sloupce
+    urovne = UROVNE_SOUHRNU_OKRSKU if okrsky else UROVNE_SOUHRNU
+    with PROFIL.etapa("souhrny"):
+        return {
+            uroven: tabulka.souhrn(
+                predpona + skupiny,
+                podily={"Účast %": ("Odevzdané obálky", "Voliči celkem")},
+                zaklad_podilu="Platné hlasy",
+                nazev_poctu="Počet okrsků" if okrsky else "Počet obcí",
+            )
+            for uroven, skupiny in urovne.items()
+            if all(sloupec in tabulka.zakladni_sloupce for sloupec in skupiny)
+        }
+
+
+def uloz_do_databaze(tabulka, soubor, volby, slozka):
+    """
+    Uloží tabulku do SQLite databáze výsledků (parametr --db, viz databaze.py).
+    Obce, které v databázi pro stejné volby už jsou, se přepíšou.
+
+    Parametry:
+        tabulka (TabulkaVysledku): Tabulka obcí nebo okrsků.
+        soubor (str): Název nebo cesta databáze ('' = databaze.VYCHOZI_DATABAZE).
+        volby (str): Kód voleb pro tabulku bez sloupce 'Volby'.
+        slozka (str): Složka pro relativní název databáze.
+
+    Vrací:
+        tuple: (cesta k databázi, počet uložených řádků)
+    """
+    # Modul databáze (a NumPy) se načítá až při ukládání
+    from databaze import uloz_do_databaze as uloz, VYCHOZI_DATABAZE
+    cesta = os.path.join(slozka, soubor or VYCHOZI_DATABAZE)
+    with PROFIL.etapa("databaze"):
+        pocet = uloz(tabulka, cesta, volby)
+    PROFIL.radky(pocet)
+    return cesta, pocet
+
+
+def _stahni_pokud_zmeneno(url, otisky):
+    """
+    Stáhne stránku (platný záznam v mezipaměti se ověří u serveru) a vrátí
+    její HTML jen tehdy, když se obsah od minulého stažení změnil.
+
+    Parametry:
+        url (str): URL stránky.
+        otisky (dict): URL -> otisk obsahu z minulého kola (funkce ho doplňuje).
+
+    Vrací:
+        str nebo None: HTML změněné stránky; None, pokud se stránka nezměnila
+                       nebo ji nebylo možné stáhnout.
+    """
+    try:
+        response = stahni(url, overit=True)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Chyba při stahování {url}: {e}")
+        return None
+    otisk = hashlib.blake2b(response.content, digest_size=16).digest()
+    if otisky.get(url) == otisk:
+        return None
+    otisky[url] = otisk
+    return response.text
+
+
+def obnov_zmenene(tabulka, ulohy, zahranici, otisky, pocet_vlaken=None, pocet_procesu=None):
+    """
+    Jedno kolo sledování: stáhne všechny stránky obcí (a zahraničních
+    okrsků), zparsuje jen ty, jejichž obsah se změnil, a v tabulce přepíše
+    odpovídající řádky (podle klíče tabulky, tj. čísla obce).
+
+    Parametry:
+        tabulka (TabulkaVysledku): Tabulka výsledků, která se upravuje na místě.
+        ulohy (list): Dvojice (okres, obec) sledovaných obcí.
+        zahranici (list): Trojice (okres, základní URL, výstup
+                          Zahranici.nacti_tabulku_1) - jedna za každé volby.
+        otisky (dict): Otisky stránek z minulého kola.
+        pocet_vlaken (int): Počet souběžně stahovaných stránek.
+        pocet_procesu (int): Počet procesů pro parsování stránek.
+
+    Vrací:
+        int: Počet změněných řádků.
+    """
+    zmeneno = 0
+    vysledky = stahni_a_zpracuj_postupne(
+        [obec for _, obec in ulohy],
+        lambda obec: _stahni_pokud_zmeneno(obec["odkaz"], otisky),
+        zpracuj_data_obce, pocet_vlaken, pocet_procesu, "ps311"
+    )
+    for (okres, _), data in zip(ulohy, vysledky):
+        if data is not None:
+            tabulka.pridej(*rozdel_data_obce(data, _zaklad_okresu(okres)))
+            zmeneno += 1
+
+    for okres, zakladni_url, tabulka_1_data in zahranici:
+        vysledky = stahni_a_zpracuj_postupne(
+            tabulka_1_data,
+            lambda zaznam: _stahni_pokud_zmeneno(zakladni_url + zaznam["Odkaz"], otisky),
+            Zahranici._zpracuj_stranku_okrsku, pocet_vlaken, pocet_procesu, "ps361"
+        )
+        for zaznam, link_data in zip(tabulka_1_data, vysledky):
+            if link_data:
+                zaklad, hlasy = Zahranici.sestav_zaznam(zaznam, link_data)
+                tabulka.pridej(*_radek_zahranici(zaklad, hlasy, okres.get("volby")))
+                zmeneno += 1
+    return zmeneno
+
+
+def _prepis_vystup(radky, sloupce, vystup, format_vystupu):
+    """
+    Zapíše řádky do dočasného souboru a ten pak nahradí výstupní soubor,
+    takže výstup je vždy celý (i když ho někdo právě čte).
+
+    Vrací:
+        Path nebo None: Cesta k výstupu; None, pokud ho nešlo nahradit
+                        (např. je otevřený v Excelu).
+    """
+    docasny, _ = uloz_vysledky(radky, f"{vystup}.novy", format_vystupu, sloupce=sloupce)
+    cesta = docasny.with_name(os.path.basename(vystup) + docasny.suffix)
+    try:
+        os.replace(docasny, cesta)
+    except PermissionError:
+        print(f"Soubor {cesta} nelze přepsat (je otevřený?), zkusím to v dalším kole.")
+        os.remove(docasny)
+        return None
+    return cesta
+
+
+def sleduj_okresy(okresy, vystup, format_vystupu, interval, pocet_vlaken=None,
+                  pocet_procesu=None, databaze=None, volby=None):
+    """
+    Režim sledování (--watch): v pravidelných intervalech znovu projde
+    stránky vybraných okresů, zparsuje jen změněné obce a přepíše výstup.
+    Cena jednoho kola tak závisí na počtu změn, ne na velikosti okresů.
+    Seznamy obcí se načtou jen jednou. Ukončí se klávesami Ctrl+C.
+
+    Parametry:
+        okresy (list): Vybrané položky z nacti_okresni_mesta.
+        vystup (str): Cesta k výstupnímu souboru bez přípony.
+        format_vystupu (str): 'xlsx', 'csv' nebo 'parquet'.
+        interval (float): Interval mezi začátky kol v sekundách.
+        pocet_vlaken (int): Počet souběžně stahovaných stránek.
+        pocet_procesu (int): Počet procesů pro parsování stránek.
+        databaze (str): Při zadání (i prázdném) se místo souborů obnovuje
+                        databáze výsledků (viz uloz_do_databaze).
+        volby (str): Kód voleb pro databázi.
+    """
+    from vysledky import TabulkaVysledku
+
+    ulohy = _nacti_ulohy(okresy, pocet_vlaken)
+    zahranici = [
+        (okres, ziskej_plnou_url(okres["odkaz"], "."), Zahranici.nacti_tabulku_1(okres["odkaz"]))
+        for okres in okresy if "ps36" in okres["odkaz"]
+    ]
+    pocet_stranek = len(ulohy) + sum(len(tabulka_1_data) for _, _, tabulka_1_data in zahranici)
+
+    tabulka = TabulkaVysledku(_klic_tabulky(okresy))
+    otisky = {}
+    neulozeno = False
+    kolo = 0
+    print(f"Sleduji {pocet_stranek} stránek každých {interval:g} s (ukončení Ctrl+C).")
+    try:
+        while True:
+            kolo += 1
+            start = time.perf_counter()
+            zmeneno = obnov_zmenene(tabulka, ulohy, zahranici, otisky,
+                                    pocet_vlaken, pocet_procesu)
+            neulozeno = neulozeno or zmeneno > 0
+            zprava = ""
+            if neulozeno:
+                if databaze is not None:
+                    try:
+                        cesta, _ = uloz_do_databaze(tabulka, databaze, volby,
+                                                    os.path.dirname(vystup))
+                    except sqlite3.OperationalError as e:
+                        print(f"Databázi nelze zapsat ({e}), zkusím to v dalším kole.")
+                        cesta = None
+                else:
+                    cesta = _prepis_vystup(tabulka.radky(), tabulka.sloupce_vystupu(),
+                                           vystup, format_vystupu)
+                    for uroven, (sloupce, radky) in sestav_souhrny(tabulka).items():
+                        _prepis_vystup(radky, sloupce, f"{vystup}_{uroven}", format_vystupu)
+                if cesta:
+                    neulozeno = False
+                    zprava = f", uloženo do {cesta}"
+            doba = time.perf_counter() - start
+            print(f"[{datetime.now():%H:%M:%S}] Kolo {kolo}: změněno {zmeneno} "
+                  f"z {pocet_stranek} stránek ({doba:.1f} s){zprava}")
+            time.sleep(max(0.0, interval - doba))
+    except KeyboardInterrupt:
+        print("\nSledování ukončeno.")
+
+
+def zpracuj_parametry(argv=None):
+    """
+    Zpracuje parametry příkazové řádky. Bez parametrů běží skript
+    interaktivně jako dosud.
+    """
+    parser = argparse.ArgumentParser(
+        description="Stažení výsledků voleb z volby.cz do Excelu."
+    )
+    vyber = parser.add_mutually_exclusive_group()
+    vyber.add_argument("--all", action="store_true",
+                       help="zpracovat všechny okresy včetně zahraničí")
+    vyber.add_argument("--okres", metavar="CISLA",
+                       help="čísla okresů oddělená čárkou, např. 1,5,23")
+    parser.add_argument("--vlakna", type=int, default=None,
+                        help="počet souběžně stahovaných stránek")
+    parser.add_argument("--procesy", type=int, default=None,
+                        help="počet procesů pro parsování stránek")
+    parser.add_argument("--format", dest="format_vystupu", choices=sorted(FORMATY),
+                        default="xlsx", help="formát výstupního souboru (výchozí xlsx)")
+    parser.add_argument("--resume", action="store_true",
+                        help="navázat na přerušený běh (přeskočí obce uložené v deníku)")
+    parser.add_argument("--volby", metavar="KODY",
+                        help="kód voleb z adresy volby.cz (výchozí ps2017nss); s --all/--okres "
+                             "lze zadat více kódů oddělených čárkou, např. ps2013,ps2017nss,ps2021 "
+                             "- zpracují se v jednom běhu do společného výstupu")
+    parser.add_argument("--okrsky", action="store_true",
+                        help="s --all/--okres stáhnout výsledky po jednotlivých okrscích "
+                             "(u větších obcí; celostátně zhruba 15 000 stránek)")
+    parser.add_argument("--db", nargs="?", const="", metavar="SOUBOR",
+                        help="místo souborů uložit výsledky do SQLite databáze "
+                             "(výchozí volby.sqlite); opakovaný běh záznamy přepíše")
+    parser.add_argument("--snimek", nargs="?", const="", metavar="SOUBOR",
+                        help="uložit všechny použité stránky do komprimovaného archivu "
+                             "(výchozí snimek_<čas>.archiv) pro pozdější --ze-snimku")
+    parser.add_argument("--ze-snimku", metavar="SOUBOR",
+                        help="číst stránky z archivu uloženého přes --snimek místo ze sítě "
+                             "(opakované parsování po změně zpracování)")
+    parser.add_argument("--fronta", metavar="SOUBOR",
+                        help="s --all/--okres naplánovat stránky do sdílené fronty (SQLite), "
+                             "zpracovat je spolu s dalšími pracovníky a spojit výsledky")
+    parser.add_argument("--pracovnik", metavar="SOUBOR",
+                        help="jen zpracovávat úlohy ze sdílené fronty (další proces nebo počítač)")
+    parser.add_argument("--obnov-adresar", action="store_true",
+                        help="znovu sestavit uložený adresář okresů a obcí ze serveru")
+    parser.add_argument("--watch", type=float, metavar="SEKUNDY",
+                        help="s --all/--okres sledovat změny: každých SEKUNDY sekund "
+                             "přepočítat jen změněné obce a přepsat výstup")
+    parser.add_argument("--prubezne", type=float, metavar="SEKUNDY",
+                        help="s --all/--okres stahovat obce od největší a každých SEKUNDY "
+                             "sekund přepsat průběžné součty za okresy a stát s pokrytím voličů")
+    parser.add_argument("--jen-mezipamet", action="store_true",
+                        help="režim bez sítě: stránky brát jen z mezipaměti (.mezipamet); "
+                             "chybějící stránka je chyba (stejně jako VOLBY_JEN_MEZIPAMET=1)")
+    pridej_parametry(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Hlavní spouštěcí funkce.
     1. Načte seznam okresů (okresních měst).
     2. Umožní uživateli vybrat konkrétní okres k analýze.
     3. Načte všechny obce v daném okrese a uloží je do dočasného JSON souboru.
-    4. Poté zpracuje detailní data o každé obci a uloží je do Excelu.
+    4. Poté zpracuje detailní data o každé obci, sestaví z nich sloupcovou
+       tabulku (TabulkaVysledku) a uloží ji do Excelu.
     5. Smaže dočasný JSON soubor.
+    S parametrem --all nebo --okres běží bez dotazů a zpracuje zadané okresy
+    do jednoho společného výstupu; s --watch pak výstup průběžně obnovuje.
+    Parametr --volby určuje volby; s více kódy se okresy všech voleb
+    zpracují v jednom běhu do společného výstupu se sloupcem 'Volby'.
+    """
+    parametry = zpracuj_parametry(argv)
+    if parametry.watch is not None and not (parametry.all or parametry.okres):
+        print("Parametr --watch lze použít jen spolu s --all nebo --okres.")
+        return
+    if parametry.okrsky and (parametry.watch is not None or not (parametry.all or parametry.okres)):
+        print("Parametr --okrsky lze použít jen spolu s --all nebo --okres (bez --watch).")
+        return
+    if parametry.fronta and (parametry.okrsky or parametry.watch is not None
+                             or not (parametry.all or parametry.okres)):
+        print("Parametr --fronta lze použít jen spolu s --all nebo --okres (bez --okrsky a --watch).")
+        return
+    if parametry.prubezne is not None and (
+            parametry.okrsky or parametry.fronta or parametry.watch is not None
+            or not (parametry.all or parametry.okres)):
+        print("Parametr --prubezne lze použít jen spolu s --all nebo --okres "
+              "(bez --okrsky, --fronta a --watch).")
+        return
+    if parametry.pracovnik and not os.path.exists(parametry.pracovnik):
+        print(f"Fronta {parametry.pracovnik} neexistuje.")
+        return
+    parametry.volby = _seznam_voleb(parametry.volby)
+    if len(parametry.volby) > 1 and not (parametry.all or parametry.okres):
+        print("Více voleb najednou lze zpracovat jen spolu s --all nebo --okres.")
+        return
+    if parametry.ze_snimku and not os.path.exists(parametry.ze_snimku):
+        print(f"Snímek {parametry.ze_snimku} neexistuje.")
+        return
+    if parametry.jen_mezipamet:
+        nastav_klienta(jen_mezipamet=True)
+    skript_cesta = os.path.dirname(os.path.abspath(__file__))
+    # Měření běhu (--profile) - zpráva se uloží i po chybě nebo přerušení
+    cesta_profilu = zapni_podle_parametru(parametry, skript_cesta)
+    snimky = _otevri_snimky(parametry, skript_cesta)
+    try:
+        _spust(parametry)
+    except ChybiVeSnimku as e:
+        print(f"Běh ze snímku se přerušil: {e}")
+    finally:
+        _zavri_snimky(snimky)
+        if cesta_profilu:
+            PROFIL.uloz(cesta_profilu)
+
+
+def _otevri_snimky(parametry, slozka):
+    """
+    Otevře snímky podle parametrů --snimek a --ze-snimku a předá je klientovi.
+
+    Vrací:
+        dict: Otevřené snímky ('zapis', 'cteni'), pro _zavri_snimky.
+    """
+    snimky = {}
+    if parametry.ze_snimku:
+        snimky["cteni"] = Snimek(parametry.ze_snimku)
+        print(f"Čtu stránky ze snímku {parametry.ze_snimku} ({len(snimky['cteni'])} stránek).")
+        nastav_klienta(ze_snimku=snimky["cteni"])
+    if parametry.snimek is not None:
+        cesta = parametry.snimek or os.path.join(
+            slozka, f"snimek_{datetime.now().strftime('%Y%m%d_%H%M')}.archiv"
+        )
+        snimky["zapis"] = Snimek(cesta, zapis=True)
+        nastav_klienta(snimek=snimky["zapis"])
+    return snimky
+
+
+def _zavri_snimky(snimky):
+    """
+    Odpojí snímky od klienta a zavře je.
+    """
+    if not snimky:
+        return
+    nastav_klienta(snimek=False, ze_snimku=False)
+    for snimek in snimky.values():
+        snimek.zavri()
+    chybejici = list(snimky["cteni"].chybejici) if "cteni" in snimky else []
+    if chybejici:
+        print(f"Ve snímku chybělo {len(chybejici)} stránek, výsledky z nich nejsou úplné:")
+        for url in chybejici[:20]:
+            print(f"  {url}")
+        if len(chybejici) > 20:
+            print(f"  ... a dalších {len(chybejici) - 20}")
+    if "zapis" in snimky:
+        print(f"Snímek stránek ({len(snimky['zapis'])} stránek) uložen do souboru: "
+              f"{snimky['zapis'].cesta}")
+
+
+def _seznam_voleb(text):
     """
+    Převede hodnotu parametru --volby na seznam kódů voleb ([None] = výchozí
+    volby). Opakované kódy se vynechají.
+    """
+    if not text:
+        return [None]
+    return list(dict.fromkeys(kod.strip() for kod in text.split(",") if kod.strip())) or [None]
+
 
+def _spust(parametry):
+    """
+    Vlastní průběh hlavní funkce (viz main).
+    """
     # Získáme cestu ke složce, odkud je skript spuštěn
     skript_cesta = os.path.dirname(os.path.abspath(__file__))
-    # Sestavíme plnou cestu k souboru Zahranici.py
-    zahranici_script = os.path.join(skript_cesta, "Zahranici.py")
 
     # Vygenerujeme časové razítko pro pojmenování souborů
     casove_razitko = datetime.now().strftime("%Y%m%d_%H%M")
     json_soubor = os.path.join(skript_cesta, f"obce_{casove_razitko}.json")
-    excel_soubor = os.path.join(skript_cesta, f"vysledky_{casove_razitko}.xlsx")
+    # Výstupní soubor bez přípony - příponu doplní zapisovač podle formátu;
+    # u jiných než výchozích voleb obsahuje název i kódy voleb
+    volby = parametry.volby
+    popis_voleb = "_".join(kod for kod in volby if kod)
+    # Kód voleb pro databázi (--db), pokud tabulka nemá sloupec 'Volby'
+    kod_voleb = volby[0] or Zahranici.VYCHOZI_VOLBY
+    if parametry.obnov_adresar:
+        for kod in volby:
+            adresar_voleb(kod, obnovit=True)
+    predpona = f"{popis_voleb}_" if popis_voleb else ""
+    if parametry.okrsky:
+        predpona += "okrsky_"
+    vystup = os.path.join(skript_cesta, f"vysledky_{predpona}{casove_razitko}")
+
+    # Pracovník fronty: úlohy i jejich adresy jsou ve frontě
+    if parametry.pracovnik:
+        fronta = Fronta(parametry.pracovnik)
+        try:
+            pracuj_na_fronte(fronta, parametry.vlakna, parametry.procesy)
+        finally:
+            fronta.zavri()
+        return
+
+    # Neinteraktivní režim: více okresů (případně více voleb) do jednoho výstupu
+    if parametry.all or parametry.okres:
+        cisla = None
+        if parametry.okres:
+            try:
+                cisla = [int(c) for c in parametry.okres.split(",") if c.strip()]
+            except ValueError:
+                print("Chybný seznam okresů! Zadejte čísla oddělená čárkou.")
+                return
+
+        # Krok 1: Načtení okresních měst (všech zadaných voleb)
+        print("1. Načítám seznam okresních měst...")
+        with PROFIL.etapa("seznam okresu"):
+            vybrane = vyber_okresy(volby, cisla)
+        if vybrane is None:
+            print("Neplatný výběr!")
+            return
+
+        if parametry.watch is not None:
+            sleduj_okresy(vybrane, vystup, parametry.format_vystupu, parametry.watch,
+                          parametry.vlakna, parametry.procesy, parametry.db, kod_voleb)
+            return
+
+        # Deník hotových obcí - jeho název závisí jen na výběru okresů,
+        # aby ho opakované spuštění s --resume našlo
+        popis = "vse" if parametry.all else "okresy_" + "_".join(map(str, sorted(set(cisla))))
+        denik = Denik(os.path.join(skript_cesta, f"denik_{predpona}{popis}.jsonl"),
+                      parametry.resume)
+        prubezne = None
+        dokonceno = False
+        try:
+            if parametry.fronta:
+                # Rozpracovanou práci si pamatuje fronta, deník se nepoužije
+                vysledky = zpracuj_frontou(vybrane, parametry.fronta,
+                                           parametry.vlakna, parametry.procesy)
+            elif parametry.okrsky:
+                vysledky = zpracuj_okrsky(vybrane, parametry.vlakna, parametry.procesy, denik)
+            else:
+                if parametry.prubezne is not None:
+                    prubezne = PrubezneVysledky(vystup, parametry.format_vystupu,
+                                                parametry.prubezne, _zaklad_okresu, _klic_obce)
+                vysledky = zpracuj_okresy(vybrane, parametry.vlakna, parametry.procesy,
+                                          denik, prubezne)
+            tabulka = sestav_tabulku(vysledky, _klic_tabulky(vybrane, parametry.okrsky),
+                                     prubezne)
+            if prubezne is not None:
+                # Konečné součty (pokrytí 100 %) a obce zpět v pořadí okresů
+                prubezne.zverejni(tabulka)
+                tabulka.serad(prubezne.poradi_klicu)
+            if not parametry.okrsky:
+                # Počty voličů pro pořadí stahování v příštích bězích (--prubezne)
+                uloz_velikosti(tabulka)
+            if parametry.db is not None:
+                # Do databáze místo souborů - souhrny lze dopočítat dotazem
+                cesta, pocet = uloz_do_databaze(tabulka, parametry.db, kod_voleb, skript_cesta)
+                cesty_souhrnu = []
+            else:
+                # Strany, které v některém okrese nekandidovaly, mají v tabulce 0 hlasů
+                cesta, pocet = uloz_vysledky(
+                    tabulka.radky(), vystup, parametry.format_vystupu,
+                    sloupce=tabulka.sloupce_vystupu()
+                )
+                # Souhrny za okresy, kraje a stát do samostatných souborů vedle výstupu
+                cesty_souhrnu = [
+                    uloz_vysledky(radky, f"{vystup}_{uroven}", parametry.format_vystupu,
+                                  sloupce=sloupce)[0]
+                    for uroven, (sloupce, radky) in sestav_souhrny(tabulka).items()
+                ]
+            dokonceno = True
+        finally:
+            # Po úspěšném dokončení se deník smaže, po chybě zůstane pro --resume
+            denik.zavri(smazat=dokonceno)
+        print(f"\nVýsledky ({pocet} řádků) byly uloženy do souboru: {cesta}")
+        for cesta_souhrnu in cesty_souhrnu:
+            print(f"Souhrn uložen do souboru: {cesta_souhrnu}")
+        if prubezne is not None:
+            for cesta_prubezne in prubezne.cesty:
+                print(f"Průběžné součty uloženy do souboru: {cesta_prubezne}")
+        if len(volby) > 1:
+            soucty = tabulka.soucty_stran(podle="Volby")
+        else:
+            soucty = {"celkem": tabulka.soucty_stran()}
+        for kod, soucty_voleb in soucty.items():
+            print(f"Nejvíce hlasů {kod}:")
+            for strana, hlasy in list(soucty_voleb.items())[:5]:
+                print(f"  {strana}: {hlasy}")
+        return
 
     # Krok 1: Načtení okresních měst
     print("1. Načítám seznam okresních měst...")
-    okresni_mesta = nacti_okresni_mesta()
+    with PROFIL.etapa("seznam okresu"):
+        okresni_mesta = adresar_voleb(volby[0]).okresy()
+    vypis_okresy(okresni_mesta)
 
     # Uživatel vybere pořadové číslo okresu
     try:
         vyber = int(input("\nZadejte číslo okresního města pro zpracování: "))
 
-        # Pokud uživatel zadá číslo 14, spustíme skript Zahranici.py
+        # Pokud uživatel zadá číslo 14, zpracujeme zahraniční okrsky
+        # (ve stejném procesu - sdílí se HTTP klient i mezipaměť)
         if vyber == 14:
-            print("Spouštím skript Zahranici.py ...")
-            subprocess.run(["python", zahranici_script])
+            print("Zpracovávám zahraniční okrsky (Zahranici.py) ...")
+            zahranici = next(
+                (mesto for mesto in okresni_mesta if "ps36" in mesto["odkaz"]), None
+            )
+            zakladni_url = (
+                ziskej_plnou_url(zahranici["odkaz"], ".") if zahranici
+                else Zahranici.url_voleb(volby[0] or Zahranici.VYCHOZI_VOLBY)
+            )
+            Zahranici.zpracuj_zahranici(
+                zakladni_url, parametry.format_vystupu, parametry.resume,
+                parametry.vlakna, parametry.procesy
+            )
             return  # Ukončíme provádění tohoto skriptu
 
         vybrany_okres = next(
@@ -226,23 +1434,48 @@ def main():
 
     # Krok 2: Načtení obcí v daném okrese a uložení do dočasného JSON souboru
     print("\n2. Načítám seznam obcí...")
-    obce = nacti_obce(vybrany_okres["odkaz"])
+    with PROFIL.etapa("seznam obci"):
+        obce = adresar_voleb(volby[0]).obce([vybrany_okres], parametry.vlakna)[0]
     with open(json_soubor, "w", encoding="utf-8") as soubor:
         json.dump(obce, soubor, ensure_ascii=False, indent=4)
 
     print(f"Načteno {len(obce)} obcí. Data uložena do souboru '{json_soubor}'.")
 
     # Krok 3: Zpracování detailních dat o každé obci a uložení do Excelu
+    # Stránky obcí se stahují souběžně a parsují ve fondu procesů,
+    # výsledky se zapisují postupně v pořadí obcí
+    # Každá hotová obec se hned zapíše do deníku, aby šlo po pádu pokračovat
     print("\n3. Zpracovávám detailní data o obcích...")
-    vysledky = []
-    for o in obce:
-        data_obce = nacti_data_obce(o)
-        vysledky.append(data_obce)
-
-    df = pd.DataFrame(vysledky)
-    df.to_excel(excel_soubor, index=False, engine='openpyxl')
+    denik = Denik(
+        os.path.join(skript_cesta, f"denik_{predpona}okres_{vybrany_okres['cislo']}.jsonl"),
+        parametry.resume
+    )
+    dokonceno = False
+    try:
+        vysledky = zpracuj_s_denikem(
+            obce, lambda obec: obec["odkaz"], denik,
+            lambda zbyvajici: stahni_a_zpracuj_postupne(
+                zbyvajici, _stahni_stranku_obce, zpracuj_data_obce,
+                parametry.vlakna, parametry.procesy, "ps311"
+            )
+        )
+        if parametry.db is not None:
+            # V databázi mají i obce jednoho okresu vyplněný kraj a okres
+            zaklad = _zaklad_okresu(vybrany_okres)
+            tabulka = sestav_tabulku(rozdel_data_obce(data, zaklad) for data in vysledky)
+            cesta, _ = uloz_do_databaze(tabulka, parametry.db, kod_voleb, skript_cesta)
+        else:
+            tabulka = sestav_tabulku(rozdel_data_obce(data) for data in vysledky)
+            cesta, _ = uloz_vysledky(
+                tabulka.radky(), vystup, parametry.format_vystupu,
+                sloupce=tabulka.sloupce_vystupu()
+            )
+        uloz_velikosti(tabulka)
+        dokonceno = True
+    finally:
+        denik.zavri(smazat=dokonceno)
 
-    print(f"\nVýsledky byly uloženy do souboru: {excel_soubor}")
+    print(f"\nVýsledky byly uloženy do souboru: {cesta}")
 
     # Krok 4: Odstranění dočasného JSON souboru
     os.remove(json_soubor)
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kompaktní sloupcové uložení výsledků voleb.
+Místo seznamu slovníků, kde se u každé obce opakují dlouhé názvy stran
+a čísla jsou uložená jako text, se výsledky drží v NumPy polích typu int32:
+    - názvy stran mají v celém běhu jednoznačné číselné ID (RejstrikStran),
+    - číselné údaje (voliči, obálky, hlasy) se převádí na int už při
+      extrakci ze stránky (funkce parsovani.na_cislo),
+    - hlasy stran tvoří matici obce x strany, textové údaje (název obce,
+      okres...) jsou v obyčejných seznamech,
+    - řádky jsou dohledatelné podle kódu obce (nebo jiného klíče).
+Převod na pandas DataFrame je vektorový (bez smyček přes řádky).
+"""
+
+import threading      # Zámek rejstříku stran (vestavěná v Pythonu)
+import numpy as np    # Číselná pole (instaluje se spolu s pandas)
+from parsovani import na_cislo  # Převod textu stránek na int
+
+# Typ čísel v tabulce - počty voličů i hlasů se do int32 bez problému vejdou
+TYP_CISLA = np.int32
+# Počáteční kapacita tabulky (při zaplnění se zdvojnásobí)
+POCATECNI_KAPACITA = 256
+
+
+class RejstrikStran:
+    """
+    Rejstřík názvů stran: každý název dostane při prvním výskytu číselné ID,
+    které zůstává platné po celý běh programu (i pro více tabulek).
+    """
+
+    def __init__(self):
+        self._id = {}
+        self._nazvy = []
+        self._zamek = threading.Lock()
+
+    def id_strany(self, nazev):
+        """
+        Vrátí ID strany, případně ho nově přidělí.
+        """
+        id_ = self._id.get(nazev)
+        if id_ is None:
+            with self._zamek:
+                id_ = self._id.setdefault(nazev, len(self._nazvy))
+                if id_ == len(self._nazvy):
+                    self._nazvy.append(nazev)
+        return id_
+
+    def nazev(self, id_):
+        """
+        Vrátí název strany podle jejího ID.
+        """
+        return self._nazvy[id_]
+
+    def __len__(self):
+        return len(self._nazvy)
+
+
+# Společný rejstřík stran pro celý běh programu
+REJSTRIK = RejstrikStran()
+
+
+class TabulkaVysledku:
+    """
+    Sloupcová tabulka výsledků. Základní údaje (textové i číselné sloupce)
+    se registrují podle prvního výskytu, hlasy stran jsou v matici int32.
+
+    Parametry:
+        klic (str nebo tuple): Název základního sloupce, podle kterého se
+                    řádky dohledávají (např. 'Číslo obce'), nebo n-tice
+                    názvů pro složený klíč (např. ('Volby', 'Číslo obce')).
+                    Přidání řádku se stejným klíčem přepíše původní řádek.
+        rejstrik (RejstrikStran): Rejstřík stran (výchozí společný REJSTRIK).
+    """
+
+    def __init__(self, klic, rejstrik=REJSTRIK):
+        self.klic = klic
+        self.rejstrik = rejstrik
+        self._pocet = 0
+        self._index = {}                 # hodnota klíče -> číslo řádku
+        self._sloupce = {}               # název -> ("text", seznam) / ("cislo", index)
+        self._cisla = np.zeros((POCATECNI_KAPACITA, 0), dtype=TYP_CISLA)
+        self._hlasy = np.zeros((POCATECNI_KAPACITA, 0), dtype=TYP_CISLA)
+        self._strany = {}                # ID strany -> index sloupce v matici hlasů
+
+    def __len__(self):
+        return self._pocet
+
+    @staticmethod
+    def _rozsir_radky(pole, pocet_radku):
+        """
+        Vrátí kopii pole zvětšenou na daný počet řádků (doplněno nulami).
+        """
+        nove = np.zeros((pocet_radku, pole.shape[1]), dtype=TYP_CISLA)
+        nove[:pole.shape[0]] = pole
+        return nove
+
+    @staticmethod
+    def _rozsir_sloupce(pole, pocet_sloupcu):
+        """
+        Vrátí kopii pole zvětšenou na daný počet sloupců (doplněno nulami).
+        """
+        nove = np.zeros((pole.shape[0], pocet_sloupcu), dtype=TYP_CISLA)
+        nove[:, :pole.shape[1]] = pole
+        return nove
+
+    def _sloupec(self, nazev, hodnota):
+        """
+        Vrátí popis základního sloupce; nový sloupec zaregistruje podle typu
+        první hodnoty (int = číselný sloupec, jinak textový).
+        """
+        sloupec = self._sloupce.get(nazev)
+        if sloupec is None:
+            if isinstance(hodnota, int):
+                index = self._cisla.shape[1]
+                self._cisla = self._rozsir_sloupce(self._cisla, index + 1)
+                sloupec = ("cislo", index)
+            else:
+                sloupec = ("text", [None] * self._cisla.shape[0])
+            self._sloupce[nazev] = sloupec
+        return sloupec
+
+    def _sloupec_strany(self, nazev):
+        """
+        Vrátí index sloupce strany v matici hlasů (případně ho přidá).
+        """
+        id_ = self.rejstrik.id_strany(nazev)
+        index = self._strany.get(id_)
+        if index is None:
+            index = len(self._strany)
+            self._strany[id_] = index
+            self._hlasy = self._rozsir_sloupce(self._hlasy, index + 1)
+        return index
+
+    def pridej(self, zaklad, hlasy):
+        """
+        Přidá (nebo podle klíče přepíše) jeden řádek.
+
+        Parametry:
+            zaklad (dict): Základní údaje, např. {'Číslo obce': '529303',
+                           'Název obce': 'Benešov', 'Voliči celkem': 13526}.
+            hlasy (dict): Název strany -> počet hlasů.
+
+        Vrací:
+            int: Číslo řádku v tabulce.
+        """
+        hodnota_klice = self._hodnota_klice(zaklad)
+        radek = self._index.get(hodnota_klice)
+        if radek is None:
+            radek = self._pocet
+            kapacita = self._cisla.shape[0]
+            if radek >= kapacita:
+                self._cisla = self._rozsir_radky(self._cisla, 2 * kapacita)
+                self._hlasy = self._rozsir_radky(self._hlasy, 2 * kapacita)
+                for typ, data in self._sloupce.values():
+                    if typ == "text":
+                        data.extend([None] * kapacita)
+            self._pocet += 1
+            if hodnota_klice is not None:
+                self._index[hodnota_klice] = radek
+        else:
+            # Přepisovaný řádek nejdřív vynulujeme
+            self._cisla[radek] = 0
+            self._hlasy[radek] = 0
+
+        for nazev, hodnota in zaklad.items():
+            typ, data = self._sloupec(nazev, hodnota)
+            if typ == "cislo":
+                self._cisla[radek, data] = na_cislo(hodnota)
+            else:
+                data[radek] = hodnota
+        for strana, pocet in hlasy.items():
+            # Index se musí zjistit dřív, než se sáhne do pole - přidání
+            # nové strany pole nahradí větším
+            sloupec = self._sloupec_strany(strana)
+            self._hlasy[radek, sloupec] = na_cislo(pocet)
+        return radek
+
+    def _hodnota_klice(self, zaklad):
+        """
+        Vrátí hodnotu (případně n-tici hodnot) klíče pro řádek.
+        """
+        if isinstance(self.klic, tuple):
+            hodnota = tuple(zaklad.get(sloupec) for sloupec in self.klic)
+            return None if None in hodnota else hodnota
+        return zaklad.get(self.klic)
+
+    def radek_podle_klice(self, hodnota_klice):
+        """
+        Vrátí číslo řádku pro hodnotu klíče (u složeného klíče n-tici), nebo None.
+        """
+        return self._index.get(hodnota_klice)
+
+    def serad(self, hodnoty_klice):
+        """
+        Přeuspořádá řádky podle zadaného pořadí hodnot klíče (např. zpět do
+        pořadí okresů a obcí po stahování v jiném pořadí). Řádky, jejichž
+        klíč v seznamu není, následují v dosavadním pořadí.
+
+        Parametry:
+            hodnoty_klice (iterable): Hodnoty klíče v požadovaném pořadí.
+        """
+        poradi = list(dict.fromkeys(
+            self._index[hodnota] for hodnota in hodnoty_klice if hodnota in self._index
+        ))
+        vybrane = set(poradi)
+        poradi += [radek for radek in range(self._pocet) if radek not in vybrane]
+        indexy = np.array(poradi, dtype=np.intp)
+        self._cisla[:self._pocet] = self._cisla[indexy]
+        self._hlasy[:self._pocet] = self._hlasy[indexy]
+        for typ, data in self._sloupce.values():
+            if typ == "text":
+                data[:self._pocet] = [data[radek] for radek in poradi]
+        novy_radek = {stary: novy for novy, stary in enumerate(poradi)}
+        self._index = {hodnota: novy_radek[radek] for hodnota, radek in self._index.items()}
+
+    @property
+    def zakladni_sloupce(self):
+        """
+        Názvy základních sloupců v pořadí prvního výskytu.
+        """
+        return list(self._sloupce)
+
+    @property
+    def strany(self):
+        """
+        Názvy stran v pořadí, v jakém jsou sloupce v matici hlasů.
+        """
+        return [self.rejstrik.nazev(id_) for id_ in self._strany]
+
+    def sloupce_vystupu(self):
+        """
+        Všechny sloupce výstupu: základní sloupce a za nimi strany.
+        """
+        return self.zakladni_sloupce + self.strany
+
+    def sloupec(self, nazev):
+        """
+        Vrátí data jednoho základního sloupce (NumPy pole nebo seznam).
+        """
+        typ, data = self._sloupce[nazev]
+        if typ == "cislo":
+            return self._cisla[:self._pocet, data]
+        return data[:self._pocet]
+
+    @property
+    def matice_hlasu(self):
+        """
+        Matice hlasů (řádky x strany) typu int32, bez nevyužité kapacity.
+        """
+        return self._hlasy[:self._pocet]
+
+    def soucty_stran(self, podle=None):
+        """
+        Celkový počet hlasů každé strany (vektorový součet přes řádky).
+
+        Parametry:
+            podle (str): Základní sloupec, podle jehož hodnot se součty
+                         rozdělí (např. 'Volby'). Bez něj se sčítá celá tabulka.
+
+        Vrací:
+            dict: Název strany -> součet hlasů, seřazeno sestupně. S parametrem
+                  'podle' slovník hodnota sloupce -> takový slovník.
+        """
+        if podle is not None:
+            hodnoty = np.asarray(self.sloupec(podle))
+            return {
+                hodnota: self._soucty(hodnoty == hodnota)
+                for hodnota in dict.fromkeys(hodnoty.tolist())
+            }
+        return self._soucty(slice(None))
+
+    def _soucty(self, vyber):
+        """
+        Součty hlasů stran přes vybrané řádky, seřazené sestupně.
+        """
+        soucty = self.matice_hlasu[vyber].sum(axis=0, dtype=np.int64)
+        poradi = np.argsort(-soucty, kind="stable")
+        strany = self.strany
+        return {strany[i]: int(soucty[i]) for i in poradi}
+
+    def souhrn(self, skupiny=(), podily=None, zaklad_podilu=None, nazev_poctu="Počet řádků"):
+        """
+        Sečte řádky po skupinách (např. obce po okresech). Číselné základní
+        sloupce i hlasy všech stran se sečtou vektorově v jednom průchodu.
+
+        Parametry:
+            skupiny (tuple): Základní sloupce, podle kterých se řádky seskupí
+                             (prázdné = jeden řádek za celou tabulku).
+            podily (dict): Název nového sloupce -> (čitatel, jmenovatel) -
+                           podíl dvou číselných sloupců v procentech, např.
+                           {'Účast %': ('Odevzdané obálky', 'Voliči celkem')}.
+            zaklad_podilu (str): Číselný sloupec, vůči kterému se spočte
+                                 podíl hlasů každé strany v procentech
+                                 (sloupce '<strana> %').
+            nazev_poctu (str): Název sloupce s počtem sečtených řádků.
+
+        Vrací:
+            tuple: (sloupce, radky) - pořadí sloupců a seznam řádků
+                   (slovníků), skupiny v pořadí prvního výskytu.
+        """
+        skupiny = tuple(skupiny)
+        cisla = [nazev for nazev, (typ, _) in self._sloupce.items()
+                 if typ == "cislo" and nazev not in skupiny]
+
+        # Pořadové číslo skupiny pro každý řádek tabulky
+        hodnoty_skupin = [
+            data.tolist() if isinstance(data, np.ndarray) else data
+            for data in (self.sloupec(nazev) for nazev in skupiny)
+        ]
+        klice = list(zip(*hodnoty_skupin)) if skupiny else [()] * self._pocet
+        skupina_podle_klice = {}
+        cisla_skupin = np.fromiter(
+            (skupina_podle_klice.setdefault(klic, len(skupina_podle_klice)) for klic in klice),
+            dtype=np.intp, count=self._pocet
+        )
+        pocet_skupin = len(skupina_podle_klice)
+
+        # Součty v int64, aby celostátní součty nepřetekly
+        indexy = [self._sloupce[nazev][1] for nazev in cisla]
+        data = np.hstack([self._cisla[:self._pocet, indexy], self.matice_hlasu]).astype(np.int64)
+        soucty = np.zeros((pocet_skupin, data.shape[1]), dtype=np.int64)
+        np.add.at(soucty, cisla_skupin, data)
+        pocty = np.bincount(cisla_skupin, minlength=pocet_skupin)
+
+        sloupce_cisel = {nazev: soucty[:, i] for i, nazev in enumerate(cisla)}
+        hlasy = soucty[:, len(cisla):]
+        vypoctene = {
+            nazev: _procenta(sloupce_cisel[citatel], sloupce_cisel[jmenovatel]).tolist()
+            for nazev, (citatel, jmenovatel) in (podily or {}).items()
+            if citatel in sloupce_cisel and jmenovatel in sloupce_cisel
+        }
+        strany = self.strany
+        podily_stran = None
+        if zaklad_podilu in sloupce_cisel:
+            podily_stran = _procenta(hlasy, sloupce_cisel[zaklad_podilu][:, None]).tolist()
+
+        sloupce = list(skupiny) + [nazev_poctu] + cisla + list(vypoctene) + strany
+        if podily_stran is not None:
+            sloupce += [f"{strana} %" for strana in strany]
+        cisla_hodnoty = soucty[:, :len(cisla)].tolist()
+        hlasy_hodnoty = hlasy.tolist()
+        radky = []
+        for klic, i in skupina_podle_klice.items():
+            radek = dict(zip(skupiny, klic))
+            radek[nazev_poctu] = int(pocty[i])
+            radek.update(zip(cisla, cisla_hodnoty[i]))
+            for nazev, hodnoty in vypoctene.items():
+                radek[nazev] = hodnoty[i]
+            radek.update(zip(strany, hlasy_hodnoty[i]))
+            if podily_stran is not None:
+                radek.update(zip((f"{strana} %" for strana in strany), podily_stran[i]))
+            radky.append(radek)
+        return sloupce, radky
+
+    def radky(self):
+        """
+        Generátor řádků (slovníků) v pořadí přidání - pro zapisovače výstupu.
+        Strany, které v obci nekandidovaly, mají 0 hlasů.
+        """
+        zakladni = [(nazev, self.sloupec(nazev)) for nazev in self._sloupce]
+        strany = self.strany
+        hlasy = self.matice_hlasu
+        for i in range(self._pocet):
+            radek = {}
+            for nazev, data in zakladni:
+                hodnota = data[i]
+                radek[nazev] = int(hodnota) if isinstance(hodnota, np.integer) else hodnota
+            radek.update(zip(strany, hlasy[i].tolist()))
+            yield radek
+
+    def do_dataframe(self):
+        """
+        Převede tabulku na pandas DataFrame (číselné sloupce jako int32).
+        """
+        import pandas as pd   # Až tady - pandas je potřeba jen pro analýzy
+        data = {nazev: self.sloupec(nazev) for nazev in self._sloupce}
+        df = pd.DataFrame(data)
+        hlasy = pd.DataFrame(self.matice_hlasu, columns=self.strany)
+        return pd.concat([df, hlasy], axis=1)
+
+
+def _procenta(citatel, jmenovatel):
+    """
+    Podíl v procentech zaokrouhlený na dvě desetinná místa (vektorově);
+    při nulovém jmenovateli vrací 0.
+    """
+    citatel, jmenovatel = np.broadcast_arrays(citatel, jmenovatel)
+    vysledek = np.zeros(citatel.shape, dtype=np.float64)
+    np.divide(citatel * 100.0, jmenovatel, out=vysledek, where=jmenovatel > 0)
+    return np.round(vysledek, 2)
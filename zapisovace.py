@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Zapisovače výsledků, které přijímají řádky postupně, jak vznikají, a drží
+v paměti jen malé množství dat bez ohledu na počet zpracovaných obcí.
+Podporované formáty:
+    xlsx    - Excel; xlsxwriter v režimu constant_memory, pokud je
+              nainstalován, jinak openpyxl v režimu write_only
+    csv     - textový soubor oddělený čárkami (UTF-8 s BOM kvůli Excelu)
+    parquet - sloupcový formát Apache Parquet po dávkách (vyžaduje pyarrow)
+
+Pokud nejsou sloupce známé předem (strany se objevují až při zpracování),
+zapisovač řádky průběžně odkládá do dočasného souboru na disku a teprve při
+uzavření zapíše hlavičku se všemi sloupci a řádky z dočasného souboru.
+"""
+
+import csv            # Zápis CSV (vestavěná v Pythonu)
+import json           # Dočasné odkládání řádků (vestavěná v Pythonu)
+import os             # Mazání dočasného souboru (vestavěná v Pythonu)
+import tempfile       # Dočasný soubor pro odložené řádky (vestavěná v Pythonu)
+from pathlib import Path
+
+# Počet řádků v jedné dávce Parquet souboru
+VELIKOST_DAVKY = 5000
+
+
+class Zapisovac:
+    """
+    Společný základ zapisovačů. Potomci implementují metody _otevri,
+    _zapis_hodnoty a _dokonci.
+
+    Parametry:
+        cesta (str nebo Path): Cesta k výstupnímu souboru.
+        sloupce (list): Pořadí sloupců, pokud je známé předem. Jinak se
+                        sloupce sbírají z řádků v pořadí prvního výskytu.
+        vyplnit: Hodnota pro sloupce, které v řádku chybí.
+    """
+
+    pripona = None
+
+    def __init__(self, cesta, sloupce=None, vyplnit=None):
+        self.cesta = Path(cesta)
+        self.vyplnit = vyplnit
+        self.pocet_radku = 0
+        self._sloupce = None
+        self._odlozene = None
+        self._vsechny_sloupce = {}
+        if sloupce is not None:
+            self._sloupce = list(sloupce)
+            self._otevri(self._sloupce)
+        else:
+            # Sloupce zatím neznáme - řádky odkládáme do dočasného souboru
+            self._odlozene = tempfile.NamedTemporaryFile(
+                "w+", encoding="utf-8", suffix=".jsonl", delete=False
+            )
+
+    def zapis(self, radek):
+        """
+        Zapíše (nebo odloží) jeden řádek.
+
+        Parametry:
+            radek (dict): Název sloupce -> hodnota.
+        """
+        self.pocet_radku += 1
+        if self._sloupce is not None:
+            self._zapis_hodnoty(
+                [radek.get(sloupec, self.vyplnit) for sloupec in self._sloupce]
+            )
+            return
+        for sloupec in radek:
+            self._vsechny_sloupce.setdefault(sloupec, None)
+        self._odlozene.write(json.dumps(radek, ensure_ascii=False) + "\n")
+
+    def zavri(self):
+        """
+        Dokončí zápis a zavře výstupní soubor.
+        """
+        if self._odlozene is not None:
+            odlozene, self._odlozene = self._odlozene, None
+            try:
+                self._sloupce = list(self._vsechny_sloupce)
+                self._otevri(self._sloupce)
+                odlozene.seek(0)
+                for radek_json in odlozene:
+                    radek = json.loads(radek_json)
+                    self._zapis_hodnoty(
+                        [radek.get(sloupec, self.vyplnit) for sloupec in self._sloupce]
+                    )
+            finally:
+                odlozene.close()
+                os.remove(odlozene.name)
+        self._dokonci()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, hodnota, traceback):
+        if typ is None:
+            self.zavri()
+        else:
+            self.zrus()
+
+    def zrus(self):
+        """
+        Ukončí zápis po chybě. Odložené řádky se zahodí a výstupní soubor
+        se nevytvoří; při přímém zápisu se soubor uzavře s dosud zapsanými řádky.
+        """
+        if self._odlozene is not None:
+            self._odlozene.close()
+            os.remove(self._odlozene.name)
+            self._odlozene = None
+        else:
+            self._dokonci()
+
+    def _otevri(self, sloupce):
+        raise NotImplementedError
+
+    def _zapis_hodnoty(self, hodnoty):
+        raise NotImplementedError
+
+    def _dokonci(self):
+        raise NotImplementedError
+
+
+class ZapisovacCSV(Zapisovac):
+    """
+    Zapisuje řádky rovnou do CSV souboru.
+    """
+
+    pripona = "csv"
+
+    def _otevri(self, sloupce):
+        # utf-8-sig: Excel podle BOM pozná kódování a správně zobrazí diakritiku
+        self._soubor = open(self.cesta, "w", encoding="utf-8-sig", newline="")
+        self._csv = csv.writer(self._soubor)
+        self._csv.writerow(sloupce)
+
+    def _zapis_hodnoty(self, hodnoty):
+        self._csv.writerow(hodnoty)
+
+    def _dokonci(self):
+        self._soubor.close()
+
+
+class ZapisovacExcel(Zapisovac):
+    """
+    Zapisuje řádky do Excelu bez držení celého sešitu v paměti.
+    """
+
+    pripona = "xlsx"
+
+    def _otevri(self, sloupce):
+        try:
+            import xlsxwriter
+            self._sesit = xlsxwriter.Workbook(
+                str(self.cesta), {"constant_memory": True}
+            )
+            self._list = self._sesit.add_worksheet()
+            self._radek = 0
+            self._zapis = self._zapis_xlsxwriter
+            self._uloz = self._sesit.close
+        except ImportError:
+            from openpyxl import Workbook
+            self._sesit = Workbook(write_only=True)
+            self._list = self._sesit.create_sheet()
+            self._zapis = self._list.append
+            self._uloz = lambda: self._sesit.save(self.cesta)
+        self._zapis(sloupce)
+
+    def _zapis_xlsxwriter(self, hodnoty):
+        self._list.write_row(self._radek, 0, hodnoty)
+        self._radek += 1
+
+    def _zapis_hodnoty(self, hodnoty):
+        self._zapis(hodnoty)
+
+    def _dokonci(self):
+        self._uloz()
+
+
+class ZapisovacParquet(Zapisovac):
+    """
+    Zapisuje řádky do Parquet souboru po dávkách (VELIKOST_DAVKY řádků).
+    Typy sloupců se určí z první dávky.
+    """
+
+    pripona = "parquet"
+
+    def _otevri(self, sloupce):
+        import pyarrow            # Volitelná knihovna (pip install pyarrow)
+        import pyarrow.parquet
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._nazvy = list(sloupce)
+        self._davka = []
+        self._schema = None
+        self._parquet = None
+
+    def _zapis_hodnoty(self, hodnoty):
+        self._davka.append(hodnoty)
+        if len(self._davka) >= VELIKOST_DAVKY:
+            self._zapis_davku()
+
+    def _zapis_davku(self):
+        sloupce = {
+            nazev: [radek[i] for radek in self._davka]
+            for i, nazev in enumerate(self._nazvy)
+        }
+        tabulka = self._pa.Table.from_pydict(sloupce, schema=self._schema)
+        if self._parquet is None:
+            self._schema = tabulka.schema
+            self._parquet = self._pq.ParquetWriter(str(self.cesta), self._schema)
+        self._parquet.write_table(tabulka)
+        self._davka = []
+
+    def _dokonci(self):
+        if self._davka or self._parquet is None:
+            self._zapis_davku()
+        self._parquet.close()
+
+
+# Formát výstupu -> třída zapisovače
+FORMATY = {
+    "xlsx": ZapisovacExcel,
+    "csv": ZapisovacCSV,
+    "parquet": ZapisovacParquet,
+}
+
+
+def vytvor_zapisovac(format_vystupu, cesta_bez_pripony, sloupce=None, vyplnit=None):
+    """
+    Vytvoří zapisovač pro zvolený formát.
+
+    Parametry:
+        format_vystupu (str): Klíč z FORMATY ('xlsx', 'csv', 'parquet').
+        cesta_bez_pripony (str nebo Path): Cesta k souboru bez přípony;
+                                           přípona se doplní podle formátu.
+        sloupce (list): Pořadí sloupců, pokud je známé předem.
+        vyplnit: Hodnota pro chybějící sloupce.
+
+    Vrací:
+        Zapisovac: Otevřený zapisovač (lze použít v příkazu with).
+    """
+    trida = FORMATY[format_vystupu]
+    cesta = Path(f"{cesta_bez_pripony}.{trida.pripona}")
+    return trida(cesta, sloupce=sloupce, vyplnit=vyplnit)